@@ -4,14 +4,23 @@ from pyfiglet import Figlet, figlet_format
 import toml
 from termcolor import cprint
 from tangleanalyzer import (
+    AddressMonitor,
+    BundleAssembler,
     DmpDecode,
+    DmpIndex,
+    FilePublisher,
+    KafkaPublisher,
+    SqliteSink,
     ZmqSub,
     AddressFilter,
+    AddressPrefixFilter,
     BundleFilter,
+    FilterPlan,
+    MultiTimeFilter,
+    MultiValueFilter,
     TagFilter,
-    TimeFilter,
-    TransactionHashFilter,
-    ValueFilter
+    TagPrefixFilter,
+    TransactionHashFilter
 )
 
 
@@ -46,46 +55,96 @@ def main():
     # Get the filter configuration
     filters_conf = config.get("filters", {})
 
-    # Make filters
-    filter_list = []
-    time_list = filters_conf.get('time', [])
+    # Make the filter plan, which decodes each field once per transaction
+    plan = FilterPlan()
 
+    bloom_fp_rate = filters_conf.get('bloom_fp_rate')
     if addr_set := set(filters_conf.get('address', [])):
-        filter_list.append(AddressFilter(addr_set).make_filter())
+        plan.add(AddressFilter(addr_set, bloom_fp_rate))
     if bundle_set := set(filters_conf.get('bundle', [])):
-        filter_list.append(BundleFilter(bundle_set).make_filter())
+        plan.add(BundleFilter(bundle_set, bloom_fp_rate))
     if tag_set := set(filters_conf.get('tag', [])):
-        filter_list.append(TagFilter(tag_set).make_filter())
+        plan.add(TagFilter(tag_set))
     if transaction_set := set(filters_conf.get('transaction', [])):
-        filter_list.append(TransactionFilter(transaction_set).make_filter())
-    for v in filters_conf.get('value', []):
-        filter_list.append(ValueFilter(
-            min=int(v['min']),
-            max=int(v['max'])).make_filter(v['rlse']))
+        plan.add(TransactionHashFilter(transaction_set, bloom_fp_rate))
+    if addr_prefix_set := set(filters_conf.get('address_prefix', [])):
+        plan.add(AddressPrefixFilter(addr_prefix_set))
+    if tag_prefix_set := set(filters_conf.get('tag_prefix', [])):
+        plan.add(TagPrefixFilter(tag_prefix_set))
+    # All the value (time) ranges are compiled into one sorted interval index
+    if value_list := filters_conf.get('value', []):
+        plan.add(MultiValueFilter(
+            [(int(v['min']), int(v['max']), v['rlse']) for v in value_list],
+            logic=filters_conf.get('value_logic', 'and')))
+    if time_list := filters_conf.get('time', []):
+        plan.add(MultiTimeFilter(
+            [(t['start'], t['end'], t['rlse']) for t in time_list],
+            logic=filters_conf.get('time_logic', 'and')))
 
     if (zmq_conf := config.get("zmq", {})).get("enable", False) == True:
-        time_filter_list = []
-        for t in time_list:
-            time_filter_list.append(TimeFilter(
-                start_date=t['start'],
-                end_date=t['end']).make_filter(t['rlse']))
+        assembler_settings = dict(max_pending=zmq_conf.get("bundle_max_pending", 100000),
+                                  max_age=zmq_conf.get("bundle_max_age", 600))
+        bundle_assembler = None
+        if zmq_conf.get("bundles", False):
+            bundle_assembler = BundleAssembler(**assembler_settings)
+        monitor = None
+        if monitor_set := set(zmq_conf.get("monitor", [])):
+            # The monitor shares the bundle assembler, so a pending bundle is kept once
+            monitor = AddressMonitor(monitor_set, max_hops=zmq_conf.get("monitor_hops", 0),
+                                     assembler=BundleAssembler(**assembler_settings)
+                                     if bundle_assembler is None else bundle_assembler)
+        sink = None
+        if database := zmq_conf.get("database", ""):
+            sink = SqliteSink(database,
+                              batch_size=zmq_conf.get("database_batch_size", 1000),
+                              flush_interval=zmq_conf.get("database_flush_interval", 1.0))
+        publisher = None
+        publish_settings = dict(batch_size=zmq_conf.get("publish_batch_size", 500),
+                                linger=zmq_conf.get("publish_linger", 0.1))
+        if (publish := zmq_conf.get("publish", "")) == "kafka":
+            publisher = KafkaPublisher(topic=zmq_conf.get("kafka_topic", "test"),
+                                       bootstrap_servers=zmq_conf.get(
+                                           "kafka_servers", "localhost:9092"),
+                                       **publish_settings)
+        elif publish == "file":
+            publisher = FilePublisher(zmq_conf.get("publish_file", "published.txt"),
+                                      **publish_settings)
+        elif publish:
+            raise ValueError(f"The publisher {publish} is not supported, use kafka or file!")
         sub = ZmqSub(url=zmq_conf['node_ip'],
                      topic=zmq_conf['topic'],
-                     filterlist=filter_list+time_filter_list)
+                     filter_plan=plan,
+                     bundle_assembler=bundle_assembler,
+                     monitor=monitor,
+                     sink=sink,
+                     publisher=publisher,
+                     queue_size=zmq_conf.get("queue_size", 10000),
+                     queue_policy=zmq_conf.get("queue_policy", "block"),
+                     journal_path=zmq_conf.get("journal_path", "zmq_journal.bin"),
+                     dedup_ttl=zmq_conf.get("dedup_ttl", 60),
+                     consumers=zmq_conf.get("consumers", 4),
+                     filter_processes=zmq_conf.get("filter_processes", 0),
+                     filter_shards=zmq_conf.get("filter_shards", 0),
+                     batch_size=zmq_conf.get("batch_size", 256),
+                     batch_linger=zmq_conf.get("batch_linger", 0.005))
         sub.run()
 
     if (dmp_conf := config.get("dmp", {})).get("enable", False) == True:
-        dmp_time_filter_list = []
-        for t in time_list:
-            dmp_time_filter_list.append(TimeFilter(
-                start_date=t['start'],
-                end_date=t['end']).make_dmp_filter(t['rlse']))
-
+        index = None
+        if index_folder := dmp_conf.get("index_folder", ""):
+            index = DmpIndex(index_folder)
+            index.build(dmp_conf.get("input_folder", "dmp"))
         dmpdecode = DmpDecode(dmp_folder=dmp_conf.get("input_folder", "dmp"),
                               decoded_dmp_folder=dmp_conf.get(
                                   "output_folder", "decoded_data"),
-                              filter_list=filter_list,
-                              time_filter_list=dmp_time_filter_list)
+                              filter_plan=plan,
+                              stream=dmp_conf.get("stream", False),
+                              sort_by_time=dmp_conf.get("sort_by_time", False),
+                              output_format=dmp_conf.get("output_format", "txt"),
+                              incremental=dmp_conf.get("incremental", False),
+                              index=index,
+                              partition=dmp_conf.get("partition", "") or None,
+                              expand_bundles=dmp_conf.get("expand_bundles", False))
         dmpdecode.run()
 
 
@@ -3,6 +3,7 @@
 # Note that order is important, to prevent circular imports.
 from .filter import *
 from .importer import *
+from .analysis import *
 
 
 # MILESTONES_USING_TIMESTAMP_ONLY: set([str]) = set(
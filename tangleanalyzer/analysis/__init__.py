@@ -0,0 +1,4 @@
+from .bundle_assembler import BundleAssembler, expand_bundles
+from .flow_graph import FlowGraph, FlowGraphBuilder
+from .address_monitor import AddressMonitor, MonitorAlert
+from .tangle_dag import TangleDag
@@ -0,0 +1,182 @@
+from typing import Callable
+import logging
+import attr
+from ..common.const import ADDRESS_B, ADDRESS_E
+from .bundle_assembler import BundleAssembler
+
+__all__ = [
+    'AddressMonitor',
+    'MonitorAlert',
+]
+
+
+@attr.s(slots=True)
+class MonitorAlert:
+    kind = attr.ib()
+    address = attr.ib()
+    bundle_hash = attr.ib()
+    value = attr.ib()
+    hop = attr.ib()
+    outputs = attr.ib(default=())
+
+
+def _log_alert(alert: MonitorAlert) -> None:
+    if alert.kind == 'spend':
+        logging.info(f"Watched address {alert.address[:20]}... (hop {alert.hop}) "
+                     f"spends {-alert.value} in bundle {alert.bundle_hash[:20]}...")
+    else:
+        logging.info(f"Watched address {alert.address[:20]}... (hop {alert.hop}) "
+                     f"sent {alert.value} to {len(alert.outputs)} output address(es) "
+                     f"in bundle {alert.bundle_hash[:20]}...")
+
+
+class AddressMonitor():
+    """
+    Live monitor of the spends of a watchlist of addresses.
+
+    A transaction spending from a watched address raises a "spend" alert
+    as soon as it arrives. Its bundle is assembled, and once complete, an
+    "outputs" alert gives the output addresses the watched address sent its
+    value to. The output addresses can be added to the watchlist in turn,
+    up to max_hops hops from the initial addresses.
+
+    The watchlist is a dict from the addresses to their hops, so watching
+    or unwatching an address is O(1) and the filter from make_filter()
+    sees the change immediately.
+
+
+    Attributes
+    ----------
+    watchlist : dict
+        Maps the watched addresses to their hops, 0 for the initial addresses.
+
+    Methods
+    -------
+    add()
+        Add a transaction, returning the alerts it raises.
+    add_bundle()
+        Add a complete bundle assembled elsewhere, returning the alerts it raises.
+    watch()
+        Add an address to the watchlist.
+    unwatch()
+        Remove an address from the watchlist.
+    make_filter()
+        Return a filter for the transactions of the watched addresses.
+    """
+
+    def __init__(self, addresses=(), max_hops=0, on_alert=_log_alert, assembler=None) -> None:
+        """
+        Parameters
+        ----------
+        addresses : set
+            The addresses to watch.
+
+        max_hops : int
+            The output addresses within max_hops hops of the initial
+            addresses are watched as well, 0 to only watch the initial ones.
+
+        on_alert : Callable
+            Called with each MonitorAlert, by default it is logged.
+
+        assembler : BundleAssembler
+            The assembler of the bundles, by default one with a 600 s max age.
+            It can be shared with a ZmqSub, which then assembles each
+            transaction once for both and passes the bundles to add_bundle().
+        """
+        if max_hops < 0:
+            raise ValueError(f"The max_hops {max_hops} must not be negative!")
+        self.watchlist = dict.fromkeys(addresses, 0)
+        self.max_hops = max_hops
+        self.on_alert = on_alert
+        self.assembler = assembler if assembler is not None else BundleAssembler(max_age=600)
+
+    def __len__(self):
+        return len(self.watchlist)
+
+    def __contains__(self, address) -> bool:
+        return address in self.watchlist
+
+    def watch(self, address: str, hop=0) -> None:
+        """Add an address to the watchlist, keeping its smallest hop."""
+        if self.watchlist.get(address, hop + 1) > hop:
+            self.watchlist[address] = hop
+
+    def unwatch(self, address: str) -> None:
+        """Remove an address from the watchlist."""
+        self.watchlist.pop(address, None)
+
+    def _for_str(self, transaction: str) -> bool:
+        return transaction[ADDRESS_B:ADDRESS_E] in self.watchlist
+
+    def make_filter(self) -> Callable:
+        """Make a str filter for the transactions of the watched addresses.
+
+        Unlike an AddressFilter, it follows the changes of the watchlist.
+
+        """
+        return self._for_str
+
+    def _outputs(self, bundle) -> list:
+        net_values = {}
+        for t in bundle:
+            net_values[t['address']] = net_values.get(t['address'], 0) + t['value']
+        outputs = tuple((a, v) for a, v in net_values.items() if v > 0)
+        alerts = []
+        for address, value in net_values.items():
+            hop = self.watchlist.get(address)
+            if hop is None or value >= 0:
+                continue
+            alerts.append(MonitorAlert('outputs', address, bundle[0]['bundle_hash'],
+                                       -value, hop, outputs))
+            if hop < self.max_hops:
+                for output, _ in outputs:
+                    self.watch(output, hop + 1)
+        return alerts
+
+    def _alert(self, alerts) -> list:
+        if self.on_alert is not None:
+            for alert in alerts:
+                self.on_alert(alert)
+        return alerts
+
+    def add(self, transaction, now=None, assemble=True) -> list:
+        """Add a transaction, returning the alerts it raises.
+
+        Parameters
+        ----------
+        transaction : dict
+            The transaction with address, value, bundle_hash, current_index
+            and last_index, e.g., a LazyTransaction.
+
+        now : float
+            The current time of the assembler clock.
+
+        assemble : bool
+            Add the transaction to the assembler. Set False if the bundles
+            are assembled by the owner of a shared assembler.
+
+        Returns
+        ----------
+        The list of MonitorAlert, which are passed to on_alert as well.
+
+        """
+        hop = self.watchlist.get(transaction['address'])
+        alerts = []
+        if hop is not None and transaction['value'] < 0:
+            alerts.append(MonitorAlert('spend', transaction['address'], transaction['bundle_hash'],
+                                       transaction['value'], hop))
+        if assemble:
+            bundle = self.assembler.add(transaction, hit=hop is not None, now=now)
+            if bundle is not None:
+                alerts.extend(self._outputs(bundle))
+        return self._alert(alerts)
+
+    def add_bundle(self, bundle) -> list:
+        """Add a complete bundle with a watched address, see add().
+
+        Returns
+        ----------
+        The list of "outputs" MonitorAlert, which are passed to on_alert as well.
+
+        """
+        return self._alert(self._outputs(bundle))
@@ -0,0 +1,277 @@
+from os import listdir
+from os.path import isfile, join
+from collections import OrderedDict
+from operator import itemgetter
+import time
+import logging
+import numpy as np
+from ..common.trytes import BatchColumns, LazyTransaction
+from ..filter import BundleFilter
+from ..importer.dmpreader import DmpReader
+
+__all__ = [
+    'BundleAssembler',
+    'expand_bundles',
+]
+
+
+class _PendingBundle():
+    __slots__ = ('first_seen', 'hits', 'candidates')
+
+    def __init__(self, first_seen) -> None:
+        self.first_seen = first_seen
+        self.hits = 0
+        # Maps each last_index received to the transactions by current_index
+        self.candidates = {}
+
+
+class BundleAssembler():
+    """
+    Assembler of bundles from a stream of transactions.
+
+    Transactions are grouped by bundle hash until a transaction for every
+    current_index from 0 to last_index has arrived; the complete bundle is
+    then returned by add(), ordered by current_index. Only bundles with at
+    least one transaction added with hit=True are returned, so a filter hit
+    on one transaction expands to its whole bundle even if the other
+    transactions of the bundle did not pass the filter.
+
+    The transactions of a bundle hash are kept apart by last_index, so a
+    forged or early transaction with another last_index does not make the
+    real bundle unassemblable: the first candidate to be complete wins.
+
+    Memory is bounded: at most max_pending incomplete bundles are kept, the
+    oldest being evicted first, and bundles older than max_age are evicted
+    as new transactions arrive. Bundle hashes completed recently are
+    remembered, so reattached transactions of a returned bundle are ignored.
+
+
+    Attributes
+    ----------
+    completed : int
+        The number of complete bundles returned.
+    evicted : int
+        The number of incomplete bundles evicted.
+    rejected : int
+        The number of transactions with inconsistent indexes.
+    conflicts : int
+        The number of transactions with another last_index than the first
+        transaction of their bundle.
+
+    Methods
+    -------
+    add()
+        Add a transaction, returning its bundle once complete.
+    assemble()
+        Add a transaction with a bitmask of hits, returning its bundle and hits once complete.
+    evict()
+        Evict the incomplete bundles older than max_age.
+    flush()
+        Return and drop all the incomplete bundles.
+    """
+
+    def __init__(self, max_pending=100000, max_age=None, max_bundle_size=10000,
+                 clock=time.monotonic) -> None:
+        """
+        Parameters
+        ----------
+        max_pending : int
+            The maximum number of incomplete bundles kept.
+
+        max_age : float
+            The age (in seconds of clock) after which an incomplete bundle is
+            evicted, None to keep bundles until max_pending is reached.
+
+        max_bundle_size : int
+            Transactions with a larger last_index are rejected.
+
+        clock : Callable
+            The clock of the ages.
+        """
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.max_bundle_size = max_bundle_size
+        self._clock = clock
+        self._pending = OrderedDict()
+        self._done = OrderedDict()
+        self.completed = 0
+        self.evicted = 0
+        self.rejected = 0
+        self.conflicts = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __contains__(self, bundle_hash) -> bool:
+        return bundle_hash in self._pending
+
+    def add(self, transaction, hit=True, now=None):
+        """Add a transaction, returning its bundle once complete.
+
+        Parameters
+        ----------
+        transaction : dict
+            The transaction with bundle_hash, current_index and last_index,
+            e.g., a LazyTransaction.
+
+        hit : bool
+            The transaction passed the filters.
+
+        now : float
+            The current time of the clock, to avoid reading it per transaction.
+
+        Returns
+        ----------
+        The transactions of the bundle ordered by current_index if the bundle
+        is complete and has a hit, else None.
+
+        """
+        bundle, hits = self.assemble(transaction, int(bool(hit)), now)
+        return bundle if hits else None
+
+    def assemble(self, transaction, hits=1, now=None) -> tuple:
+        """Add a transaction with a bitmask of hits, see add().
+
+        The hits of the transactions of a bundle are or-ed, so one assembler
+        serves several consumers, e.g., a filter and an AddressMonitor, each
+        checking its own bit.
+
+        Returns
+        ----------
+        The (transactions ordered by current_index, or-ed hits) of the bundle
+        once complete, else (None, 0). A complete bundle is returned even
+        without hits.
+
+        """
+        bundle_hash = transaction['bundle_hash']
+        if bundle_hash in self._done:
+            return None, 0
+        current_index = transaction['current_index']
+        last_index = transaction['last_index']
+        if not 0 <= current_index <= last_index < self.max_bundle_size:
+            self.rejected += 1
+            return None, 0
+
+        if now is None:
+            now = self._clock()
+        self.evict(now)
+        pending = self._pending.get(bundle_hash)
+        if pending is None:
+            if len(self._pending) >= self.max_pending:
+                self._pending.popitem(last=False)
+                self.evicted += 1
+            pending = self._pending[bundle_hash] = _PendingBundle(now)
+        transactions = pending.candidates.get(last_index)
+        if transactions is None:
+            if pending.candidates:
+                self.conflicts += 1
+            transactions = pending.candidates[last_index] = {}
+
+        transactions.setdefault(current_index, transaction)
+        pending.hits |= hits
+        if len(transactions) <= last_index:
+            return None, 0
+
+        del self._pending[bundle_hash]
+        self._done[bundle_hash] = None
+        if len(self._done) > self.max_pending:
+            self._done.popitem(last=False)
+        if pending.hits:
+            self.completed += 1
+        return [transactions[i] for i in range(last_index + 1)], pending.hits
+
+    def evict(self, now=None) -> int:
+        """Evict the incomplete bundles older than max_age.
+
+        Returns
+        ----------
+        The number of bundles evicted.
+
+        """
+        if self.max_age is None:
+            return 0
+        if now is None:
+            now = self._clock()
+        count = 0
+        # The bundles are kept in the order they were first seen
+        while self._pending:
+            bundle_hash, pending = next(iter(self._pending.items()))
+            if now - pending.first_seen < self.max_age:
+                break
+            del self._pending[bundle_hash]
+            count += 1
+        self.evicted += count
+        return count
+
+    def flush(self) -> dict:
+        """Return and drop all the incomplete bundles.
+
+        Returns
+        ----------
+        Maps the bundle hashes to the transactions received, of all their
+        last_index candidates, ordered by current_index.
+
+        """
+        pending = {}
+        for bundle_hash, p in self._pending.items():
+            received = [item for transactions in p.candidates.values() for item in transactions.items()]
+            pending[bundle_hash] = [t for _, t in sorted(received, key=itemgetter(0))]
+        self._pending.clear()
+        return pending
+
+
+def expand_bundles(dmp_folder, bundle_hashes, index=None, assembler=None):
+    """Read the whole bundles of the given bundle hashes from the dmp files.
+
+    This is the second pass of a bundle expansion: the first pass collects
+    the bundle hashes of the transactions which pass the filters, e.g., with
+    DmpDecode(expand_bundles=True) or a FilterPlan, and this pass reads only
+    the transactions of those bundles. With a DmpIndex, only their lines are
+    read; else each dmp file is scanned once with a batch BundleFilter.
+
+    Parameters
+    ----------
+    dmp_folder : str
+        The folder of the dmp files.
+
+    bundle_hashes : set
+        The bundle hashes to expand.
+
+    index : DmpIndex
+        The index of the dmp files.
+
+    assembler : BundleAssembler
+        The assembler to use, by default one without age eviction.
+
+    Returns
+    ----------
+    An iterator of the complete bundles, as lists of LazyTransaction.
+
+    """
+    if assembler is None:
+        assembler = BundleAssembler(max_pending=max(1, len(bundle_hashes)))
+    bundle_filter = BundleFilter(set(bundle_hashes))
+    batch_filter = bundle_filter.make_batch_filter()
+    query = None if index is None else bundle_filter.index_query(index)
+    dmpfiles = [f for f in listdir(dmp_folder) if isfile(join(dmp_folder, f))]
+    # Bundles may span dmp files, which are read in milestone order
+    dmpfiles.sort(key=lambda f: (len(f.split(".")[0]), f))
+    for filename in dmpfiles:
+        filepath = join(dmp_folder, filename)
+        milestone = filename.split(".")[0]
+        with DmpReader(filepath) as reader:
+            offsets = None if index is None else bundle_filter.index_candidates(index, filepath, query)
+            if offsets is not None:
+                records = ((str(h, "ascii"), str(t, "ascii"))
+                           for _, h, t in reader.records(offsets))
+            else:
+                records = ((block.hashes[i].decode("ascii"),
+                            block.rows[i].tobytes().decode("ascii"))
+                           for block in reader.blocks()
+                           for i in np.nonzero(batch_filter(BatchColumns(block.rows)))[0])
+            for tx_hash, tx in records:
+                bundle = assembler.add(LazyTransaction(tx, hash=tx_hash, milestone=milestone))
+                if bundle is not None:
+                    yield bundle
+    for bundle_hash in assembler.flush():
+        logging.info(f"Bundle {bundle_hash[:20]}... is incomplete in {dmp_folder}")
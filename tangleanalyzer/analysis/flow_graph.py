@@ -0,0 +1,293 @@
+import os
+from os.path import join
+from array import array
+import numpy as np
+
+__all__ = [
+    'FlowGraph',
+    'FlowGraphBuilder',
+]
+
+_ADDRESS_COLUMN = 3
+_VALUE_COLUMN = 4
+_CURRENT_INDEX_COLUMN = 6
+_LAST_INDEX_COLUMN = 7
+_BUNDLE_COLUMN = 8
+# The arrays of a FlowGraph, each saved as a .npy file
+_ARRAYS = ('addresses', 'indptr', 'indices', 'value_sum', 'count', 'address_order')
+
+
+def _aggregate(src, dst, value, count) -> tuple:
+    """Sort the edges by (src, dst) and sum the values and counts of equal edges."""
+    if len(src) == 0:
+        return src, dst, value, count
+    order = np.lexsort((dst, src))
+    src, dst, value, count = src[order], dst[order], value[order], count[order]
+    starts = np.concatenate(([True], (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])))
+    idx = np.nonzero(starts)[0]
+    return (src[idx], dst[idx], np.add.reduceat(value, idx), np.add.reduceat(count, idx))
+
+
+class FlowGraph():
+    """
+    Address-to-address value-flow graph in compressed sparse row (CSR) form.
+
+    The addresses are interned to the integer ids 0..num_nodes-1. The edges
+    leaving node i are indices[indptr[i]:indptr[i+1]], sorted by target,
+    with the value sums and the numbers of transfers in the same slices of
+    value_sum and count. An address is looked up by binary search through
+    address_order, so a loaded graph needs no dict of its addresses.
+
+
+    Attributes
+    ----------
+    addresses : np.ndarray
+        The "S" array of the address of each node id.
+    address_order : np.ndarray
+        The int64 node ids sorted by address.
+    indptr : np.ndarray
+        The int64 row offsets, of length num_nodes + 1.
+    indices : np.ndarray
+        The int64 target node of each edge.
+    value_sum : np.ndarray
+        The int64 sum of the values transferred along each edge.
+    count : np.ndarray
+        The int64 number of transfers along each edge.
+
+    Methods
+    -------
+    out_edges()
+        Return the outgoing edges of an address.
+    in_edges()
+        Return the incoming edges of an address.
+    save()
+        Write the graph to a folder of .npy arrays.
+    load()
+        Read a graph written by save(), memory-mapping the arrays.
+    """
+
+    def __init__(self, addresses, indptr, indices, value_sum, count, address_order=None) -> None:
+        self.addresses = addresses
+        self.indptr = indptr
+        self.indices = indices
+        self.value_sum = value_sum
+        self.count = count
+        if address_order is None:
+            address_order = np.argsort(addresses, kind='stable')
+        self.address_order = address_order
+        self._reverse = None
+
+    def __str__(self):
+        return (f'Nodes: {self.num_nodes}\n' +
+                f'Edges: {self.num_edges}')
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.addresses)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+    def node_id(self, address: str):
+        """Return the id of an address, or None if it is not in the graph."""
+        key = address.encode("ascii") if isinstance(address, str) else bytes(address)
+        if not self.num_nodes or len(key) > self.addresses.dtype.itemsize:
+            return None
+        pos = int(np.searchsorted(self.addresses, key, sorter=self.address_order))
+        if pos == self.num_nodes:
+            return None
+        i = int(self.address_order[pos])
+        return i if self.addresses[i] == key else None
+
+    def _edges(self, indptr, indices, edge_ids, address) -> list:
+        i = self.node_id(address)
+        if i is None:
+            return []
+        b, e = int(indptr[i]), int(indptr[i + 1])
+        # The outgoing edges are the edge ids b..e-1 themselves
+        edge_ids = range(b, e) if edge_ids is None else edge_ids[b:e]
+        return [(self.addresses[j].decode("ascii"), int(self.value_sum[k]), int(self.count[k]))
+                for j, k in zip(indices[b:e], edge_ids)]
+
+    def out_edges(self, address: str) -> list:
+        """Return the outgoing edges of an address.
+
+        Returns
+        ----------
+        The (target address, value sum, count) of each edge.
+
+        """
+        return self._edges(self.indptr, self.indices, None, address)
+
+    def in_edges(self, address: str) -> list:
+        """Return the incoming edges of an address.
+
+        Returns
+        ----------
+        The (source address, value sum, count) of each edge.
+
+        """
+        if self._reverse is None:
+            # CSC form: the edge ids sorted by target, with their sources
+            sources = np.repeat(np.arange(self.num_nodes), np.diff(self.indptr))
+            order = np.argsort(self.indices, kind='stable')
+            indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=self.num_nodes), out=indptr[1:])
+            self._reverse = (indptr, sources[order], order)
+        return self._edges(*self._reverse, address)
+
+    def save(self, folder: str) -> None:
+        """Write the graph to a folder of .npy arrays."""
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        for name in _ARRAYS:
+            np.save(join(folder, f'{name}.npy'), getattr(self, name))
+
+    @classmethod
+    def load(cls, folder: str) -> 'FlowGraph':
+        """Read a graph written by save(), memory-mapping the arrays."""
+        return cls(**{name: np.load(join(folder, f'{name}.npy'), mmap_mode='r') for name in _ARRAYS})
+
+
+class FlowGraphBuilder():
+    """
+    Builder of address-to-address value-flow graphs from bundles.
+
+    In a bundle, the addresses with a negative net value are the inputs and
+    those with a positive net value are the outputs. Every output receives
+    from every input a share of its value proportional to the input value.
+    The shares are rounded by largest remainder, so the edges of an output
+    sum to its value (exact when a bundle has a single input address, which
+    is the usual case); a share rounded to 0 adds no edge.
+
+    Edges are appended to compact integer arrays and aggregated into sorted
+    unique edges every compact_size edges, so the memory is bounded by the
+    number of distinct edges rather than by the number of transfers.
+
+
+    Methods
+    -------
+    add_bundle()
+        Add the transfers of a bundle.
+    add_decoded()
+        Add the bundles of decoded dmp files.
+    build()
+        Return the FlowGraph.
+    """
+
+    def __init__(self, compact_size=10000000) -> None:
+        """
+        Parameters
+        ----------
+        compact_size : int
+            The number of appended edges after which they are aggregated.
+        """
+        self.compact_size = compact_size
+        self._ids = {}
+        self._addresses = []
+        self._src = array('q')
+        self._dst = array('q')
+        self._value = array('q')
+        self._edges = (np.zeros(0, dtype=np.int64),) * 4
+
+    def _intern(self, address) -> int:
+        i = self._ids.get(address)
+        if i is None:
+            i = self._ids[address] = len(self._addresses)
+            self._addresses.append(address)
+        return i
+
+    def add_transfers(self, net_values: dict) -> None:
+        """Add the transfers of a bundle given the net value of each address.
+
+        Parameters
+        ----------
+        net_values : dict
+            Maps the addresses of a bundle to the sum of their values in it.
+        """
+        inputs = [(a, -v) for a, v in net_values.items() if v < 0]
+        outputs = [(a, v) for a, v in net_values.items() if v > 0]
+        if not inputs or not outputs:
+            return
+        total = sum(v for _, v in inputs)
+        sources = [self._intern(a) for a, _ in inputs]
+        for out_address, out_value in outputs:
+            dst = self._intern(out_address)
+            shares = [divmod(out_value * in_value, total) for _, in_value in inputs]
+            # The value left by the floors goes to the largest remainders
+            left = out_value - sum(q for q, _ in shares)
+            extra = set(sorted(range(len(shares)), key=lambda i: -shares[i][1])[:left])
+            for i, (src, (value, _)) in enumerate(zip(sources, shares)):
+                value += i in extra
+                if value:
+                    self._src.append(src)
+                    self._dst.append(dst)
+                    self._value.append(value)
+        if len(self._src) >= self.compact_size:
+            self._compact()
+
+    def add_bundle(self, transactions) -> None:
+        """Add the transfers of a bundle.
+
+        Parameters
+        ----------
+        transactions : list
+            The transactions of a bundle with address and value, e.g., returned
+            by BundleAssembler.add() or expand_bundles().
+        """
+        net_values = {}
+        for t in transactions:
+            net_values[t['address']] = net_values.get(t['address'], 0) + t['value']
+        self.add_transfers(net_values)
+
+    def add_decoded(self, paths) -> None:
+        """Add the bundles of decoded dmp files, as written by DmpDecode.
+
+        A bundle is added as soon as a row of each of its indexes is read, so
+        only the bundles still incomplete are held, e.g., those split between
+        files by DmpDecode(expand_bundles=True). The bundles still incomplete
+        after the last file are added as they are.
+
+        Parameters
+        ----------
+        paths : list
+            The decoded txt files.
+        """
+        pending = {}
+        for path in paths:
+            with open(path) as f:
+                next(f, None)
+                for line in f:
+                    columns = line.split("\t", _BUNDLE_COLUMN + 1)
+                    bundle = columns[_BUNDLE_COLUMN]
+                    entry = pending.get(bundle)
+                    if entry is None:
+                        entry = pending[bundle] = ({}, set())
+                    net_values, indexes = entry
+                    address = columns[_ADDRESS_COLUMN]
+                    net_values[address] = net_values.get(address, 0) + int(columns[_VALUE_COLUMN])
+                    indexes.add(columns[_CURRENT_INDEX_COLUMN])
+                    if len(indexes) > int(columns[_LAST_INDEX_COLUMN]):
+                        del pending[bundle]
+                        self.add_transfers(net_values)
+        for net_values, _ in pending.values():
+            self.add_transfers(net_values)
+
+    def _compact(self) -> None:
+        new = (np.frombuffer(self._src, dtype=np.int64).copy(),
+               np.frombuffer(self._dst, dtype=np.int64).copy(),
+               np.frombuffer(self._value, dtype=np.int64).copy(),
+               np.ones(len(self._src), dtype=np.int64))
+        self._src, self._dst, self._value = array('q'), array('q'), array('q')
+        self._edges = _aggregate(*(np.concatenate((old, n)) for old, n in zip(self._edges, new)))
+
+    def build(self) -> FlowGraph:
+        """Return the FlowGraph of the transfers added so far."""
+        self._compact()
+        src, dst, value, count = self._edges
+        indptr = np.zeros(len(self._addresses) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(self._addresses)), out=indptr[1:])
+        addresses = np.array([a.encode("ascii") if isinstance(a, str) else bytes(a)
+                              for a in self._addresses], dtype='S')
+        return FlowGraph(addresses, indptr, dst, value, count)
@@ -0,0 +1,210 @@
+import os
+from os import listdir
+from os.path import isfile, join
+import logging
+import numpy as np
+from ..common.trytes import slice_batch
+from ..importer.dmpreader import DmpReader
+
+__all__ = [
+    'TangleDag',
+]
+
+_ARRAYS = ('hashes', 'known', 'trunk', 'branch', 'indptr', 'approvers')
+
+
+def _gather(indptr, indices, nodes) -> np.ndarray:
+    """Return the concatenated CSR rows of the nodes."""
+    starts = indptr[nodes]
+    lengths = indptr[nodes + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    shifts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return indices[np.arange(total) + shifts]
+
+
+class TangleDag():
+    """
+    Approvee and approver index of the tangle, from the trunk and branch of
+    the transactions.
+
+    The transaction hashes, including the ones only referenced as trunk or
+    branch, are interned to integer ids by their sorted order. The approvees
+    of transaction i are trunk[i] and branch[i] (-1 if i is not in the dmp
+    files), and its approvers are approvers[indptr[i]:indptr[i+1]], so a
+    cone is a breadth-first search over arrays, one numpy pass per depth.
+
+
+    Attributes
+    ----------
+    hashes : np.ndarray
+        The "S81" sorted transaction hashes, indexed by id.
+    known : np.ndarray
+        Whether each transaction is in the dmp files.
+
+    Methods
+    -------
+    from_dmp()
+        Build the index of the dmp files of a folder.
+    approvers()
+        Return the transactions referencing a transaction within a depth.
+    approvees()
+        Return the transactions referenced by a transaction within a depth.
+    future_cone_size()
+        Return the number of transactions referencing a transaction.
+    past_cone_size()
+        Return the number of transactions referenced by a transaction.
+    tips()
+        Return the transactions which no transaction references.
+    """
+
+    def __init__(self, hashes, known, trunk, branch, indptr, approvers) -> None:
+        self.hashes = hashes
+        self.known = known
+        self.trunk = trunk
+        self.branch = branch
+        self.indptr = indptr
+        self._approvers = approvers
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def __str__(self):
+        return (f'Transactions: {int(self.known.sum())}\n' +
+                f'Referenced only: {len(self) - int(self.known.sum())}')
+
+    @classmethod
+    def from_arrays(cls, hashes, trunks, branches) -> 'TangleDag':
+        """Build the index of transactions.
+
+        Parameters
+        ----------
+        hashes, trunks, branches : np.ndarray
+            The "S81" hash, trunk and branch of each transaction.
+
+        """
+        hashes = np.asarray(hashes, dtype='S81')
+        trunks = np.asarray(trunks, dtype='S81')
+        branches = np.asarray(branches, dtype='S81')
+        nodes = np.unique(np.concatenate((hashes, trunks, branches)))
+        ids = np.searchsorted(nodes, hashes)
+        known = np.zeros(len(nodes), dtype=bool)
+        known[ids] = True
+        trunk = np.full(len(nodes), -1, dtype=np.int64)
+        branch = np.full(len(nodes), -1, dtype=np.int64)
+        trunk[ids] = np.searchsorted(nodes, trunks)
+        branch[ids] = np.searchsorted(nodes, branches)
+
+        # Reverse edges in CSR form; an approver is listed once if its trunk is its branch
+        src = np.concatenate((np.nonzero(known)[0], np.nonzero(known & (trunk != branch))[0]))
+        dst = np.concatenate((trunk[known], branch[known & (trunk != branch)]))
+        order = np.argsort(dst, kind='stable')
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=len(nodes)), out=indptr[1:])
+        return cls(nodes, known, trunk, branch, indptr, src[order])
+
+    @classmethod
+    def from_dmp(cls, dmp_folder: str) -> 'TangleDag':
+        """Build the index of the dmp files of a folder."""
+        hashes, trunks, branches = [], [], []
+        for filename in sorted(listdir(dmp_folder)):
+            filepath = join(dmp_folder, filename)
+            if not isfile(filepath):
+                continue
+            with DmpReader(filepath) as reader:
+                for block in reader.blocks():
+                    columns = slice_batch(block.rows, ('trunk_transaction_hash', 'branch_transaction_hash'))
+                    hashes.append(block.hashes.copy())
+                    trunks.append(columns['trunk_transaction_hash'])
+                    branches.append(columns['branch_transaction_hash'])
+            logging.info(f"Indexed the trunks and branches of {filename}")
+        if not hashes:
+            return cls.from_arrays([], [], [])
+        return cls.from_arrays(np.concatenate(hashes), np.concatenate(trunks),
+                               np.concatenate(branches))
+
+    def save(self, folder: str) -> None:
+        """Write the index to a folder of .npy arrays."""
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        for name, array in zip(_ARRAYS, (self.hashes, self.known, self.trunk,
+                                         self.branch, self.indptr, self._approvers)):
+            np.save(join(folder, f'{name}.npy'), array)
+
+    @classmethod
+    def load(cls, folder: str) -> 'TangleDag':
+        """Read an index written by save(), memory-mapping the arrays."""
+        return cls(*(np.load(join(folder, f'{name}.npy'), mmap_mode='r') for name in _ARRAYS))
+
+    def _ids(self, transaction_hashes) -> np.ndarray:
+        if isinstance(transaction_hashes, (str, bytes)):
+            transaction_hashes = [transaction_hashes]
+        keys = np.array([h.encode("ascii") if isinstance(h, str) else h
+                         for h in transaction_hashes], dtype='S81')
+        if len(self.hashes) == 0:
+            return np.zeros(0, dtype=np.int64)
+        ids = np.searchsorted(self.hashes, keys).clip(max=len(self.hashes) - 1)
+        return np.unique(ids[self.hashes[ids] == keys])
+
+    def _past(self, nodes) -> np.ndarray:
+        nodes = nodes[self.known[nodes]]
+        return np.concatenate((self.trunk[nodes], self.branch[nodes]))
+
+    def _future(self, nodes) -> np.ndarray:
+        return _gather(self.indptr, self._approvers, nodes)
+
+    def _cone(self, transaction_hashes, step, depth) -> np.ndarray:
+        visited = np.zeros(len(self), dtype=bool)
+        frontier = self._ids(transaction_hashes)
+        visited[frontier] = True
+        level = 0
+        while frontier.size and (depth is None or level < depth):
+            frontier = np.unique(step(frontier))
+            frontier = frontier[~visited[frontier]]
+            visited[frontier] = True
+            level += 1
+        # The cone does not include the start transactions
+        visited[self._ids(transaction_hashes)] = False
+        return np.nonzero(visited)[0]
+
+    def _as_str(self, ids) -> list:
+        return [h.decode("ascii") for h in self.hashes[ids]]
+
+    def approvers(self, transaction_hashes, depth=1) -> list:
+        """Return the transactions referencing a transaction within a depth.
+
+        Parameters
+        ----------
+        transaction_hashes : str or list
+            The transaction hash(es) X.
+
+        depth : int
+            The number of trunk/branch references from X, None for the whole future cone.
+
+        Returns
+        ----------
+        The sorted hashes of the transactions which reference X directly or indirectly.
+
+        """
+        return self._as_str(self._cone(transaction_hashes, self._future, depth))
+
+    def approvees(self, transaction_hashes, depth=1) -> list:
+        """Return the transactions referenced by a transaction within a depth, see approvers()."""
+        return self._as_str(self._cone(transaction_hashes, self._past, depth))
+
+    def future_cone_size(self, transaction_hashes, depth=None) -> int:
+        """Return the number of transactions referencing a transaction within a depth."""
+        return len(self._cone(transaction_hashes, self._future, depth))
+
+    def past_cone_size(self, transaction_hashes, depth=None) -> int:
+        """Return the number of transactions referenced by a transaction within a depth.
+
+        The transactions referenced but not in the dmp files are counted.
+
+        """
+        return len(self._cone(transaction_hashes, self._past, depth))
+
+    def tips(self) -> list:
+        """Return the transactions of the dmp files which no transaction references."""
+        return self._as_str(np.nonzero(self.known & (np.diff(self.indptr) == 0))[0])
@@ -0,0 +1,341 @@
+import math
+import os
+import struct
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+
+__all__ = [
+    'BloomFilter',
+    'BloomSet',
+]
+
+_MASK64 = (1 << 64) - 1
+# FNV-1a offset basis and prime, the murmur3 fmix64 multipliers and the seed of the second hash
+_OFFSET = 0xcbf29ce484222325
+_PRIME = 0x100000001b3
+_FMIX1 = 0xff51afd7ed558ccd
+_FMIX2 = 0xc4ceb9fe1a85ec53
+_SEED2 = 0x9e3779b97f4a7c15
+
+
+def _to_bytes(key) -> bytes:
+    return key.encode("ascii") if isinstance(key, str) else bytes(key)
+
+
+def _fmix(h: int) -> int:
+    h = ((h ^ (h >> 33)) * _FMIX1) & _MASK64
+    h = ((h ^ (h >> 33)) * _FMIX2) & _MASK64
+    return h ^ (h >> 33)
+
+
+def _hash_key(key: bytes) -> tuple:
+    """Return the two 64-bit hashes of a key, the same as _hash_column()."""
+    words = -(-len(key) // 8)
+    h = _OFFSET
+    for w in struct.unpack(f'<{words}Q', key.ljust(words * 8, b'\0')):
+        h = ((h ^ w) * _PRIME) & _MASK64
+        h ^= h >> 32
+    return _fmix(h), _fmix(h ^ _SEED2) | 1
+
+
+def _fmix_array(h: np.ndarray) -> np.ndarray:
+    h = (h ^ (h >> np.uint64(33))) * np.uint64(_FMIX1)
+    h = (h ^ (h >> np.uint64(33))) * np.uint64(_FMIX2)
+    return h ^ (h >> np.uint64(33))
+
+
+def _hash_column(column: np.ndarray) -> tuple:
+    """Return the two 64-bit hashes of each key of an "S" array.
+
+    The keys are hashed 8 bytes at a time, one numpy pass per word for the
+    whole column, and the null padding of shorter keys is skipped, so a key
+    hashes the same in any column width.
+
+    """
+    column = np.ascontiguousarray(column)
+    n, width = len(column), column.dtype.itemsize
+    words = -(-width // 8)
+    padded = np.zeros((n, words * 8), dtype=np.uint8)
+    padded[:, :width] = column.view(np.uint8).reshape(n, width)
+    padded = padded.view('<u8')
+    key_words = (np.char.str_len(column) + 7) // 8
+    h = np.full(n, _OFFSET, dtype=np.uint64)
+    for j in range(words):
+        step = (h ^ padded[:, j]) * np.uint64(_PRIME)
+        step ^= step >> np.uint64(32)
+        h = np.where(key_words > j, step, h)
+    return _fmix_array(h), _fmix_array(h ^ np.uint64(_SEED2)) | np.uint64(1)
+
+
+def _as_column(column) -> np.ndarray:
+    column = np.asarray(column)
+    if column.dtype.kind != 'S':
+        column = np.char.encode(column.astype(str), "ascii") if column.size else np.zeros(0, dtype='S1')
+    return column
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 an attached block is tracked, and unlinked or
+        # reported as leaked when the attaching process exits
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _release(blocks, owner_pid: int) -> None:
+    if os.getpid() != owner_pid:
+        # A forked copy, the creating process frees the blocks
+        return
+    for shm in blocks:
+        # An attachment in this process, or in a process sharing its
+        # resource tracker, may have unregistered the block
+        resource_tracker.register(shm._name, "shared_memory")
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            shm.close()
+        except BufferError:
+            # Arrays still view the block; it is unmapped when they are gone
+            pass
+
+
+class _SharedBlock():
+    """A bytes block, optionally placed in shared memory, which pickles by name."""
+
+    def __init__(self, size: int, shared: bool) -> None:
+        self.shm = None
+        if shared:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+            self.buf = self.shm.buf
+        else:
+            self.buf = bytearray(max(1, size))
+
+    def __getstate__(self):
+        if self.shm is not None:
+            return {'name': self.shm.name}
+        return {'data': bytes(self.buf)}
+
+    def __setstate__(self, state):
+        if 'name' in state:
+            # Attach without copying; the creator owns and unlinks the block
+            self.shm = _attach(state['name'])
+            self.buf = self.shm.buf
+        else:
+            self.shm = None
+            self.buf = bytearray(state['data'])
+
+
+class BloomFilter():
+    """
+    Bloom filter for tryte strings, backed by a bytearray or shared memory.
+
+    When created with shared=True, pickling the filter (e.g., to send it to
+    mp.Pool workers) only pickles the shared memory name, so all the processes
+    read the same bits.
+
+
+    Attributes
+    ----------
+    size : int
+        The number of bits.
+    hash_count : int
+        The number of bit positions per key.
+
+    Methods
+    -------
+    add()
+        Add a key to the filter.
+    add_batch()
+        Add a column of keys at once.
+    contains_batch()
+        Test a column of keys at once.
+    """
+
+    def __init__(self, capacity: int, fp_rate=0.01, shared=True) -> None:
+        """
+        Parameters
+        ----------
+        capacity : int
+            The expected number of keys.
+
+        fp_rate : float
+            The target false-positive rate at capacity.
+
+        shared : bool
+            Place the bits in shared memory instead of a bytearray.
+        """
+        if not 0 < fp_rate < 1:
+            raise ValueError(f"The false-positive rate {fp_rate} is not in (0, 1)!")
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._block = _SharedBlock((self.size + 7) // 8, shared)
+
+    def __str__(self):
+        return (f'Bits: {self.size}\n' +
+                f'Hashes: {self.hash_count}')
+
+    def _positions(self, key) -> list:
+        h1, h2 = _hash_key(_to_bytes(key))
+        return [((h1 + i * h2) & _MASK64) % self.size for i in range(self.hash_count)]
+
+    def _positions_batch(self, column) -> np.ndarray:
+        h1, h2 = _hash_column(column)
+        i = np.arange(self.hash_count, dtype=np.uint64)
+        return (h1[:, None] + i * h2[:, None]) % np.uint64(self.size)
+
+    def add(self, key) -> None:
+        """Add a key (str or bytes) to the filter."""
+        buf = self._block.buf
+        for p in self._positions(key):
+            buf[p >> 3] |= 1 << (p & 7)
+
+    def add_batch(self, column) -> None:
+        """Add a column of keys at once, see contains_batch()."""
+        column = _as_column(column)
+        if not len(column):
+            return
+        positions = self._positions_batch(column).ravel()
+        bits = np.frombuffer(self._block.buf, dtype=np.uint8)
+        np.bitwise_or.at(bits, positions >> np.uint64(3),
+                         (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+
+    def __contains__(self, key) -> bool:
+        buf = self._block.buf
+        return all(buf[p >> 3] >> (p & 7) & 1 for p in self._positions(key))
+
+    def contains_batch(self, column) -> np.ndarray:
+        """Test a column of keys at once.
+
+        The bit positions of all the keys are computed with numpy, without a
+        Python loop over the keys.
+
+        Parameters
+        ----------
+        column : iterable
+            The keys, e.g., an "S81" array returned by slice_batch().
+
+        Returns
+        ----------
+        mask : np.ndarray
+            May exist (True) or definitely not exist (False) for each key.
+
+        """
+        column = _as_column(column)
+        if not len(column):
+            return np.zeros(0, dtype=bool)
+        positions = self._positions_batch(column)
+        bits = np.frombuffer(self._block.buf, dtype=np.uint8)
+        hits = (bits[positions >> np.uint64(3)] >> (positions & np.uint64(7))) & 1
+        return hits.all(axis=1)
+
+
+class BloomSet():
+    """
+    Compact read-only set of tryte strings with a Bloom filter pre-screen.
+
+    The keys are stored once as a sorted fixed-width bytes array, and a key
+    is looked up in it (by binary search) only when the Bloom filter reports
+    a possible hit. With shared=True both live in shared memory, so the set
+    is pickled to worker processes by name instead of by content.
+
+
+    Methods
+    -------
+    contains_batch()
+        Test a column of keys at once.
+    release()
+        Free the shared memory (only in the creating process).
+    """
+
+    def __init__(self, keys, fp_rate=0.01, shared=True) -> None:
+        """
+        Parameters
+        ----------
+        keys : iterable
+            The tryte strings (str or bytes) in the set.
+
+        fp_rate : float
+            The false-positive rate of the Bloom filter pre-screen.
+
+        shared : bool
+            Place the set in shared memory.
+        """
+        encoded = sorted({_to_bytes(k) for k in keys})
+        self._width = max((len(k) for k in encoded), default=1)
+        self._length = len(encoded)
+        self._bloom = BloomFilter(self._length, fp_rate, shared)
+        self._block = _SharedBlock(self._length * self._width, shared)
+        keys_array = self._keys()
+        keys_array[:] = encoded
+        self._bloom.add_batch(keys_array)
+        blocks = [b.shm for b in (self._bloom._block, self._block) if b.shm is not None]
+        self._finalizer = weakref.finalize(self, _release, blocks, os.getpid())
+
+    def __getstate__(self):
+        return {'bloom': self._bloom, 'block': self._block,
+                'width': self._width, 'length': self._length}
+
+    def __setstate__(self, state):
+        self._bloom = state['bloom']
+        self._block = state['block']
+        self._width = state['width']
+        self._length = state['length']
+        self._finalizer = None
+
+    def _keys(self) -> np.ndarray:
+        return np.ndarray((self._length,), dtype=f'S{self._width}',
+                          buffer=self._block.buf)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return (k.decode("ascii") for k in self._keys())
+
+    def __repr__(self):
+        return f'BloomSet({self._length} keys, {self._bloom.size} bits)'
+
+    def __contains__(self, key) -> bool:
+        if not isinstance(key, (str, bytes, bytearray, memoryview)) or key not in self._bloom:
+            return False
+        key = _to_bytes(key)
+        keys = self._keys()
+        i = keys.searchsorted(key)
+        return i < self._length and keys[i] == key
+
+    def contains_batch(self, column) -> np.ndarray:
+        """Test a column of keys at once.
+
+        Parameters
+        ----------
+        column : iterable
+            The keys, e.g., an "S81" array returned by slice_batch().
+
+        Returns
+        ----------
+        mask : np.ndarray
+            Exist or not for each key.
+
+        """
+        column = _as_column(column)
+        mask = self._bloom.contains_batch(column)
+        hits = np.nonzero(mask)[0]
+        if hits.size and self._length:
+            keys = self._keys()
+            idx = keys.searchsorted(column[hits]).clip(max=self._length - 1)
+            mask[hits] = keys[idx] == column[hits]
+        else:
+            mask[:] = False
+        return mask
+
+    def release(self) -> None:
+        """Free the shared memory. Only the creating process can release it."""
+        if self._finalizer is not None:
+            self._finalizer()
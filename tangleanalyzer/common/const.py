@@ -5,6 +5,11 @@ MILESTONES_USING_TIMESTAMP_ONLY: set([str]) = set(
 For the transactions with milestones in MILESTONES_USING_TIMESTAMP_ONLY, the timestamp is used directly.
 For other transactions, the attachmentTimestamp will be used if it is not zero, else timestamp is used.
 """
+LIVE_MILESTONE = 'zmq'
+"""
+The milestone given to the transactions received from zmq. The time filters use their timestamp directly,
+as for the milestones in MILESTONES_USING_TIMESTAMP_ONLY.
+"""
 TRANSACTION_HASH_LENGTH = 81
 ZMQ_TRYTES_TOPIC_OFFSET = 7
 OFFSET = [2187, 81, 27, 27, 9, 9, 9, 81, 81, 81, 27, 9, 9, 9, 27]
@@ -41,3 +46,7 @@ NONCE_E = NONCE_B + OFFSET[14]
 """
 The offset of each field in trytes
 """
+TRANSACTION_LENGTH = NONCE_E
+"""
+The length of a transaction in trytes
+"""
@@ -0,0 +1,294 @@
+import numpy as np
+from . import tryte_to_int
+from .const import (
+    TRANSACTION_LENGTH,
+    SIGNATURE_B,
+    SIGNATURE_E,
+    ADDRESS_B,
+    ADDRESS_E,
+    OBSOLETE_TAG_B,
+    OBSOLETE_TAG_E,
+    BUNDLE_HASH_B,
+    BUNDLE_HASH_E,
+    TRUNK_B,
+    TRUNK_E,
+    BRANCH_B,
+    BRANCH_E,
+    TAG_B,
+    TAG_E,
+    NONCE_B,
+    NONCE_E,
+    VALUE_B,
+    VALUE_E,
+    TIMESTAMP_B,
+    TIMESTAMP_E,
+    CURRENT_IDX_B,
+    CURRENT_IDX_E,
+    LAST_IDX_B,
+    LAST_IDX_E,
+    ATCH_TIMESTAMP_B,
+    ATCH_TIMESTAMP_E,
+    ATCH_TIMESTAMP_LOWER_B,
+    ATCH_TIMESTAMP_LOWER_E,
+    ATCH_TIMESTAMP_UPPER_B,
+    ATCH_TIMESTAMP_UPPER_E
+)
+
+__all__ = [
+    'TRYTE_TABLE',
+    'INT_FIELDS',
+    'STR_FIELDS',
+    'rows_view',
+    'decode_batch',
+    'slice_batch',
+    'BatchColumns',
+    'LazyTransaction',
+]
+
+_INVALID_TRYTE = -128
+
+TRYTE_TABLE = np.full(256, _INVALID_TRYTE, dtype=np.int8)
+"""
+Lookup table from the ASCII code of a tryte to its balanced ternary value.
+"""
+TRYTE_TABLE[ord('9')] = 0
+for _i, _c in enumerate('ABCDEFGHIJKLM', 1):
+    TRYTE_TABLE[ord(_c)] = _i
+for _i, _c in enumerate('NOPQRSTUVWXYZ'):
+    TRYTE_TABLE[ord(_c)] = _i - 13
+
+INT_FIELDS = {
+    'value': (VALUE_B, VALUE_E),
+    'timestamp': (TIMESTAMP_B, TIMESTAMP_E),
+    'current_index': (CURRENT_IDX_B, CURRENT_IDX_E),
+    'last_index': (LAST_IDX_B, LAST_IDX_E),
+    'attachment_timestamp': (ATCH_TIMESTAMP_B, ATCH_TIMESTAMP_E),
+    'attachment_timestamp_lower_bound': (ATCH_TIMESTAMP_LOWER_B, ATCH_TIMESTAMP_LOWER_E),
+    'attachment_timestamp_upper_bound': (ATCH_TIMESTAMP_UPPER_B, ATCH_TIMESTAMP_UPPER_E),
+}
+"""
+The numeric fields of a transaction and their (begin, end) locations in trytes.
+"""
+
+STR_FIELDS = {
+    'signature_message_fragment': (SIGNATURE_B, SIGNATURE_E),
+    'address': (ADDRESS_B, ADDRESS_E),
+    'legacy_tag': (OBSOLETE_TAG_B, OBSOLETE_TAG_E),
+    'bundle_hash': (BUNDLE_HASH_B, BUNDLE_HASH_E),
+    'trunk_transaction_hash': (TRUNK_B, TRUNK_E),
+    'branch_transaction_hash': (BRANCH_B, BRANCH_E),
+    'tag': (TAG_B, TAG_E),
+    'nonce': (NONCE_B, NONCE_E),
+}
+"""
+The tryte fields of a transaction and their (begin, end) locations in trytes.
+"""
+
+# 27 ** 13 is the largest power of 27 whose balanced sums still fit into int64.
+_INT64_TRYTES = 13
+_POWERS = 27 ** np.arange(_INT64_TRYTES, dtype=np.int64)
+
+_COLUMNS = np.concatenate([np.arange(b, e) for b, e in INT_FIELDS.values()])
+_SPANS = {}
+_pos = 0
+for _name, (_b, _e) in INT_FIELDS.items():
+    _SPANS[_name] = (_pos, _pos + _e - _b)
+    _pos += _e - _b
+
+
+def rows_view(buffer, row_length=TRANSACTION_LENGTH, stride=None, offset=0) -> np.ndarray:
+    """View a buffer of fixed-width tryte rows as a 2-D uint8 array without copying.
+
+        Parameters
+        ----------
+        buffer : bytes-like
+            The buffer holding the rows (bytes, bytearray, mmap or memoryview).
+        row_length : int
+            The number of trytes in each row.
+        stride : int
+            The distance in bytes between the starts of two rows.
+            Defaults to row_length (rows packed back to back).
+        offset : int
+            The location of the first row in the buffer.
+
+        Returns:
+        ----------
+        rows : np.ndarray
+            The (n, row_length) array of tryte codes.
+
+    """
+    stride = row_length if stride is None else stride
+    flat = np.frombuffer(buffer, dtype=np.uint8)[offset:]
+    if flat.size < row_length:
+        return np.empty((0, row_length), dtype=np.uint8)
+    n = (flat.size - row_length) // stride + 1
+    return np.lib.stride_tricks.as_strided(
+        flat, shape=(n, row_length), strides=(stride, 1), writeable=False)
+
+
+def _horner(trytes: np.ndarray) -> np.ndarray:
+    return trytes[:, :_INT64_TRYTES].astype(np.int64) @ _POWERS[:trytes.shape[1]]
+
+
+def decode_batch(buffer, row_length=TRANSACTION_LENGTH, stride=None, offset=0) -> dict:
+    """Decode the numeric fields of a block of transactions in one pass.
+
+        Parameters
+        ----------
+        buffer : bytes-like or np.ndarray
+            The rows to decode, either as a buffer accepted by rows_view()
+            or as a 2-D uint8 array returned by it.
+        row_length : int
+            The number of trytes in each row.
+        stride : int
+            The distance in bytes between the starts of two rows.
+        offset : int
+            The location of the first row in the buffer.
+
+        Returns:
+        ----------
+        columns : dict
+            Maps each name in INT_FIELDS to an int64 array of decoded values.
+
+    """
+    if isinstance(buffer, np.ndarray):
+        rows = buffer
+    else:
+        rows = rows_view(buffer, row_length, stride, offset)
+    trytes = TRYTE_TABLE[rows[:, _COLUMNS]]
+    if (trytes == _INVALID_TRYTE).any():
+        row = int(np.nonzero((trytes == _INVALID_TRYTE).any(axis=1))[0][0])
+        raise ValueError(f"Cannot decode non-tryte characters in row {row}!")
+
+    columns = {}
+    for name, (b, e) in _SPANS.items():
+        field = trytes[:, b:e]
+        values = _horner(field)
+        if e - b > _INT64_TRYTES:
+            overflow = np.nonzero(field[:, _INT64_TRYTES:].any(axis=1))[0]
+            for row in overflow:
+                exact = sum(int(t) * 27 ** p for p, t in enumerate(field[row]))
+                if not -2 ** 63 <= exact < 2 ** 63:
+                    raise ValueError(
+                        f"The {name} in row {row} does not fit into int64!")
+                values[row] = exact
+        columns[name] = values
+    return columns
+
+
+def slice_batch(buffer, names=None, row_length=TRANSACTION_LENGTH, stride=None, offset=0) -> dict:
+    """Slice the tryte fields of a block of transactions into fixed-width columns.
+
+        Parameters
+        ----------
+        buffer : bytes-like or np.ndarray
+            The rows to slice, either as a buffer accepted by rows_view()
+            or as a 2-D uint8 array returned by it.
+        names : iterable
+            The names in STR_FIELDS to slice. Defaults to all of them.
+        row_length : int
+            The number of trytes in each row.
+        stride : int
+            The distance in bytes between the starts of two rows.
+        offset : int
+            The location of the first row in the buffer.
+
+        Returns:
+        ----------
+        columns : dict
+            Maps each name to an array of dtype "S<width>".
+
+    """
+    if isinstance(buffer, np.ndarray):
+        rows = buffer
+    else:
+        rows = rows_view(buffer, row_length, stride, offset)
+    columns = {}
+    for name in (STR_FIELDS if names is None else names):
+        b, e = STR_FIELDS[name]
+        field = np.ascontiguousarray(rows[:, b:e])
+        columns[name] = field.view(f"S{e - b}").reshape(len(rows))
+    return columns
+
+
+class BatchColumns(dict):
+    """
+    Columns of a block of transactions, decoded or sliced on first access.
+
+    Each numeric field is decoded (all of them in one decode_batch() pass) and
+    each tryte field is sliced only when a filter or writer asks for it.
+    Extra columns such as "hash" or "milestone" can be set as in a dict.
+
+    Attributes
+    ----------
+    rows : np.ndarray
+        The (n, TRANSACTION_LENGTH) array of tryte codes.
+    size : int
+        The number of transactions in the block.
+    """
+
+    def __init__(self, buffer, row_length=TRANSACTION_LENGTH, stride=None, offset=0, **columns) -> None:
+        """
+        Parameters
+        ----------
+        buffer : bytes-like or np.ndarray
+            The rows, either as a buffer accepted by rows_view()
+            or as a 2-D uint8 array returned by it.
+        columns :
+            Extra columns of the block.
+        """
+        super().__init__(**columns)
+        if isinstance(buffer, np.ndarray):
+            self.rows = buffer
+        else:
+            self.rows = rows_view(buffer, row_length, stride, offset)
+        self.size = len(self.rows)
+
+    def __missing__(self, name):
+        if name in INT_FIELDS:
+            self.update(decode_batch(self.rows))
+        elif name in STR_FIELDS:
+            self.update(slice_batch(self.rows, (name,)))
+        else:
+            raise KeyError(name)
+        return self[name]
+
+
+class LazyTransaction(dict):
+    """
+    Fields of a single transaction, decoded or sliced on first access.
+
+    The scalar counterpart of BatchColumns: each field is taken from the
+    trytes at most once however many filters look at it.
+
+    Attributes
+    ----------
+    trytes : str
+        The transaction trytes.
+    """
+
+    def __init__(self, trytes, **fields) -> None:
+        """
+        Parameters
+        ----------
+        trytes : str, bytes or memoryview
+            The transaction trytes.
+        fields :
+            Extra fields of the transaction, e.g., "hash" or "milestone".
+        """
+        super().__init__(**fields)
+        self.trytes = trytes
+
+    def __missing__(self, name):
+        if name in INT_FIELDS:
+            value = tryte_to_int(self.trytes, *INT_FIELDS[name])
+        elif name in STR_FIELDS:
+            b, e = STR_FIELDS[name]
+            value = self.trytes[b:e]
+            if not isinstance(value, str):
+                # Only the field is copied out of bytes or memoryview trytes
+                value = str(value, 'ascii')
+        else:
+            raise KeyError(name)
+        self[name] = value
+        return value
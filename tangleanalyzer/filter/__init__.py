@@ -1,11 +1,17 @@
 from .address import AddressFilter
+from .address_prefix import AddressPrefixFilter
 from .branch_transaction_hash import BranchTransactionHashFilter
 from .bundle import BundleFilter
 from .nonce import NonceFilter
 from .obsolete_tag import ObsoleteTagFilter
 from .signature_message_fragment import SignatureMessageFragmentFilter
 from .tag import TagFilter
+from .tag_prefix import TagPrefixFilter
 from .time import TimeFilter
 from .transaction_hash import TransactionHashFilter
 from .trunk_transaction_hash import TrunkTransactionHashFilter
 from .value import ValueFilter
+from .multi_time import MultiTimeFilter
+from .multi_value import MultiValueFilter
+from .base_filter import combine_batch_filters
+from .plan import FilterPlan
@@ -17,11 +17,13 @@ class AddressFilter(SetFilter):
         The address set for monitoring.
     """
 
-    def __init__(self, address_set: set) -> None:
+    def __init__(self, address_set: set, bloom_fp_rate=None) -> None:
         """
         Parameters
         ----------
         address_set : set
             The set of addresses for monitoring.
+        bloom_fp_rate : float
+            The false-positive rate of the optional Bloom filter pre-screen for very large sets.
         """
-        super().__init__('address', address_set, ADDRESS_B, ADDRESS_E)
+        super().__init__('address', address_set, ADDRESS_B, ADDRESS_E, bloom_fp_rate)
@@ -0,0 +1,27 @@
+from .base_filter import PrefixSetFilter
+from ..common.const import ADDRESS_B, ADDRESS_E
+
+__all__ = [
+    'AddressPrefixFilter',
+]
+
+
+class AddressPrefixFilter(PrefixSetFilter):
+    """
+    Address prefix filter for transactions.
+
+
+    Pamameters
+    ----------
+    address_prefix_set : set
+        The address prefix set for monitoring.
+    """
+
+    def __init__(self, address_prefix_set: set) -> None:
+        """
+        Parameters
+        ----------
+        address_prefix_set : set
+            The set of address prefixes for monitoring.
+        """
+        super().__init__('address', address_prefix_set, ADDRESS_B, ADDRESS_E)
@@ -1,2 +1,5 @@
 from .set_filter import SetFilter
 from .range_filter import RangeFilter
+from .batch_filter import combine_batch_filters
+from .multi_range_filter import MultiRangeFilter
+from .prefix_set_filter import PrefixSetFilter
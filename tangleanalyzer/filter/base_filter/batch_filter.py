@@ -0,0 +1,44 @@
+from typing import Callable
+import numpy as np
+
+__all__ = [
+    'combine_batch_filters',
+]
+
+
+def combine_batch_filters(batch_filter_list: list, logic='and') -> Callable:
+    """Combine batch filters into one batch filter.
+
+    Parameters
+    ----------
+    batch_filter_list : list
+        The batch filters built by make_batch_filter().
+
+    logic : str
+        "and" to reserve transactions passing all the filters,
+        "or" to reserve transactions passing any of the filters.
+
+    Returns
+    ----------
+    The combined batch filter, which maps a dict of columns to a boolean mask.
+
+    """
+    if logic == 'and':
+        reduce = np.logical_and.reduce
+    elif logic == 'or':
+        reduce = np.logical_or.reduce
+    else:
+        raise ValueError(
+            f"Cannot identify {logic}, please use \"and\" or \"or\"!")
+
+    def combined(batch: dict) -> np.ndarray:
+        masks = [f(batch) for f in batch_filter_list]
+        if not masks:
+            size = getattr(batch, 'size', None)
+            if size is None:
+                size = next((len(v) for v in batch.values()
+                             if isinstance(v, np.ndarray)), 0)
+            return np.ones(size, dtype=bool)
+        return reduce(masks)
+
+    return combined
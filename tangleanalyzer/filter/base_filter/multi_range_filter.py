@@ -0,0 +1,217 @@
+from typing import Callable
+from bisect import bisect_right
+import numpy as np
+from ...common import tryte_to_int
+
+__all__ = [
+    'MultiRangeFilter',
+]
+
+_INF = float('inf')
+
+
+class MultiRangeFilter():
+    """
+    Filter for transactions against many ranges at once.
+
+    The ranges are compiled into sorted, disjoint intervals, so the membership
+    of a value is answered with one binary search however many ranges are given.
+
+
+    Attributes
+    ----------
+    intervals : list
+        The compiled (low, low_closed, high, high_closed) intervals.
+
+    Methods
+    -------
+    make_filter()
+        Return the built multi-range filter
+    make_batch_filter()
+        Return the built multi-range filter for a batch of transactions
+    """
+
+    def __init__(self, name: str, ranges: list, begin: int, end: int, logic='or') -> None:
+        """
+        Parameters
+        ----------
+        name : str
+            The filter name.
+
+        ranges : list
+            The (min, max, rlse) tuples, where rlse is one of
+            'R', 'm', 'M', 'E', 'RE', 'mE' and 'ME' as in RangeFilter.make_filter().
+
+        begin : int
+            The begin location of the field in the transaction string.
+
+        end : int
+            The end location of the field in the transaction string.
+
+        logic : str
+            "or" to reserve values in any of the ranges (union),
+            "and" to reserve values in all of the ranges (intersection).
+        """
+        self._name = name
+        self._begin = begin
+        self._end = end
+        self._logic = logic
+        bounds = [self._to_interval(*r) for r in ranges]
+        if logic == 'or':
+            self.intervals = self._union(bounds)
+        elif logic == 'and':
+            self.intervals = self._intersection(bounds)
+        else:
+            raise ValueError(
+                f"Cannot identify {logic}, please use \"and\" or \"or\"!")
+        self._lows = [i[0] for i in self.intervals]
+        self._low_array = np.array(self._lows, dtype=float)
+        self._low_closed_array = np.array(
+            [i[1] for i in self.intervals], dtype=bool)
+        self._high_array = np.array(
+            [i[2] for i in self.intervals], dtype=float)
+        self._high_closed_array = np.array(
+            [i[3] for i in self.intervals], dtype=bool)
+
+    def __str__(self):
+        return (f'Name: {self._name}\n' +
+                f'Logic: {self._logic}\n' +
+                f'Intervals: {self.intervals}\n' +
+                f'Begin: {self._begin}\n' +
+                f'End: {self._end}')
+
+    @staticmethod
+    def _to_interval(min, max, range_larger_smaller) -> tuple:
+        if range_larger_smaller == 'R':
+            return (min, False, max, False)
+        elif range_larger_smaller == 'm':
+            return (min, False, _INF, False)
+        elif range_larger_smaller == 'M':
+            return (-_INF, False, max, False)
+        elif range_larger_smaller == 'E':
+            return (min, True, min, True)
+        elif range_larger_smaller == 'RE':
+            return (min, True, max, True)
+        elif range_larger_smaller == 'mE':
+            return (min, True, _INF, False)
+        elif range_larger_smaller == 'ME':
+            return (-_INF, False, max, True)
+        else:
+            raise ValueError(
+                f"Cannot identify {range_larger_smaller} in multi-range filter!")
+
+    @staticmethod
+    def _is_empty(interval: tuple) -> bool:
+        low, low_closed, high, high_closed = interval
+        return low > high or (low == high and not (low_closed and high_closed))
+
+    @classmethod
+    def _union(cls, bounds: list) -> list:
+        merged = []
+        # Closed lower bounds go first among equal lows
+        for interval in sorted(bounds, key=lambda i: (i[0], not i[1])):
+            if cls._is_empty(interval):
+                continue
+            if merged:
+                low, low_closed, high, high_closed = merged[-1]
+                if interval[0] < high or (interval[0] == high and (interval[1] or high_closed)):
+                    if interval[2] > high:
+                        high, high_closed = interval[2], interval[3]
+                    elif interval[2] == high:
+                        high_closed = high_closed or interval[3]
+                    merged[-1] = (low, low_closed, high, high_closed)
+                    continue
+            merged.append(interval)
+        return merged
+
+    @classmethod
+    def _intersection(cls, bounds: list) -> list:
+        if not bounds:
+            return []
+        # An open bound is tighter than a closed one at the same value
+        low, low_closed = max(((i[0], i[1]) for i in bounds),
+                              key=lambda b: (b[0], not b[1]))
+        high, high_closed = min(((i[2], i[3]) for i in bounds),
+                                key=lambda b: (b[0], b[1]))
+        interval = (low, low_closed, high, high_closed)
+        return [] if cls._is_empty(interval) else [interval]
+
+    def _contains(self, value) -> bool:
+        i = bisect_right(self._lows, value) - 1
+        if i < 0:
+            return False
+        low, low_closed, high, high_closed = self.intervals[i]
+        return ((value > low or (low_closed and value == low)) and
+                (value < high or (high_closed and value == high)))
+
+    def _value_for_str(self, transaction: str):
+        return tryte_to_int(transaction, self._begin, self._end)
+
+    def _value_for_dict(self, transaction: dict):
+        return transaction[self._name]
+
+    def _values_for_batch(self, batch: dict) -> np.ndarray:
+        return np.asarray(batch[self._name])
+
+    def _for_str(self, transaction: str) -> bool:
+        try:
+            value = self._value_for_str(transaction)
+        except:
+            raise ValueError(
+                f'Cannot perform {self._name} multi-range filtering!')
+        return self._contains(value)
+
+    def _for_dict(self, transaction: dict) -> bool:
+        try:
+            value = self._value_for_dict(transaction)
+        except:
+            raise ValueError(
+                f'Cannot perform {self._name} multi-range filtering!')
+        return self._contains(value)
+
+    def _for_batch(self, batch: dict) -> np.ndarray:
+        try:
+            values = self._values_for_batch(batch)
+        except:
+            raise ValueError(
+                f"Objects for {self._name} filtering do not have the field!")
+        if not self.intervals:
+            return np.zeros(values.shape, dtype=bool)
+        i = np.searchsorted(self._low_array, values, side='right') - 1
+        found = i >= 0
+        i = i.clip(min=0)
+        low, high = self._low_array[i], self._high_array[i]
+        return (found &
+                ((values > low) | (self._low_closed_array[i] & (values == low))) &
+                ((values < high) | (self._high_closed_array[i] & (values == high))))
+
+    def make_filter(self, filter_type='str') -> Callable:
+        """Make a multi-range filter.
+
+        Parameters
+        ----------
+        filter_type : str
+            Set "str" or "dict" for the filter type.
+
+        Returns
+        ----------
+        The built multi-range filter.
+
+        """
+        if filter_type == 'str':
+            return self._for_str
+        elif filter_type == 'dict':
+            return self._for_dict
+        else:
+            raise ValueError(
+                f"Cannot identify {filter_type}, please use \"str\" or \"dict\"!")
+
+    def make_batch_filter(self) -> Callable:
+        """Make a multi-range filter for a batch of transactions.
+
+        Returns
+        ----------
+        The built multi-range filter, which maps a dict of decoded columns to a boolean mask.
+
+        """
+        return self._for_batch
@@ -0,0 +1,139 @@
+from typing import Callable
+from bisect import bisect_right
+import numpy as np
+from .set_filter import SetFilter
+
+__all__ = [
+    'PrefixSetFilter',
+]
+
+
+class PrefixSetFilter(SetFilter):
+    """
+    PrefixSetFilter for transactions.
+
+    A transaction is reserved if its field starts with any of the prefixes.
+    The prefixes are compiled once into the sorted leaves of their trie:
+    a prefix already covered by a shorter one is dropped, so that the only
+    candidate prefix of a field is its predecessor in sorted order. Matching
+    is then one binary search and one comparison, however many prefixes are given.
+
+
+    Attributes
+    ----------
+    inclusive_set : set
+        The inclusive set contains the prefixes of a transaction field to reserve.
+
+    Methods
+    -------
+    make_filter() :
+        Return the built prefix set filter.
+    make_batch_filter() :
+        Return the built prefix set filter for a batch of transactions.
+    """
+
+    def __init__(self, name: str, prefix_set: set, begin: int, end: int) -> None:
+        """
+        Parameters
+        ----------
+        name : str
+            The filter name.
+
+        prefix_set : set
+            The set of prefixes of a transaction field for monitoring.
+
+        begin : int
+            The begin location of the field in the transaction string.
+
+        end : int
+            The end location of the field in the transaction string.
+        """
+        super().__init__(name, prefix_set, begin, end)
+        self._prefixes = []
+        for prefix in sorted(prefix_set):
+            if self._prefixes and prefix.startswith(self._prefixes[-1]):
+                continue
+            self._prefixes.append(prefix)
+        self._prefix_array = None
+
+    def _match(self, field) -> bool:
+        i = bisect_right(self._prefixes, field) - 1
+        return i >= 0 and field.startswith(self._prefixes[i])
+
+    def _for_dict(self, transaction: dict) -> bool:
+        """Inclusive prefix filter for transaction dict.
+
+        Parameters
+        ----------
+        transaction : dict
+            The transaction for filtering.
+
+        Return
+        ----------
+        exist : bool
+            Exist or not.
+
+        """
+        try:
+            return self._match(transaction[self._name])
+        except:
+            raise ValueError(
+                f"Objects for {self._name} filtering do not have the field!")
+
+    def _for_str(self, transaction: str) -> bool:
+        """Inclusive prefix filter on tryte string directly.
+
+        Parameters
+        ----------
+        transaction : str
+            The transaction for filtering.
+        """
+        try:
+            return self._match(transaction[self._begin:self._end])
+        except:
+            raise ValueError(
+                f"Cannot identify {self._name} in trytes {transaction}!")
+
+    def index_query(self, index):
+        """Make the query of the prefixes for DmpIndex.lookup(), see SetFilter.index_candidates()."""
+        return index.make_query(self._prefixes, prefix=True)
+
+    def _for_batch(self, batch: dict) -> np.ndarray:
+        """Inclusive prefix filter for a batch of transactions.
+
+        Parameters
+        ----------
+        batch : dict
+            Maps the filter name to a column of field slices,
+            e.g., an "S81" array returned by slice_batch().
+
+        Return
+        ----------
+        mask : np.ndarray
+            Exist or not for each transaction.
+
+        """
+        try:
+            column = np.asarray(batch[self._name])
+        except:
+            raise ValueError(
+                f"Objects for {self._name} filtering do not have the field!")
+        if column.dtype.kind != 'S':
+            column = np.char.encode(column.astype(str), "ascii")
+        if not self._prefixes or column.size == 0:
+            return np.zeros(column.shape, dtype=bool)
+        if self._prefix_array is None:
+            self._prefix_array = np.array(
+                [p.encode("ascii") for p in self._prefixes], dtype='S')
+        keys = self._prefix_array
+        i = np.searchsorted(keys, column, side='right') - 1
+        found = i >= 0
+        candidates = keys[i.clip(min=0)]
+
+        # Compare the first len(prefix) trytes of each field with its candidate
+        width = max(column.dtype.itemsize, keys.dtype.itemsize)
+        fields = column.astype(f'S{width}').view(np.uint8).reshape(-1, width)
+        prefixes = candidates.astype(f'S{width}').view(
+            np.uint8).reshape(-1, width)
+        covered = np.arange(width) < np.char.str_len(candidates)[:, None]
+        return found & ((fields == prefixes) | ~covered).all(axis=1)
@@ -1,4 +1,5 @@
 from typing import Callable
+import numpy as np
 from ...common import tryte_to_int
 import logging
 
@@ -23,6 +24,8 @@ class RangeFilter():
     -------
     make_filter()
         Return the built range filter
+    make_batch_filter()
+        Return the built range filter for a batch of transactions
     """
 
     def __init__(self, name: str, min: int, max: int, begin: int, end: int) -> None:
@@ -159,6 +162,68 @@ class RangeFilter():
             raise ValueError(
                 f'Cannot perform {self._name} (v<=max) filtering!')
 
+    def _column(self, batch: dict) -> np.ndarray:
+        try:
+            return np.asarray(batch[self._name])
+        except:
+            raise ValueError(
+                f"Objects for {self._name} filtering do not have the field!")
+
+    def _range_for_batch(self, batch: dict) -> np.ndarray:
+        column = self._column(batch)
+        return (column < self._max) & (column > self._min)
+
+    def _larger_than_min_for_batch(self, batch: dict) -> np.ndarray:
+        return self._column(batch) > self._min
+
+    def _smaller_than_max_for_batch(self, batch: dict) -> np.ndarray:
+        return self._column(batch) < self._max
+
+    def _equal_for_batch(self, batch: dict) -> np.ndarray:
+        return self._column(batch) == self._min
+
+    def _range_with_euqal_for_batch(self, batch: dict) -> np.ndarray:
+        column = self._column(batch)
+        return (column <= self._max) & (column >= self._min)
+
+    def _equal_to_or_larger_than_min_for_batch(self, batch: dict) -> np.ndarray:
+        return self._column(batch) >= self._min
+
+    def _equal_to_or_smaller_than_max_for_batch(self, batch: dict) -> np.ndarray:
+        return self._column(batch) <= self._max
+
+    def make_batch_filter(self, range_larger_smaller='R') -> Callable:
+        """Make a range filter for a batch of transactions.
+
+        Parameters
+        ----------
+        range_larger_smaller_equal : str
+            The same settings as make_filter().
+
+        Returns
+        ----------
+        The built range filter, which maps a dict of decoded columns
+        (e.g., returned by decode_batch()) to a boolean mask.
+
+        """
+        if range_larger_smaller == 'R':
+            return self._range_for_batch
+        elif range_larger_smaller == 'm':
+            return self._larger_than_min_for_batch
+        elif range_larger_smaller == 'M':
+            return self._smaller_than_max_for_batch
+        elif range_larger_smaller == 'E':
+            return self._equal_for_batch
+        elif range_larger_smaller == 'RE':
+            return self._range_with_euqal_for_batch
+        elif range_larger_smaller == 'mE':
+            return self._equal_to_or_larger_than_min_for_batch
+        elif range_larger_smaller == 'ME':
+            return self._equal_to_or_smaller_than_max_for_batch
+        else:
+            raise ValueError(
+                f"Cannot identify {range_larger_smaller} in range filter for batch!")
+
     def make_filter(self, range_larger_smaller='R', filter_type='str') -> Callable:
         """Make a range filter.
 
@@ -1,4 +1,6 @@
 from typing import Callable
+import numpy as np
+from ...common.bloom import BloomSet
 import logging
 
 __all__ = [
@@ -13,16 +15,23 @@ class SetFilter():
 
     Attributes
     ----------
-    inclusive_set : set
-        The inclusive set contains a transaction field to reserve.
+    inclusive_set : frozenset
+        The inclusive set contains a transaction field to reserve. It is
+        copied at construction, so that all the built filters agree.
 
     Methods
     -------
     make_filter() :
         Return the built set filter.
+    make_batch_filter() :
+        Return the built set filter for a batch of transactions.
+    index_query() :
+        Return the query of the inclusive set for a DmpIndex.
+    index_candidates() :
+        Return the offsets of the passing transactions from a DmpIndex.
     """
 
-    def __init__(self, name: str, inclusive_set: set, begin: int, end: int) -> None:
+    def __init__(self, name: str, inclusive_set: set, begin: int, end: int, bloom_fp_rate=None) -> None:
         """
         Parameters
         ----------
@@ -37,11 +46,22 @@ class SetFilter():
 
         end : int
             The end location of the field in the transaction string.
+
+        bloom_fp_rate : float
+            If set, the inclusive set is stored as a BloomSet in shared memory,
+            pre-screened by a Bloom filter with this false-positive rate.
+            Use it for very large sets, which are then not copied into every worker process.
         """
+        if bloom_fp_rate is not None and not isinstance(inclusive_set, BloomSet):
+            inclusive_set = BloomSet(inclusive_set, bloom_fp_rate)
+        elif not isinstance(inclusive_set, BloomSet):
+            # The batch filter caches the sorted keys, so the set must not change
+            inclusive_set = frozenset(inclusive_set)
         self._name = name
         self._inclusive_set = inclusive_set
         self._begin = begin
         self._end = end
+        self._sorted_keys = {}
 
     def __str__(self):
         return (f'Name: {self._name}\n' +
@@ -83,6 +103,82 @@ class SetFilter():
             raise ValueError(
                 f"Cannot identify {self._name} in trytes {transaction}!")
 
+    def _keys_for(self, kind: str) -> np.ndarray:
+        # Sorted copy of the inclusive set, built once per column dtype kind
+        if kind not in self._sorted_keys:
+            keys = sorted(self._inclusive_set)
+            if kind == 'S':
+                keys = [k.encode("ascii") if isinstance(k, str) else k
+                        for k in keys]
+            self._sorted_keys[kind] = np.array(keys, dtype=kind)
+        return self._sorted_keys[kind]
+
+    def _for_batch(self, batch: dict) -> np.ndarray:
+        """Inclusive filter for a batch of transactions.
+
+        Parameters
+        ----------
+        batch : dict
+            Maps the filter name to a column of field slices,
+            e.g., an "S81" array returned by slice_batch().
+
+        Return
+        ----------
+        mask : np.ndarray
+            Exist or not for each transaction.
+
+        """
+        try:
+            column = np.asarray(batch[self._name])
+        except:
+            raise ValueError(
+                f"Objects for {self._name} filtering do not have the field!")
+        if isinstance(self._inclusive_set, BloomSet):
+            return self._inclusive_set.contains_batch(column)
+        keys = self._keys_for('S' if column.dtype.kind == 'S' else 'U')
+        if keys.size == 0 or column.size == 0:
+            return np.zeros(column.shape, dtype=bool)
+        idx = np.searchsorted(keys, column).clip(max=keys.size - 1)
+        return keys[idx] == column
+
+    def index_query(self, index):
+        """Make the query of the inclusive set for DmpIndex.lookup(), see DmpIndex.make_query()."""
+        return index.make_query(self._inclusive_set)
+
+    def index_candidates(self, index, filepath: str, query=None):
+        """Look the inclusive set up in a DmpIndex.
+
+        Parameters
+        ----------
+        index : DmpIndex
+            The index of the dmp files.
+
+        filepath : str
+            The path of the dmp file.
+
+        query :
+            The query made by index_query(), to reuse it across dmp files and chunks.
+
+        Returns
+        ----------
+        The sorted byte offsets of the transactions of the dmp file which
+        pass the filter, or None if the field or the file is not indexed.
+
+        """
+        if query is None:
+            query = self.index_query(index)
+        return index.lookup(filepath, self._name, query)
+
+    def make_batch_filter(self) -> Callable:
+        """Make a set filter for a batch of transactions.
+
+        Returns
+        ----------
+        The built set filter, which maps a dict of columns to a boolean mask.
+
+        """
+        return self._for_batch
+
     def make_filter(self, filter_type="str") -> Callable:
         """Make a set filter.
 
@@ -17,11 +17,13 @@ class BundleFilter(SetFilter):
         The bundle set for monitoring.
     """
 
-    def __init__(self, bundle_set: set) -> None:
+    def __init__(self, bundle_set: set, bloom_fp_rate=None) -> None:
         """
         Parameters
         ----------
         bundle_set : set
             The set of bundles for monitoring.
+        bloom_fp_rate : float
+            The false-positive rate of the optional Bloom filter pre-screen for very large sets.
         """
-        super().__init__('bundle_hash', bundle_set, BUNDLE_HASH_B, BUNDLE_HASH_E)
+        super().__init__('bundle_hash', bundle_set, BUNDLE_HASH_B, BUNDLE_HASH_E, bloom_fp_rate)
@@ -0,0 +1,106 @@
+from typing import Callable
+import numpy as np
+from datetime import datetime
+from time import mktime
+from .base_filter import MultiRangeFilter
+from ..common.const import (
+    MILESTONES_USING_TIMESTAMP_ONLY,
+    LIVE_MILESTONE,
+    TIMESTAMP_B,
+    TIMESTAMP_E,
+    ATCH_TIMESTAMP_B,
+    ATCH_TIMESTAMP_E
+)
+from ..common import tryte_to_int
+
+__all__ = [
+    'MultiTimeFilter',
+]
+
+
+class MultiTimeFilter(MultiRangeFilter):
+    """
+    Time filter for transactions against many date windows
+
+    The time of a transaction is identified in the same way as TimeFilter.
+
+
+    Attributes
+    ----------
+    intervals : list
+        The compiled (low, low_closed, high, high_closed) Unix epoch time intervals
+
+    Methods
+    -------
+    make_filter()
+        Return the built multi-time filter
+    make_dmp_filter()
+        Return the built multi-time filter for dmp data
+    make_batch_filter()
+        Return the built multi-time filter for a batch of transactions
+    """
+
+    def __init__(self, ranges: list, logic='or') -> None:
+        """
+        Parameters
+        ----------
+        ranges : list
+            The (start_date, end_date, rlse) tuples of transactions to monitor,
+            with dates in %Y%m%d (e.g., ("20200101", "20200201", "RE"))
+        logic : str
+            "or" for transactions in any of the windows, "and" for all of them
+        """
+        try:
+            ranges = [(mktime(datetime.strptime(start_date, "%Y%m%d").timetuple()),
+                       mktime(datetime.strptime(end_date, "%Y%m%d").timetuple()),
+                       rlse) for start_date, end_date, rlse in ranges]
+        except ValueError:
+            raise ValueError(
+                "Dates are not supported! Plese use \"%Y%m%d\" instead, e.g., \"20200101\"")
+        super().__init__('time', ranges, TIMESTAMP_B, TIMESTAMP_E, logic)
+
+    def _get_transaction_dmp(self, timestamp: int, attachmenttimestame: int, milestone: str) -> int:
+        if milestone in MILESTONES_USING_TIMESTAMP_ONLY or milestone == LIVE_MILESTONE:
+            return timestamp
+        if attachmenttimestame != 0:
+            return attachmenttimestame/1000
+        else:
+            return timestamp
+
+    def _value_for_dict(self, transaction: dict):
+        return self._get_transaction_dmp(
+            transaction['timestamp'], transaction['attachment_timestamp'],
+            transaction.get('milestone'))
+
+    def _values_for_batch(self, batch: dict) -> np.ndarray:
+        timestamp = np.asarray(batch['timestamp'])
+        milestone = batch.get('milestone')
+        if milestone in MILESTONES_USING_TIMESTAMP_ONLY or milestone == LIVE_MILESTONE:
+            return timestamp
+        attachment_timestamp = np.asarray(batch['attachment_timestamp'])
+        return np.where(attachment_timestamp != 0,
+                        attachment_timestamp/1000, timestamp)
+
+    def _for_dmp(self, transaction_milestone: tuple) -> bool:
+        try:
+            t = self._get_transaction_dmp(
+                tryte_to_int(transaction_milestone[0],
+                             TIMESTAMP_B, TIMESTAMP_E),
+                tryte_to_int(transaction_milestone[0],
+                             ATCH_TIMESTAMP_B, ATCH_TIMESTAMP_E),
+                transaction_milestone[1])
+        except:
+            raise ValueError(
+                "Objects for time filtering do not have time item!")
+        return self._contains(t)
+
+    def make_dmp_filter(self) -> Callable:
+        """Make a multi-time filter for dmp data.
+        When using this filter, the milestone for each transaction should be indicated.
+
+        Returns
+        ----------
+        The built multi-time filter on (trytes, milestone) tuples.
+
+        """
+        return self._for_dmp
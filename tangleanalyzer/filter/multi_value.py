@@ -0,0 +1,36 @@
+from .base_filter import MultiRangeFilter
+from ..common.const import VALUE_B, VALUE_E
+
+__all__ = [
+    'MultiValueFilter',
+]
+
+
+class MultiValueFilter(MultiRangeFilter):
+    """
+    Value filter for transactions against many value ranges
+
+
+    Attributes
+    ----------
+    intervals : list
+        The compiled (low, low_closed, high, high_closed) value intervals
+
+    Methods
+    -------
+    make_filter()
+        Return the built multi-value filter
+    make_batch_filter()
+        Return the built multi-value filter for a batch of transactions
+    """
+
+    def __init__(self, ranges: list, logic='or') -> None:
+        """
+        Parameters
+        ----------
+        ranges : list
+            The (min, max, rlse) tuples of values in transactions for monitoring
+        logic : str
+            "or" for values in any of the ranges, "and" for values in all of them
+        """
+        super().__init__('value', ranges, VALUE_B, VALUE_E, logic)
@@ -0,0 +1,277 @@
+from typing import Callable
+import hashlib
+import numpy as np
+from .base_filter import SetFilter, RangeFilter, MultiRangeFilter, combine_batch_filters
+from .time import TimeFilter
+from .multi_time import MultiTimeFilter
+from ..common.const import TRANSACTION_LENGTH, TRANSACTION_HASH_LENGTH, LIVE_MILESTONE
+from ..common.trytes import LazyTransaction
+
+__all__ = [
+    'FilterPlan',
+]
+
+
+class _TimeStep():
+    """The time filter of a plan, on the trytes as before the plan.
+
+    A transaction with the LIVE_MILESTONE goes through the str filter, which
+    uses its timestamp, and a transaction of a dmp file through the dmp
+    filter, which follows the rule of its milestone.
+    """
+
+    def __init__(self, time_filter, range_larger_smaller) -> None:
+        self._live = time_filter.make_filter(range_larger_smaller)
+        self._dmp = time_filter.make_dmp_filter(range_larger_smaller)
+
+    def __call__(self, transaction) -> bool:
+        milestone = transaction.get('milestone')
+        if milestone == LIVE_MILESTONE:
+            return self._live(transaction.trytes)
+        return self._dmp((transaction.trytes, milestone))
+
+
+class FilterPlan():
+    """
+    Compiled plan of transaction filters.
+
+    The plan collects filter instances instead of built filter functions,
+    so it knows which fields every filter reads. Each transaction is wrapped
+    in a LazyTransaction, which decodes a field the first time a filter asks
+    for it, and the filters are evaluated cheapest first (set lookups, then
+    single-field ranges, then time ranges), with smaller inclusive sets first
+    among set filters. Evaluation stops at the first filter that rejects.
+
+    Methods
+    -------
+    add()
+        Add a filter to the plan.
+    evaluate()
+        Return the decoded transaction if it passes all the filters.
+    make_filter()
+        Return the plan as a filter on "trytes hash" strings.
+    make_batch_filter()
+        Return the plan as a filter for a batch of transactions.
+    fingerprint()
+        Return a digest of the filter settings of the plan.
+    index_queries()
+        Return the DmpIndex queries of the set filters, made once.
+    index_candidates()
+        Return the offsets of the candidate transactions from a DmpIndex.
+    """
+
+    _SET_COST = 0
+    _RANGE_COST = 1
+    _TIME_COST = 2
+
+    def __init__(self) -> None:
+        self._steps = []
+        self._predicates = None
+        self._index_queries = None
+
+    def __str__(self):
+        return '\n'.join(f'{f.__class__.__name__} ({rlse}): ' + ', '.join(sorted(fields))
+                         for _, _, _, f, rlse, fields in self._sorted_steps())
+
+    def __len__(self):
+        return len(self._steps)
+
+    def add(self, transaction_filter, range_larger_smaller='R') -> 'FilterPlan':
+        """Add a filter to the plan.
+
+        Parameters
+        ----------
+        transaction_filter : SetFilter, RangeFilter, TimeFilter or MultiRangeFilter
+            The filter instance, e.g., AddressFilter or ValueFilter.
+
+        range_larger_smaller : str
+            The range setting of a RangeFilter or TimeFilter (see make_filter()).
+            It is ignored for set and multi-range filters.
+
+        Returns
+        ----------
+        The plan itself.
+
+        """
+        order = len(self._steps)
+        if isinstance(transaction_filter, SetFilter):
+            step = (self._SET_COST, len(transaction_filter._inclusive_set), order,
+                    transaction_filter, None, {transaction_filter._name})
+        elif isinstance(transaction_filter, RangeFilter):
+            step = (self._RANGE_COST, 0, order,
+                    transaction_filter, range_larger_smaller, {transaction_filter._name})
+        elif isinstance(transaction_filter, TimeFilter):
+            step = (self._TIME_COST, 0, order,
+                    transaction_filter, range_larger_smaller, {'timestamp', 'attachment_timestamp'})
+        elif isinstance(transaction_filter, MultiTimeFilter):
+            step = (self._TIME_COST, 0, order,
+                    transaction_filter, None, {'timestamp', 'attachment_timestamp'})
+        elif isinstance(transaction_filter, MultiRangeFilter):
+            step = (self._RANGE_COST, 0, order,
+                    transaction_filter, None, {transaction_filter._name})
+        else:
+            raise ValueError(
+                f"Cannot add {transaction_filter.__class__.__name__} to the filter plan!")
+        self._steps.append(step)
+        self._predicates = None
+        self._index_queries = None
+        return self
+
+    @property
+    def fields(self) -> set:
+        """The transaction fields read by the filters in the plan."""
+        return set().union(*(step[-1] for step in self._steps))
+
+    @staticmethod
+    def _settings(transaction_filter) -> tuple:
+        if isinstance(transaction_filter, SetFilter):
+            return (transaction_filter._name, sorted(transaction_filter._inclusive_set))
+        if isinstance(transaction_filter, RangeFilter):
+            return (transaction_filter._name, transaction_filter._min, transaction_filter._max)
+        if isinstance(transaction_filter, TimeFilter):
+            return (transaction_filter._min, transaction_filter._max)
+        return (transaction_filter._name, transaction_filter.intervals)
+
+    def fingerprint(self) -> str:
+        """Return a digest of the filter settings of the plan.
+
+        Two plans have the same fingerprint if they have the same filters with
+        the same settings, in any order, so the fingerprint tells whether
+        results filtered by a previous plan can be reused.
+
+        Returns
+        ----------
+        The hex digest.
+
+        """
+        settings = sorted(repr((f.__class__.__name__, rlse, self._settings(f)))
+                          for _, _, _, f, rlse, _ in self._steps)
+        return hashlib.sha256("\n".join(settings).encode("utf-8")).hexdigest()
+
+    def index_queries(self, index) -> list:
+        """Return the DmpIndex queries of the set filters of the plan.
+
+        The key sets are encoded and sorted once, on the first call, and the
+        queries are reused for every dmp file and chunk. Call it before the
+        plan is sent to worker processes, so they receive the queries.
+
+        Parameters
+        ----------
+        index : DmpIndex
+            The index of the dmp files.
+
+        Returns
+        ----------
+        The (filter, query) of each set filter, cheapest first.
+
+        """
+        if self._index_queries is None:
+            self._index_queries = [(f, f.index_query(index)) for _, _, _, f, _, _ in self._sorted_steps()
+                                   if isinstance(f, SetFilter)]
+        return self._index_queries
+
+    def index_candidates(self, index, filepath: str):
+        """Look the set filters of the plan up in a DmpIndex.
+
+        All the filters must pass, so the candidates are the intersection of
+        the offsets found for the indexed set filters. The candidates still
+        have to be evaluated, for the filters which are not indexed.
+
+        Parameters
+        ----------
+        index : DmpIndex
+            The index of the dmp files.
+
+        filepath : str
+            The path of the dmp file.
+
+        Returns
+        ----------
+        The sorted byte offsets of the candidate transactions of the dmp file,
+        or None if no filter of the plan can use the index.
+
+        """
+        candidates = None
+        for f, query in self.index_queries(index):
+            offsets = f.index_candidates(index, filepath, query)
+            if offsets is None:
+                continue
+            candidates = offsets if candidates is None else np.intersect1d(
+                candidates, offsets, assume_unique=True)
+        return candidates
+
+    def _sorted_steps(self) -> list:
+        return sorted(self._steps, key=lambda step: step[:3])
+
+    def _compile(self) -> list:
+        predicates = []
+        for _, _, _, f, rlse, _ in self._sorted_steps():
+            if isinstance(f, TimeFilter):
+                predicates.append(_TimeStep(f, rlse))
+            elif rlse is None:
+                predicates.append(f.make_filter(filter_type='dict'))
+            else:
+                predicates.append(f.make_filter(rlse, 'dict'))
+        return predicates
+
+    def evaluate(self, transaction: str, transaction_hash=None, milestone=None):
+        """Apply the filters to a transaction.
+
+        Parameters
+        ----------
+        transaction : str
+            The transaction trytes.
+
+        transaction_hash : str
+            The transaction hash, required by TransactionHashFilter.
+
+        milestone : str
+            The milestone of the dmp file the transaction comes from.
+
+        Returns
+        ----------
+        The LazyTransaction with the fields decoded so far if the transaction
+        passes all the filters, else None.
+
+        """
+        if self._predicates is None:
+            self._predicates = self._compile()
+        decoded = LazyTransaction(
+            transaction, hash=transaction_hash, milestone=milestone)
+        for predicate in self._predicates:
+            if not predicate(decoded):
+                return None
+        return decoded
+
+    def _for_str(self, trytes_hash: str) -> bool:
+        return self.evaluate(trytes_hash[:TRANSACTION_LENGTH],
+                             trytes_hash[-TRANSACTION_HASH_LENGTH:], LIVE_MILESTONE) is not None
+
+    def make_filter(self) -> Callable:
+        """Make a filter on "trytes hash" strings of zmq, as used by ZmqSub.
+
+        The transactions get the LIVE_MILESTONE, so the time filters compare
+        their timestamp only, as the str time filters do.
+
+        Returns
+        ----------
+        The built filter.
+
+        """
+        return self._for_str
+
+    def make_batch_filter(self) -> Callable:
+        """Make a filter for a batch of transactions, see combine_batch_filters().
+
+        Returns
+        ----------
+        The built batch filter.
+
+        """
+        batch_filter_list = []
+        for _, _, _, f, rlse, _ in self._sorted_steps():
+            if rlse is None:
+                batch_filter_list.append(f.make_batch_filter())
+            else:
+                batch_filter_list.append(f.make_batch_filter(rlse))
+        return combine_batch_filters(batch_filter_list)
@@ -0,0 +1,28 @@
+from .base_filter import PrefixSetFilter
+from ..common.const import TAG_B, TAG_E
+
+
+__all__ = [
+    'TagPrefixFilter',
+]
+
+
+class TagPrefixFilter(PrefixSetFilter):
+    """
+    Tag prefix filter for transactions, e.g., for vendor tags sharing the first trytes.
+
+
+    Pamameters
+    ----------
+    tag_prefix_set : set
+        The tag prefix set for monitoring.
+    """
+
+    def __init__(self, tag_prefix_set: set) -> None:
+        """
+        Parameters
+        ----------
+        tag_prefix_set : set
+            The set of tag prefixes for monitoring.
+        """
+        super().__init__('tag', tag_prefix_set, TAG_B, TAG_E)
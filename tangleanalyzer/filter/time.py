@@ -1,8 +1,10 @@
 from typing import Callable
+import numpy as np
 from datetime import datetime, timezone
 from time import mktime
 from ..common.const import (
     MILESTONES_USING_TIMESTAMP_ONLY,
+    LIVE_MILESTONE,
     TIMESTAMP_B,
     TIMESTAMP_E,
     ATCH_TIMESTAMP_B,
@@ -32,6 +34,10 @@ class TimeFilter():
     -------
     make_filter()
         Return the built time filter
+    make_dmp_filter()
+        Return the built time filter for dmp data
+    make_batch_filter()
+        Return the built time filter for a batch of transactions
 
     """
 
@@ -56,7 +62,7 @@ class TimeFilter():
             logging.error("Plese use \"%Y%m%d\" instead, e.g., \"20200101\"")
 
     def _get_transaction_dmp(self, timestamp: int, attachmenttimestame: int, milestone: str) -> int:
-        if milestone in MILESTONES_USING_TIMESTAMP_ONLY:
+        if milestone in MILESTONES_USING_TIMESTAMP_ONLY or milestone == LIVE_MILESTONE:
             return timestamp
         if attachmenttimestame != 0:
             return attachmenttimestame/1000
@@ -279,7 +285,43 @@ class TimeFilter():
         except:
             logging.error(f"Cannot identify timestamp: {transaction}!")
 
-    def make_filter(self, range_larger_smaller='R') -> Callable:
+    def _get_batch_time(self, batch: dict) -> np.ndarray:
+        try:
+            timestamp = np.asarray(batch['timestamp'])
+            attachment_timestamp = np.asarray(batch['attachment_timestamp'])
+        except:
+            raise ValueError(
+                "Objects for time filtering do not have time item!")
+        milestone = batch.get('milestone')
+        if milestone in MILESTONES_USING_TIMESTAMP_ONLY or milestone == LIVE_MILESTONE:
+            return timestamp
+        return np.where(attachment_timestamp != 0,
+                        attachment_timestamp/1000, timestamp)
+
+    def _time_range_filter_batch(self, batch: dict) -> np.ndarray:
+        t = self._get_batch_time(batch)
+        return (t < self._max) & (t > self._min)
+
+    def _time_filter_larger_than_min_batch(self, batch: dict) -> np.ndarray:
+        return self._get_batch_time(batch) > self._min
+
+    def _time_filter_smaller_than_max_batch(self, batch: dict) -> np.ndarray:
+        return self._get_batch_time(batch) < self._max
+
+    def _time_euqal_filter_batch(self, batch: dict) -> np.ndarray:
+        return self._get_batch_time(batch) == self._min
+
+    def _time_range_with_euqal_filter_batch(self, batch: dict) -> np.ndarray:
+        t = self._get_batch_time(batch)
+        return (t <= self._max) & (t >= self._min)
+
+    def _time_filter_equal_to_or_larger_than_min_batch(self, batch: dict) -> np.ndarray:
+        return self._get_batch_time(batch) >= self._min
+
+    def _time_filter_equal_to_or_smaller_than_max_batch(self, batch: dict) -> np.ndarray:
+        return self._get_batch_time(batch) <= self._max
+
+    def make_filter(self, range_larger_smaller='R', filter_type='str') -> Callable:
         """time filter generation function.
 
         Parameters
@@ -294,11 +336,36 @@ class TimeFilter():
             'mE' for time >= min
             'ME' for time <= max
 
+        filter_type : str
+            Set "str" or "dict" for the filter type.
+
         Returns
         ----------
         The built time filter.
 
         """
+        if filter_type == 'dict':
+            if range_larger_smaller == 'R':
+                return self._time_range_filter
+            elif range_larger_smaller == 'm':
+                return self._time_filter_larger_than_min
+            elif range_larger_smaller == 'M':
+                return self._time_filter_smaller_than_max
+            elif range_larger_smaller == 'E':
+                return self._time_euqal_filter
+            elif range_larger_smaller == 'RE':
+                return self._time_range_with_euqal_filter
+            elif range_larger_smaller == 'mE':
+                return self._time_filter_equal_to_or_larger_than_min
+            elif range_larger_smaller == 'ME':
+                return self._time_filter_equal_to_or_smaller_than_max
+            else:
+                raise ValueError(
+                    "{} is not supported!".format(range_larger_smaller))
+        elif filter_type != 'str':
+            raise ValueError(
+                f"Cannot identify {filter_type}, please use \"str\" or \"dict\"!")
+
         if range_larger_smaller == 'R':
             return self._time_range_filter_str
         elif range_larger_smaller == 'm':
@@ -355,3 +422,36 @@ class TimeFilter():
         else:
             raise ValueError(
                 "{} is not supported!".format(range_larger_smaller))
+
+    def make_batch_filter(self, range_larger_smaller='R') -> Callable:
+        """time filter generation function for a batch of transactions.
+        The batch should contain the "timestamp" and "attachment_timestamp" columns,
+        and optionally the "milestone" of the dmp file the batch comes from.
+
+        Parameters
+        ----------
+        range_larger_smaller_equal (str) :
+            The same settings as make_filter().
+
+        Returns
+        ----------
+        The built time filter, which maps a dict of decoded columns to a boolean mask.
+
+        """
+        if range_larger_smaller == 'R':
+            return self._time_range_filter_batch
+        elif range_larger_smaller == 'm':
+            return self._time_filter_larger_than_min_batch
+        elif range_larger_smaller == 'M':
+            return self._time_filter_smaller_than_max_batch
+        elif range_larger_smaller == 'E':
+            return self._time_euqal_filter_batch
+        elif range_larger_smaller == 'RE':
+            return self._time_range_with_euqal_filter_batch
+        elif range_larger_smaller == 'mE':
+            return self._time_filter_equal_to_or_larger_than_min_batch
+        elif range_larger_smaller == 'ME':
+            return self._time_filter_equal_to_or_smaller_than_max_batch
+        else:
+            raise ValueError(
+                "{} is not supported!".format(range_larger_smaller))
@@ -19,11 +19,13 @@ class TransactionHashFilter(SetFilter):
         The transaction hash set for monitoring.
     """
 
-    def __init__(self, transaction_hash_set: set) -> None:
+    def __init__(self, transaction_hash_set: set, bloom_fp_rate=None) -> None:
         """
         Parameters
         ----------
         transaction_set : set
             The set of transactions for monitoring.
+        bloom_fp_rate : float
+            The false-positive rate of the optional Bloom filter pre-screen for very large sets.
         """
-        super().__init__('hash', transaction_hash_set, -TRANSACTION_HASH_LENGTH, None)
+        super().__init__('hash', transaction_hash_set, -TRANSACTION_HASH_LENGTH, None, bloom_fp_rate)
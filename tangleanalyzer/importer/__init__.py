@@ -1,2 +1,10 @@
 from .zmqsub import ZmqSub
 from .dmpdecode import DmpDecode
+from .dmpreader import DmpReader
+from .dmpindex import DmpIndex
+from .partition import PartitionReader
+from .sink import TransactionSink, SqliteSink
+from .publisher import Publisher, KafkaPublisher, FilePublisher, MemoryPublisher
+from .ingest_buffer import IngestBuffer
+from .dedup import DedupCache
+from .sharded_filter import SharedRing, ShardedFilter
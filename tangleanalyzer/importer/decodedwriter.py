@@ -0,0 +1,154 @@
+import datetime
+import heapq
+import os
+from itertools import chain
+from operator import itemgetter
+
+__all__ = [
+    'DecodedWriter',
+    'merge_decoded',
+    'format_decoded',
+    'DECODED_HEADER',
+]
+
+DECODED_HEADER = "time\ttx\ttx_hash_str\taddress\tvalue\ttimestamp\tcurrent_index\tlast_index\tbundle\ttrunk\tbranch\ttag\tattachtimestamp\n"
+"""The header line of the decoded dmp files."""
+
+_TIMESTAMP_COLUMN = 5
+
+
+def _time_key(line: str) -> int:
+    return int(line.split("\t", _TIMESTAMP_COLUMN + 1)[_TIMESTAMP_COLUMN])
+
+
+def format_decoded(row: str, timestamp: int) -> str:
+    """Return the output line of a decoded transaction, prefixed with its %Y%m%d date."""
+    return "{}\t{}\n".format(datetime.datetime.fromtimestamp(
+        timestamp, tz=datetime.timezone.utc).strftime("%Y%m%d"), row)
+
+
+def merge_decoded(paths: list, out, sort=False) -> None:
+    """Write decoded row files into an opened output file, then remove them.
+
+    Parameters
+    ----------
+    paths : list
+        The row files (without header), e.g., the parts of the chunks of a dmp file.
+
+    out : file
+        The opened output file, or any object with writelines(), e.g., PartitionedWriter.
+
+    sort : bool
+        Merge the row files, each sorted by timestamp, by timestamp.
+        Else the row files are concatenated in order.
+    """
+    files = [open(path) for path in paths]
+    try:
+        if sort:
+            # heapq.merge is stable, so rows of equal timestamp keep the file order
+            out.writelines(heapq.merge(*files, key=_time_key))
+        else:
+            out.writelines(chain.from_iterable(files))
+    finally:
+        for f in files:
+            f.close()
+    for path in paths:
+        os.remove(path)
+
+
+class DecodedWriter():
+    """
+    Streaming writer of decoded transactions.
+
+    Rows are written through a buffered file as soon as they are decoded,
+    so memory does not grow with the output. When sort=True, rows are
+    collected in runs of at most run_size rows; a full run is sorted by
+    timestamp and spilled to a temporary file next to the output, and the
+    runs are merged when the writer is closed (external merge sort).
+
+    Methods
+    -------
+    write()
+        Write a decoded transaction.
+    close()
+        Flush the rows (merging the sorted runs) and close the file.
+    """
+
+    def __init__(self, filepath: str, header=DECODED_HEADER, sort=False,
+                 run_size=1000000, buffer_size=1024 * 1024) -> None:
+        """
+        Parameters
+        ----------
+        filepath : str
+            The output file path.
+
+        header : str
+            The header line, or None to write rows only.
+
+        sort : bool
+            Sort the rows by timestamp.
+
+        run_size : int
+            The maximum number of rows kept in memory when sorting.
+
+        buffer_size : int
+            The buffer size of the output file.
+        """
+        self.filepath = filepath
+        self.sort = sort
+        self.run_size = run_size
+        self._file = open(filepath, 'w', buffering=buffer_size)
+        if header:
+            self._file.write(header)
+        self._run = []
+        self._runs = []
+
+    def __enter__(self) -> 'DecodedWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write(self, row: str, timestamp: int) -> None:
+        """Write a decoded transaction.
+
+        Parameters
+        ----------
+        row : str
+            The tab-separated decoded fields.
+
+        timestamp : int
+            The timestamp (in seconds) of the transaction.
+        """
+        line = format_decoded(row, timestamp)
+        if not self.sort:
+            self._file.write(line)
+            return
+        self._run.append((timestamp, line))
+        if len(self._run) >= self.run_size:
+            self._spill()
+
+    def _spill(self) -> None:
+        path = f"{self.filepath}.run{len(self._runs)}"
+        self._run.sort(key=itemgetter(0))
+        with open(path, 'w') as f:
+            f.writelines(line for _, line in self._run)
+        self._runs.append(path)
+        self._run = []
+
+    def close(self) -> None:
+        """Flush the rows (merging the sorted runs) and close the file."""
+        if self._file.closed:
+            return
+        try:
+            if self._runs:
+                if self._run:
+                    self._spill()
+                merge_decoded(self._runs, self._file, sort=True)
+            elif self._run:
+                self._run.sort(key=itemgetter(0))
+                self._file.writelines(line for _, line in self._run)
+            self._run = []
+            self._runs = []
+        finally:
+            self._file.close()
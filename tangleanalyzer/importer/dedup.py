@@ -0,0 +1,65 @@
+from collections import OrderedDict
+import time
+
+__all__ = [
+    'DedupCache',
+]
+
+
+class DedupCache():
+    """
+    Time-bounded cache of the keys seen, e.g., transaction hashes.
+
+    A key is a duplicate if it was seen less than ttl seconds before. The
+    keys are kept in the order they were first seen, so the expired ones
+    are evicted from the front in O(1) each, and at most max_size keys are
+    kept.
+
+
+    Attributes
+    ----------
+    duplicates : int
+        The number of duplicates seen.
+
+    Methods
+    -------
+    seen()
+        Return True if a key is a duplicate, else remember it.
+    """
+
+    def __init__(self, ttl=60.0, max_size=1000000, clock=time.monotonic) -> None:
+        """
+        Parameters
+        ----------
+        ttl : float
+            The time (in seconds of clock) a key is remembered.
+
+        max_size : int
+            The maximum number of keys remembered.
+
+        clock : Callable
+            The clock of the ttl.
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._keys = OrderedDict()
+        self.duplicates = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def seen(self, key, now=None) -> bool:
+        """Return True if a key is a duplicate, else remember it."""
+        if now is None:
+            now = self._clock()
+        while self._keys:
+            first, first_seen = next(iter(self._keys.items()))
+            if now - first_seen < self.ttl and len(self._keys) < self.max_size:
+                break
+            del self._keys[first]
+        if key in self._keys:
+            self.duplicates += 1
+            return True
+        self._keys[key] = now
+        return False
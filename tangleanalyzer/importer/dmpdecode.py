@@ -1,37 +1,150 @@
 from iota import TryteString
-import datetime
 from ..common.const import *
-from ..common import tryte_to_int
+from ..common.trytes import decode_batch, slice_batch, rows_view, BatchColumns
+from ..filter import combine_batch_filters, BundleFilter, FilterPlan
+from .dmpreader import DmpReader
+from .decodedwriter import DecodedWriter, merge_decoded, format_decoded, DECODED_HEADER
+from .partition import PartitionedWriter
+from .parquetwriter import ParquetDecodedWriter, merge_parquet, parquet_schema
+from .manifest import Manifest
+import numpy as np
+import copy
+import functools
+import hashlib
 import os
 from os import listdir
 from os.path import isfile, join
 import multiprocessing as mp
+from collections import Counter
+from itertools import islice
 import logging
 
+DECODE_BATCH_SIZE = 65536
+MANIFEST_NAME = "manifest.json"
+
+_worker_decoder = None
+
+
+def _init_worker(decoder) -> None:
+    # The decoder, with its filters, is inherited (fork) or unpickled (spawn)
+    # once per worker process instead of once per task
+    global _worker_decoder
+    _worker_decoder = decoder
+
+
+def _run_task(method_name, task):
+    return getattr(_worker_decoder, method_name)(task)
+
+
+def pack_decoded(tx_time_dict) -> tuple:
+    """Pack decoded rows and their timestamps into a bytes block and an int64 array.
+
+    Returning one bytes object and one array from a worker pickles much
+    faster than a dict of millions of strings.
+    """
+    rows = "\n".join(tx_time_dict).encode("ascii")
+    timestamps = np.fromiter(tx_time_dict.values(), dtype=np.int64, count=len(tx_time_dict))
+    return (rows, timestamps)
+
+
+def unpack_decoded(packed):
+    """Iterate the (row, timestamp) pairs packed by pack_decoded()."""
+    rows, timestamps = packed
+    if len(timestamps):
+        yield from zip(rows.decode("ascii").split("\n"), timestamps.tolist())
+
 
 class DmpDecode():
-    def __init__(self, dmp_folder="dmp", decoded_dmp_folder="decoded_data", filter_list=[], time_filter_list=None) -> None:
+    def __init__(self, dmp_folder="dmp", decoded_dmp_folder="decoded_data", filter_list=[], time_filter_list=[],
+                 batch_filter_list=None, batch_logic="and", filter_plan=None, chunk_size=64 * 1024 * 1024,
+                 stream=False, sort_by_time=False, run_size=1000000,
+                 output_format="txt", include_tx=True, incremental=False, config_fingerprint=None,
+                 index=None, partition=None, expand_bundles=False) -> None:
         self.dmp_folder = dmp_folder
         self.decoded_dmp_folder = decoded_dmp_folder
         self.filter_list = filter_list
         self.time_filter_list = time_filter_list
+        self.batch_filter_list = batch_filter_list
+        self.batch_logic = batch_logic
+        self.filter_plan = filter_plan
+        self.chunk_size = chunk_size
+        self.stream = stream
+        self.sort_by_time = sort_by_time
+        self.run_size = run_size
+        self.output_format = output_format
+        self.include_tx = include_tx
+        self.incremental = incremental
+        self.config_fingerprint = config_fingerprint
+        self.index = index
+        self.partition = partition
+        self.expand_bundles = expand_bundles
+        if output_format not in ("txt", "parquet"):
+            raise ValueError(f"The output format {output_format} is not supported!")
+        if partition not in (None, "day", "hour"):
+            raise ValueError(f"The partition {partition} is not supported, use day or hour!")
+        if output_format == "parquet":
+            if partition is not None:
+                raise ValueError("Time partitions are only supported for the txt output format!")
+            if sort_by_time:
+                raise ValueError("Sorting by time is only supported for the txt output format!")
+            # Fail before starting the workers if pyarrow is not installed
+            parquet_schema(include_tx)
 
-    def output_decoded_results(self, filename) -> tuple:
-        target = []
-        tx_time_dict = {}
-        filepath = join(self.dmp_folder, filename)
-        milestone = filename.split(".")[0]
+    def batch_filter(self, reader, milestone):
+        """Apply the batch filters to the dmp file block by block.
 
-        lines = (line for line in open(filepath))
-        logging.info(f"Processing {filepath}...")
+        Parameters
+        ----------
+        reader : DmpReader
+            The opened dmp file.
 
-        for l in lines:
-            tx_hash = l.split(",")[0]
-            tx_hash_str = TryteString(tx_hash)
-            tx_str = l.split(",")[1].strip()
+        milestone : str
+            The milestone of the dmp file.
+
+        Returns
+        ----------
+        An iterator of the (trytes, hash) tuples of the reserved transactions.
+        """
+        batch_filter = combine_batch_filters(
+            self.batch_filter_list, self.batch_logic)
+        for block in reader.blocks():
+            batch = BatchColumns(block.rows, hash=block.hashes,
+                                 milestone=milestone)
+            for i in np.nonzero(batch_filter(batch))[0]:
+                yield (block.rows[i].tobytes().decode("ascii"),
+                       block.hashes[i].decode("ascii"))
+
+    def row_filter(self, reader, milestone, offsets=None):
+        """Apply the filters to the dmp file line by line.
+
+        Parameters
+        ----------
+        reader : DmpReader
+            The opened dmp file.
+
+        milestone : str
+            The milestone of the dmp file.
+
+        offsets : np.ndarray
+            Only filter the lines at these byte offsets, e.g., from a DmpIndex.
+
+        Returns
+        ----------
+        An iterator of the (trytes, hash) tuples of the reserved transactions.
+        """
+        for _, hash_view, tx_view in reader.records(offsets):
+            tx_hash = str(hash_view, "ascii")
 
             logging.debug(f"tx_hash = {tx_hash}")
 
+            if self.filter_plan is not None:
+                # The plan only copies the fields it reads out of the mapping
+                if self.filter_plan.evaluate(tx_view, tx_hash, milestone) is not None:
+                    yield (str(tx_view, "ascii"), tx_hash)
+                continue
+
+            tx_str = str(tx_view, "ascii")
+
             # Apply filters
             trytes_hash = (tx_str + " " + tx_hash,)
             for f in self.filter_list:
@@ -48,48 +161,478 @@ class DmpDecode():
 
             # tx_trytes = TryteString.as_integers(tx_str)
             logging.info(f"trytes_hash = {trytes_hash[0][:10]}...")
-            value = tryte_to_int(tx_str, VALUE_B, VALUE_E)
+            yield (tx_str, tx_hash)
+
+    def decode_rows(self, passed, milestone):
+        """Decode the reserved transactions into the rows of the output file.
+
+        Parameters
+        ----------
+        passed : list
+            The (trytes, hash) tuples of the reserved transactions.
+
+        milestone : str
+            The milestone of the dmp file.
+
+        Returns
+        ----------
+        An iterator of (row, timestamp) tuples.
+        """
+        # Decode the numeric fields of all the reserved transactions at once
+        decoded = {k: v.tolist() for k, v in decode_batch(
+            "".join(tx_str for tx_str, _ in passed).encode("ascii")).items()}
+
+        for i, (tx_str, tx_hash) in enumerate(passed):
+            tx_hash_str = TryteString(tx_hash)
+            value = decoded['value'][i]
             address = tx_str[ADDRESS_B: ADDRESS_E]
             bundle = tx_str[BUNDLE_HASH_B: BUNDLE_HASH_E]
-            timestamp = tryte_to_int(tx_str, TIMESTAMP_B, TIMESTAMP_E)
-            attachtimestamp = tryte_to_int(
-                tx_str, ATCH_TIMESTAMP_B, ATCH_TIMESTAMP_E)
+            timestamp = decoded['timestamp'][i]
+            attachtimestamp = decoded['attachment_timestamp'][i]
             if timestamp > 10e9:
                 timestamp = int(timestamp*10e-4)
             if attachtimestamp > 10e9:
                 attachtimestamp = int(attachtimestamp*10e-4)
-            current_index = tryte_to_int(
-                tx_str, CURRENT_IDX_B, CURRENT_IDX_E)
-            last_index = tryte_to_int(tx_str, LAST_IDX_B, LAST_IDX_E)
+            current_index = decoded['current_index'][i]
+            last_index = decoded['last_index'][i]
             trunk = tx_str[TRUNK_B: TRUNK_E]
             branch = tx_str[BRANCH_B: BRANCH_E]
             tag = tx_str[TAG_B: TAG_E]
 
-            # Note that for the same to_store string the timestamp will be overrided!
             to_store = "{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}".format(
                 tx_str, tx_hash_str, address, value, timestamp, current_index,
                 last_index, bundle, trunk, branch, tag, attachtimestamp)
 
             # logging.info(f"to_sore = {to_store}")
-            if filename.split(".")[0] in MILESTONES_USING_TIMESTAMP_ONLY:
+            if milestone in MILESTONES_USING_TIMESTAMP_ONLY:
                 attachtimestamp = timestamp
-            tx_time_dict[to_store] = timestamp  # attachtimestamp
-
-        # Reorder by the timestamp
-        with open("{}/{}.txt".format(self.decoded_dmp_folder, filename.split(".")[0]), 'w') as f:
-            f.write("time\ttx\ttx_hash_str\taddress\tvalue\ttimestamp\tcurrent_index\tlast_index\tbundle\ttrunk\tbranch\ttag\tattachtimestamp\n")
-            for k, v in tx_time_dict.items():
-                f.write("{}\t{}\n".format(datetime.datetime.fromtimestamp(
-                    v, tz=datetime.timezone.utc).strftime("%Y%m%d"), k))
+            yield (to_store, timestamp)  # attachtimestamp
+
+    def decode_columns(self, passed, milestone) -> dict:
+        """Decode the reserved transactions into the columns of the parquet output.
+
+        Parameters
+        ----------
+        passed : list
+            The (trytes, hash) tuples of the reserved transactions.
+
+        milestone : str
+            The milestone of the dmp file.
+
+        Returns
+        ----------
+        Maps the column names of parquet_schema() to arrays.
+        """
+        buffer = "".join(tx_str for tx_str, _ in passed).encode("ascii")
+        rows = rows_view(buffer)
+        decoded = decode_batch(rows)
+        sliced = slice_batch(rows, ['address', 'bundle_hash', 'trunk_transaction_hash',
+                                    'branch_transaction_hash', 'tag'])
+        timestamp = decoded['timestamp']
+        attachtimestamp = decoded['attachment_timestamp']
+        columns = {
+            'tx_hash_str': np.array([tx_hash.encode("ascii") for _, tx_hash in passed],
+                                    dtype=f'S{TRANSACTION_HASH_LENGTH}'),
+            'address': sliced['address'],
+            'value': decoded['value'],
+            'timestamp': np.where(timestamp > 10e9, (timestamp*10e-4).astype(np.int64), timestamp),
+            'current_index': decoded['current_index'],
+            'last_index': decoded['last_index'],
+            'bundle': sliced['bundle_hash'],
+            'trunk': sliced['trunk_transaction_hash'],
+            'branch': sliced['branch_transaction_hash'],
+            'tag': sliced['tag'],
+            'attachtimestamp': np.where(attachtimestamp > 10e9,
+                                        (attachtimestamp*10e-4).astype(np.int64), attachtimestamp),
+        }
+        if self.include_tx:
+            columns['tx'] = np.frombuffer(buffer, dtype=f'S{TRANSACTION_LENGTH}')
+        return columns
+
+    def iter_passed(self, filename, start=0, end=None):
+        """Filter a byte range of a dmp file.
+
+        Parameters
+        ----------
+        filename : str
+            The dmp file name.
+
+        start : int
+            The byte offset of the range, aligned to a line boundary.
+
+        end : int
+            The end of the range, None for the end of the file.
+
+        Returns
+        ----------
+        An iterator of lists of at most DECODE_BATCH_SIZE (trytes, hash)
+        tuples of the reserved transactions.
+        """
+        filepath = join(self.dmp_folder, filename)
+        milestone = filename.split(".")[0]
+
+        logging.debug(f"Processing {filepath} [{start}:{end}]...")
+
+        with DmpReader(filepath, start, end) as reader:
+            if self.batch_filter_list is not None:
+                passed = self.batch_filter(reader, milestone)
+            else:
+                offsets = None
+                if self.index is not None and self.filter_plan is not None:
+                    # Only read the lines the indexed set filters can pass
+                    offsets = self.filter_plan.index_candidates(self.index, filepath)
+                passed = self.row_filter(reader, milestone, offsets)
+            while batch := list(islice(passed, DECODE_BATCH_SIZE)):
+                yield batch
+
+    def iter_decoded(self, filename, start=0, end=None):
+        """Filter and decode a byte range of a dmp file.
+
+        Parameters
+        ----------
+        filename : str
+            The dmp file name.
+
+        start : int
+            The byte offset of the range, aligned to a line boundary.
+
+        end : int
+            The end of the range, None for the end of the file.
+
+        Returns
+        ----------
+        An iterator of (row, timestamp) tuples, decoded DECODE_BATCH_SIZE
+        transactions at a time.
+        """
+        milestone = filename.split(".")[0]
+        for batch in self.iter_passed(filename, start, end):
+            yield from self.decode_rows(batch, milestone)
+
+    def decode_chunk(self, task) -> tuple:
+        """Filter and decode a byte range of a dmp file.
+
+        Parameters
+        ----------
+        task : tuple
+            The (filename, start, end) of the byte range, aligned to line boundaries.
+
+        Returns
+        ----------
+        The (filename, start, rows) of the byte range, the distinct rows and
+        their timestamps packed by pack_decoded().
+        """
+        filename, start, end = task
+        tx_time_dict = {}
+        # Note that for the same to_store string the timestamp will be overrided!
+        for to_store, timestamp in self.iter_decoded(filename, start, end):
+            tx_time_dict[to_store] = timestamp
+        return (filename, start, pack_decoded(tx_time_dict))
+
+    def stream_chunk(self, task) -> tuple:
+        """Filter and decode a byte range of a dmp file into a part file.
+
+        Parameters
+        ----------
+        task : tuple
+            The (filename, start, end) of the byte range, aligned to line boundaries.
+
+        Returns
+        ----------
+        The (filename, start, part file path) of the byte range.
+        """
+        filename, start, end = task
+        part = "{}/{}.{}.part".format(self.decoded_dmp_folder,
+                                      filename.split(".")[0], start)
+        with DecodedWriter(part, header=None, sort=self.sort_by_time,
+                           run_size=self.run_size) as writer:
+            for to_store, timestamp in self.iter_decoded(filename, start, end):
+                writer.write(to_store, timestamp)
+        return (filename, start, part)
+
+    def parquet_chunk(self, task) -> tuple:
+        """Filter and decode a byte range of a dmp file into a parquet part file.
+
+        Parameters
+        ----------
+        task : tuple
+            The (filename, start, end) of the byte range, aligned to line boundaries.
+
+        Returns
+        ----------
+        The (filename, start, part file path) of the byte range.
+        """
+        filename, start, end = task
+        part = "{}/{}.{}.parquet.part".format(self.decoded_dmp_folder,
+                                              filename.split(".")[0], start)
+        self._write_parquet(part, filename, start, end)
+        return (filename, start, part)
+
+    def _write_parquet(self, filepath, filename, start=0, end=None) -> None:
+        milestone = filename.split(".")[0]
+        with ParquetDecodedWriter(filepath, self.include_tx, DECODE_BATCH_SIZE) as writer:
+            for batch in self.iter_passed(filename, start, end):
+                writer.write_columns(self.decode_columns(batch, milestone))
+
+    def write_parquet_results(self, filename, parts) -> None:
+        """Copy the row groups of the parquet part files of a dmp file into one file.
+
+        Parameters
+        ----------
+        filename : str
+            The dmp file name.
+
+        parts : list
+            The part file of each chunk, in file order.
+        """
+        merge_parquet(parts, self._output_path(filename), self.include_tx)
+
+    def write_decoded_results(self, filename, chunks) -> None:
+        """Merge the decoded chunks of a dmp file in order and write them.
+
+        Parameters
+        ----------
+        filename : str
+            The dmp file name.
+
+        chunks : list
+            The rows of each chunk packed by pack_decoded(), in file order.
+        """
+        merged = {}
+        for packed in chunks:
+            merged.update(unpack_decoded(packed))
+
+        if self.partition is not None:
+            items = merged.items()
+            if self.sort_by_time:
+                items = sorted(items, key=lambda item: item[1])
+            with PartitionedWriter(self.decoded_dmp_folder, filename.split(".")[0],
+                                   self.partition) as writer:
+                writer.writelines(format_decoded(k, v) for k, v in items)
+            return
+
+        with DecodedWriter(self._output_path(filename), sort=self.sort_by_time,
+                           run_size=self.run_size) as writer:
+            for k, v in merged.items():
+                writer.write(k, v)
+
+    def write_streamed_results(self, filename, parts) -> None:
+        """Concatenate (or merge by time) the part files of a dmp file.
+
+        Parameters
+        ----------
+        filename : str
+            The dmp file name.
+
+        parts : list
+            The part file of each chunk, in file order.
+        """
+        if self.partition is not None:
+            with PartitionedWriter(self.decoded_dmp_folder, filename.split(".")[0],
+                                   self.partition) as writer:
+                merge_decoded(parts, writer, sort=self.sort_by_time)
+            return
+
+        with open(self._output_path(filename), 'w', buffering=1024 * 1024) as f:
+            f.write(DECODED_HEADER)
+            merge_decoded(parts, f, sort=self.sort_by_time)
+
+    def _output_path(self, filename) -> str:
+        return "{}/{}.{}".format(self.decoded_dmp_folder, filename.split(".")[0],
+                                 self.output_format)
+
+    def output_decoded_results(self, filename) -> str:
+        """Decode a whole dmp file in this process.
+
+        Returns
+        ----------
+        The dmp file name.
+
+        """
+        logging.info(f"Processing {join(self.dmp_folder, filename)}...")
+        if self.output_format == "parquet":
+            self._write_parquet(self._output_path(filename), filename)
+        elif self.stream and self.partition is not None:
+            _, _, part = self.stream_chunk((filename, 0, None))
+            self.write_streamed_results(filename, [part])
+        elif self.stream:
+            with DecodedWriter(self._output_path(filename), sort=self.sort_by_time,
+                               run_size=self.run_size) as writer:
+                for to_store, timestamp in self.iter_decoded(filename):
+                    writer.write(to_store, timestamp)
+        else:
+            _, _, packed = self.decode_chunk((filename, 0, None))
+            self.write_decoded_results(filename, [packed])
         logging.info(f"{filename} is done!")
-        return (filename, target)
+        return filename
+
+    def _make_index_queries(self) -> None:
+        # Sort the key sets of the index lookups once, before the plan is sent
+        # to the workers, instead of in every chunk
+        if self.index is not None and self.filter_plan is not None:
+            self.filter_plan.index_queries(self.index)
+
+    def make_tasks(self, dmpfiles) -> list:
+        """Split the dmp files into (filename, start, end) chunks of about chunk_size bytes."""
+        tasks = []
+        for filename in dmpfiles:
+            with DmpReader(join(self.dmp_folder, filename)) as reader:
+                tasks.extend((filename, start, end)
+                             for start, end in reader.chunks(self.chunk_size))
+        return tasks
+
+    def bundle_hits_chunk(self, task) -> tuple:
+        """Collect the bundle hashes of the reserved transactions in a byte range.
+
+        Parameters
+        ----------
+        task : tuple
+            The (filename, start, end) of the byte range, aligned to line boundaries.
+
+        Returns
+        ----------
+        The (filename, start, bundle hash set) of the byte range.
+        """
+        filename, start, end = task
+        bundle_hashes = set()
+        for batch in self.iter_passed(filename, start, end):
+            bundle_hashes.update(tx_str[BUNDLE_HASH_B:BUNDLE_HASH_E] for tx_str, _ in batch)
+        return (filename, start, bundle_hashes)
+
+    def bundle_decode(self, dmpfiles) -> 'DmpDecode':
+        """Return the decoder of the whole bundles of the reserved transactions.
+
+        This is the first pass of a bundle expansion: the dmp files are
+        filtered for the bundle hashes of the reserved transactions, and
+        the returned decoder keeps every transaction of those bundles with
+        a BundleFilter (looked up in the DmpIndex, if any, on the second pass).
+
+        Parameters
+        ----------
+        dmpfiles : list
+            The dmp file names.
+
+        Returns
+        ----------
+        The DmpDecode of the second pass.
+        """
+        tasks = self.make_tasks(dmpfiles)
+        bundle_hashes = set()
+        self._make_index_queries()
+        with mp.Pool(processes=mp.cpu_count(), initializer=_init_worker, initargs=(self,)) as p:
+            for _, _, hashes in p.imap_unordered(
+                    functools.partial(_run_task, 'bundle_hits_chunk'), tasks):
+                bundle_hashes.update(hashes)
+        logging.info(f"Expanding {len(bundle_hashes)} bundles...")
+
+        decode = copy.copy(self)
+        decode.filter_list = []
+        decode.time_filter_list = []
+        decode.batch_filter_list = None
+        decode.filter_plan = FilterPlan().add(BundleFilter(bundle_hashes))
+        decode.config_fingerprint = None
+        decode.expand_bundles = False
+        return decode
+
+    def fingerprint(self) -> str:
+        """Return a digest of the filter and output settings, see Manifest.
+
+        The filters are identified by config_fingerprint if given, else by
+        the fingerprint of the filter plan. Filter functions cannot be
+        fingerprinted, so config_fingerprint is required with them.
+
+        Returns
+        ----------
+        The hex digest.
+        """
+        if self.config_fingerprint is not None:
+            filters = self.config_fingerprint
+        elif self.filter_plan is not None:
+            filters = self.filter_plan.fingerprint()
+        elif not (self.filter_list or self.time_filter_list or self.batch_filter_list):
+            filters = ""
+        else:
+            raise ValueError(
+                "Cannot fingerprint filter functions, please set config_fingerprint!")
+        settings = repr((filters, self.output_format, self.stream,
+                         self.sort_by_time, self.include_tx, self.partition))
+        return hashlib.sha256(settings.encode("utf-8")).hexdigest()
 
     def run(self) -> None:
         N = mp.cpu_count()
         dmpfiles = [f for f in listdir(
             self.dmp_folder) if isfile(join(self.dmp_folder, f))]
 
+        if self.expand_bundles:
+            return self.bundle_decode(dmpfiles).run()
+
         if not os.path.exists(self.decoded_dmp_folder):
             os.makedirs(self.decoded_dmp_folder)
-        with mp.Pool(processes=N) as p:
-            results = p.map(self.output_decoded_results, dmpfiles)
+
+        manifest = None
+        if self.incremental:
+            manifest = Manifest(join(self.decoded_dmp_folder, MANIFEST_NAME))
+            fingerprint = self.fingerprint()
+            todo = []
+            for filename in dmpfiles:
+                manifest.begin(filename, join(self.dmp_folder, filename), fingerprint)
+                # The rows of a file are spread over the partitions, so the manifest is trusted
+                if manifest.is_done(filename) and (self.partition is not None or
+                                                   os.path.exists(self._output_path(filename))):
+                    logging.info(f"{filename} is unchanged, skipped!")
+                else:
+                    todo.append(filename)
+            dmpfiles = todo
+            manifest.save()
+
+        # Large files are split into chunks, so they do not run on one core
+        tasks = self.make_tasks(dmpfiles)
+        chunk_counts = Counter(filename for filename, _, _ in tasks)
+        if self.output_format == "parquet":
+            decode, write = self.parquet_chunk, self.write_parquet_results
+        elif self.stream:
+            decode, write = self.stream_chunk, self.write_streamed_results
+        else:
+            decode, write = self.decode_chunk, self.write_decoded_results
+        # The part files of the finished chunks are checkpoints to resume from
+        resumable = manifest is not None and decode != self.decode_chunk
+
+        chunks = {filename: {} for filename in dmpfiles}
+        if resumable:
+            finished = {filename: manifest.checkpoints(filename) for filename in dmpfiles}
+            todo = []
+            for filename, start, end in tasks:
+                part = finished[filename].get((start, end))
+                if part is not None and os.path.exists(part):
+                    chunks[filename][start] = part
+                else:
+                    todo.append((filename, start, end))
+            tasks = todo
+
+        def finish(filename):
+            results = chunks.pop(filename)
+            write(filename, [results[start] for start in sorted(results)])
+            if manifest is not None:
+                manifest.finish(filename)
+                manifest.save()
+            logging.info(f"{filename} is done!")
+
+        for filename in dmpfiles:
+            if chunks[filename]:
+                logging.info(f"Resuming {filename} from {len(chunks[filename])} chunks...")
+            if len(chunks[filename]) == chunk_counts[filename]:
+                finish(filename)
+
+        self._make_index_queries()
+        # The workers get self once; each task only pickles its (filename, start, end)
+        with mp.Pool(processes=N, initializer=_init_worker, initargs=(self,)) as p:
+            # imap keeps the task order, so the chunks of a file arrive in order
+            results = p.imap(functools.partial(_run_task, decode.__name__), tasks)
+            for (filename, start, end), (_, _, result) in zip(tasks, results):
+                if not chunks[filename]:
+                    logging.info(f"Processing {join(self.dmp_folder, filename)}...")
+                chunks[filename][start] = result
+                if resumable:
+                    manifest.checkpoint(filename, start, end, result)
+                    manifest.save()
+                if len(chunks[filename]) == chunk_counts[filename]:
+                    finish(filename)
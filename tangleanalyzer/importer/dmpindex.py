@@ -0,0 +1,255 @@
+import json
+import os
+from os import listdir
+from os.path import isfile, join
+import multiprocessing as mp
+import logging
+import numpy as np
+from ..common.const import TRANSACTION_HASH_LENGTH
+from ..common.trytes import STR_FIELDS, slice_batch
+from .dmpreader import DmpReader
+from .manifest import Manifest
+
+__all__ = [
+    'DmpIndex',
+    'INDEX_FIELDS',
+]
+
+INDEX_FIELDS = ('address', 'bundle_hash', 'tag', 'hash')
+"""The transaction fields indexed by DmpIndex, named as the SetFilter fields."""
+
+_INDEX_VERSION = "1"
+
+
+def _next_prefix(prefix: bytes) -> bytes:
+    # The smallest key larger than all the keys starting with prefix
+    return prefix[:-1] + bytes([prefix[-1] + 1])
+
+
+class _Query():
+    """The sorted, encoded keys of a lookup, see DmpIndex.make_query()."""
+
+    __slots__ = ('keys', 'highs', 'everything')
+
+    def __init__(self, keys, prefix: bool) -> None:
+        encoded = sorted({k.encode("ascii") if isinstance(k, str) else bytes(k) for k in keys})
+        # An empty prefix matches every line
+        self.everything = prefix and bool(encoded) and encoded[0] == b''
+        self.keys = np.array(encoded, dtype=bytes) if encoded else np.zeros(0, dtype='S1')
+        self.highs = None
+        if prefix and encoded and not self.everything:
+            self.highs = np.array([_next_prefix(k) for k in encoded], dtype=bytes)
+
+
+class DmpIndex():
+    """
+    Persistent, memory-mapped field index over dmp files.
+
+    build() scans each dmp file once and writes a segment per file: for each
+    field in INDEX_FIELDS, the sorted keys ("S<width>" .npy array) and the
+    byte offsets of their lines (int64 .npy array). Segments are loaded with
+    mmap, so a lookup is a binary search in the page cache instead of a scan
+    of the dmp file. New or changed dmp files get new segments on the next
+    build(); unchanged files are skipped.
+
+    A lookup returns None if the segment does not match the current dmp file
+    (e.g., it was replaced after indexing), so callers fall back to a scan.
+
+    Methods
+    -------
+    build()
+        Index the new or changed dmp files of a folder.
+    lookup()
+        Return the byte offsets of the lines whose field is in a key set.
+    make_query()
+        Encode and sort a key set once for many lookups.
+    """
+
+    def __init__(self, index_folder="dmp_index") -> None:
+        """
+        Parameters
+        ----------
+        index_folder : str
+            The folder of the index segments.
+        """
+        self.index_folder = index_folder
+        self._arrays = {}
+
+    def __getstate__(self):
+        # The memory maps are reopened in each process
+        return {'index_folder': self.index_folder}
+
+    def __setstate__(self, state):
+        self.index_folder = state['index_folder']
+        self._arrays = {}
+
+    def _segment(self, filename: str) -> str:
+        return join(self.index_folder, filename)
+
+    def build(self, dmp_folder="dmp", processes=None) -> list:
+        """Index the new or changed dmp files of a folder.
+
+        Parameters
+        ----------
+        dmp_folder : str
+            The folder of the dmp files.
+
+        processes : int
+            The number of worker processes, defaults to the number of CPUs.
+
+        Returns
+        ----------
+        The names of the dmp files (re)indexed.
+
+        """
+        if not os.path.exists(self.index_folder):
+            os.makedirs(self.index_folder)
+        manifest = Manifest(join(self.index_folder, "manifest.json"))
+        dmpfiles = [f for f in listdir(dmp_folder) if isfile(join(dmp_folder, f))]
+        tasks = []
+        for filename in dmpfiles:
+            manifest.begin(filename, join(dmp_folder, filename), _INDEX_VERSION)
+            if not manifest.is_done(filename):
+                tasks.append(join(dmp_folder, filename))
+        manifest.save()
+
+        built = []
+        with mp.Pool(processes=processes or mp.cpu_count()) as p:
+            for filename in p.imap_unordered(self.build_segment, tasks):
+                manifest.finish(filename)
+                manifest.save()
+                built.append(filename)
+                logging.info(f"{filename} is indexed!")
+        self._arrays = {}
+        return built
+
+    def build_segment(self, filepath: str) -> str:
+        """Index a dmp file.
+
+        Parameters
+        ----------
+        filepath : str
+            The path of the dmp file.
+
+        Returns
+        ----------
+        The dmp file name.
+
+        """
+        filename = os.path.basename(filepath)
+        columns = {name: [] for name in INDEX_FIELDS}
+        offsets = []
+        with DmpReader(filepath) as reader:
+            for block in reader.blocks():
+                sliced = slice_batch(block.rows, ['address', 'bundle_hash', 'tag'])
+                sliced['hash'] = block.hashes.copy()
+                for name in INDEX_FIELDS:
+                    columns[name].append(sliced[name])
+                offsets.append(block.offsets)
+
+        segment = self._segment(filename)
+        if not os.path.exists(segment):
+            os.makedirs(segment)
+        offsets = np.concatenate(offsets) if offsets else np.zeros(0, dtype=np.int64)
+        for name in INDEX_FIELDS:
+            keys = (np.concatenate(columns[name]) if columns[name]
+                    else np.zeros(0, dtype=f'S{self._width(name)}'))
+            order = np.argsort(keys, kind='stable')
+            np.save(join(segment, f"{name}.keys.npy"), keys[order])
+            np.save(join(segment, f"{name}.offsets.npy"), offsets[order])
+        stat = os.stat(filepath)
+        with open(join(segment, "meta.json"), 'w') as f:
+            json.dump({'size': stat.st_size, 'mtime': stat.st_mtime_ns}, f)
+        return filename
+
+    @staticmethod
+    def _width(name: str) -> int:
+        if name == 'hash':
+            return TRANSACTION_HASH_LENGTH
+        b, e = STR_FIELDS[name]
+        return e - b
+
+    def _load(self, filepath: str, name: str):
+        key = (filepath, name)
+        if key not in self._arrays:
+            segment = self._segment(os.path.basename(filepath))
+            arrays = None
+            try:
+                with open(join(segment, "meta.json")) as f:
+                    meta = json.load(f)
+                stat = os.stat(filepath)
+                if meta == {'size': stat.st_size, 'mtime': stat.st_mtime_ns}:
+                    arrays = (np.load(join(segment, f"{name}.keys.npy"), mmap_mode='r'),
+                              np.load(join(segment, f"{name}.offsets.npy"), mmap_mode='r'))
+            except (OSError, ValueError):
+                pass
+            if arrays is None:
+                logging.debug(f"{filepath} is not indexed")
+            self._arrays[key] = arrays
+        return self._arrays[key]
+
+    @staticmethod
+    def make_query(keys, prefix=False) -> _Query:
+        """Encode and sort a key set once for many lookups.
+
+        A lookup with a query only runs the binary searches, so the query of
+        a large key set is made once, e.g., per filter, instead of per chunk.
+
+        Parameters
+        ----------
+        keys : iterable
+            The tryte strings to look up.
+
+        prefix : bool
+            Match the keys as prefixes of the field.
+
+        Returns
+        ----------
+        The query to pass to lookup() as keys.
+
+        """
+        return _Query(keys, prefix)
+
+    def lookup(self, filepath: str, name: str, keys, prefix=False):
+        """Return the byte offsets of the lines whose field is in a key set.
+
+        Parameters
+        ----------
+        filepath : str
+            The path of the dmp file.
+
+        name : str
+            The field name in INDEX_FIELDS.
+
+        keys : iterable
+            The tryte strings to look up, or a query made by make_query().
+
+        prefix : bool
+            Match the keys as prefixes of the field. It is ignored for a query.
+
+        Returns
+        ----------
+        The sorted np.ndarray of byte offsets, or None if the field or the
+        dmp file is not indexed.
+
+        """
+        if name not in INDEX_FIELDS:
+            return None
+        arrays = self._load(filepath, name)
+        if arrays is None:
+            return None
+        index_keys, index_offsets = arrays
+        query = keys if isinstance(keys, _Query) else _Query(keys, prefix)
+        if not len(query.keys) or len(index_keys) == 0:
+            return np.zeros(0, dtype=np.int64)
+        if query.everything:
+            return np.sort(index_offsets)
+        lows = index_keys.searchsorted(query.keys)
+        if query.highs is not None:
+            highs = index_keys.searchsorted(query.highs)
+        else:
+            highs = index_keys.searchsorted(query.keys, side='right')
+        found = [index_offsets[l:h] for l, h in zip(lows, highs) if h > l]
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
@@ -0,0 +1,218 @@
+import mmap
+import logging
+import numpy as np
+from ..common.const import TRANSACTION_LENGTH, TRANSACTION_HASH_LENGTH
+from ..common.trytes import rows_view
+
+__all__ = [
+    'DmpReader',
+    'DmpBlock',
+]
+
+
+class DmpBlock():
+    """
+    A block of consecutive transactions read from a dmp file.
+
+    Attributes
+    ----------
+    offsets : np.ndarray
+        The byte offset of each line in the dmp file.
+    hashes : np.ndarray
+        The "S81" column of transaction hashes.
+    rows : np.ndarray
+        The (n, TRANSACTION_LENGTH) array of tryte codes, a zero-copy view
+        of the mapped file when the lines of the block have the same length.
+    """
+
+    def __init__(self, offsets, hashes, rows) -> None:
+        self.offsets = offsets
+        self.hashes = hashes
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+class DmpReader():
+    """
+    Memory-mapped, zero-copy reader of dmp files.
+
+    Each line of a dmp file is "<81-tryte hash>,<2673-tryte transaction>".
+    The file is mapped once and the line boundaries are found with
+    mmap.find(), so the hash and transaction are handed out as memoryviews
+    of the mapping instead of decoded text.
+
+    Methods
+    -------
+    chunks()
+        Split the dmp file into byte ranges aligned to line boundaries.
+    records()
+        Iterate (offset, hash, transaction) memoryviews line by line.
+    blocks()
+        Iterate DmpBlock of many lines at once for batch filtering.
+    """
+
+    def __init__(self, filepath: str, start=0, end=None) -> None:
+        """
+        Parameters
+        ----------
+        filepath : str
+            The path of the dmp file.
+
+        start : int
+            The byte offset to start reading from, which must be a line start.
+
+        end : int
+            The byte offset to stop at. Lines starting before it are read entirely.
+        """
+        self.filepath = filepath
+        self.start = start
+        self.end = end
+        self._file = None
+        self._mm = None
+
+    def __enter__(self) -> 'DmpReader':
+        self._file = open(self.filepath, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self._mm = b''
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if isinstance(self._mm, mmap.mmap):
+            try:
+                self._mm.close()
+            except BufferError:
+                logging.debug(f"Views of {self.filepath} are still alive")
+        self._file.close()
+
+    def __iter__(self):
+        return self.records()
+
+    def chunks(self, chunk_size: int) -> list:
+        """Split the dmp file into byte ranges aligned to line boundaries.
+
+        Parameters
+        ----------
+        chunk_size : int
+            The approximate number of bytes in a chunk.
+
+        Returns
+        ----------
+        The (start, end) byte ranges, in file order.
+
+        """
+        size = len(self._mm)
+        bounds = [0]
+        while bounds[-1] + chunk_size < size:
+            nl = self._mm.find(b'\n', bounds[-1] + chunk_size)
+            if nl < 0 or nl + 1 >= size:
+                break
+            bounds.append(nl + 1)
+        bounds.append(size)
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def _line(self, pos: int) -> tuple:
+        mm = self._mm
+        nl = mm.find(b'\n', pos)
+        if nl < 0:
+            nl = len(mm)
+        end = nl
+        if end > pos and mm[end - 1] == 13:  # b'\r'
+            end -= 1
+        comma = -1
+        if end > pos:
+            comma = mm.find(b',', pos, end)
+            if comma < 0:
+                raise ValueError(
+                    f"Cannot identify the hash in {self.filepath} at {pos}!")
+        return comma, end, nl
+
+    def _lines(self, offsets=None):
+        size = len(self._mm)
+        limit = size if self.end is None else min(self.end, size)
+        if offsets is not None:
+            # Only the lines starting at the given offsets, e.g., from a DmpIndex
+            for pos in offsets:
+                pos = int(pos)
+                if self.start <= pos < limit:
+                    comma, end, _ = self._line(pos)
+                    if end > pos:
+                        yield pos, comma, end
+            return
+        pos = self.start
+        while pos < limit:
+            comma, end, nl = self._line(pos)
+            if end > pos:
+                yield pos, comma, end
+            pos = nl + 1
+
+    def records(self, offsets=None):
+        """Iterate the lines of the dmp file.
+
+        Parameters
+        ----------
+        offsets : iterable
+            Only read the lines starting at these sorted byte offsets.
+
+        Returns
+        ----------
+        An iterator of (offset, hash, transaction) tuples, where offset is
+        the byte offset of the line and hash and transaction are memoryviews.
+
+        """
+        view = memoryview(self._mm)
+        try:
+            for pos, comma, end in self._lines(offsets):
+                yield pos, view[pos:comma], view[comma + 1:end]
+        finally:
+            view.release()
+
+    def blocks(self, size=65536):
+        """Iterate the lines of the dmp file in blocks.
+
+        Parameters
+        ----------
+        size : int
+            The maximum number of lines in a block.
+
+        Returns
+        ----------
+        An iterator of DmpBlock.
+
+        """
+        lines = []
+        for line in self._lines():
+            lines.append(line)
+            if len(lines) == size:
+                yield self._block(lines)
+                lines = []
+        if lines:
+            yield self._block(lines)
+
+    def _block(self, lines: list) -> DmpBlock:
+        starts = np.array([l[0] for l in lines], dtype=np.int64)
+        commas = np.array([l[1] for l in lines], dtype=np.int64)
+        ends = np.array([l[2] for l in lines], dtype=np.int64)
+        if ((commas - starts != TRANSACTION_HASH_LENGTH).any() or
+                (ends - commas - 1 != TRANSACTION_LENGTH).any()):
+            raise ValueError(
+                f"Cannot identify the transactions in {self.filepath} at {starts[0]}!")
+
+        strides = np.diff(starts)
+        if len(lines) == 1 or (strides == strides[0]).all():
+            stride = int(strides[0]) if len(lines) > 1 else 0
+            rows = rows_view(self._mm, stride=stride or None,
+                             offset=int(commas[0]) + 1)[:len(lines)]
+            hashes = rows_view(self._mm, TRANSACTION_HASH_LENGTH, stride or None,
+                               int(starts[0]))[:len(lines)]
+        else:
+            buffer = np.frombuffer(self._mm, dtype=np.uint8)
+            rows = np.stack([buffer[c + 1:e] for c, e in zip(commas, ends)])
+            hashes = np.stack([buffer[s:c] for s, c in zip(starts, commas)])
+        hashes = np.ascontiguousarray(hashes).view(
+            f'S{TRANSACTION_HASH_LENGTH}').reshape(len(lines))
+        return DmpBlock(starts, hashes, rows)
@@ -0,0 +1,170 @@
+import asyncio
+import os
+import pickle
+import struct
+import logging
+
+__all__ = [
+    'IngestBuffer',
+    'POLICIES',
+]
+
+POLICIES = ('block', 'drop_oldest', 'drop_newest', 'spill')
+"""
+The policies of an IngestBuffer when it is full.
+"""
+
+_FRAME = struct.Struct('<I')
+
+
+class IngestBuffer(asyncio.Queue):
+    """
+    Bounded asyncio queue of received messages with a policy when it is full.
+
+    - block: put() waits for a free slot, which applies backpressure to the
+      receiving.
+    - drop_oldest: the oldest queued message is dropped for the new one.
+    - drop_newest: the new message is dropped.
+    - spill: the new message is appended to a journal file on disk, and the
+      journal is replayed into the queue, in order, as slots are freed. A
+      journal left by a previous run is replayed as well.
+
+
+    Attributes
+    ----------
+    received : int
+        The number of messages put.
+    dropped : int
+        The number of messages dropped.
+    spilled : int
+        The number of messages written to the journal.
+    replayed : int
+        The number of messages read back from the journal.
+
+    Methods
+    -------
+    stats()
+        Return the counters.
+    close()
+        Close the journal.
+    """
+
+    def __init__(self, maxsize=10000, policy='block', journal_path='zmq_journal.bin') -> None:
+        """
+        Parameters
+        ----------
+        maxsize : int
+            The maximum number of messages in memory.
+
+        policy : str
+            Set "block", "drop_oldest", "drop_newest" or "spill" for the policy.
+
+        journal_path : str
+            The journal file of the spill policy.
+        """
+        if policy not in POLICIES:
+            raise ValueError(
+                f"The policy {policy} is not supported, use one of {', '.join(POLICIES)}!")
+        if maxsize <= 0:
+            raise ValueError(f"The maxsize {maxsize} must be positive!")
+        super().__init__(maxsize=maxsize)
+        self.policy = policy
+        self.journal_path = journal_path
+        self.received = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.replayed = 0
+        self._journal = None
+        self._read_pos = 0
+        if policy == 'spill':
+            self._journal = open(journal_path, 'a+b')
+            self._write_pos = self._journal.seek(0, os.SEEK_END)
+            if self._write_pos:
+                logging.info(f"Replaying the journal {journal_path} of {self._write_pos} bytes")
+            self._replay()
+
+    def stats(self) -> dict:
+        """Return the counters and the current sizes."""
+        return {'received': self.received, 'dropped': self.dropped, 'spilled': self.spilled,
+                'replayed': self.replayed, 'queued': self.qsize(), 'journal_bytes': self.journal_bytes}
+
+    @property
+    def journal_bytes(self) -> int:
+        """The number of journal bytes not replayed yet."""
+        return 0 if self._journal is None else self._write_pos - self._read_pos
+
+    def _spill(self, item) -> None:
+        data = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        self._journal.seek(self._write_pos)
+        self._journal.write(_FRAME.pack(len(data)) + data)
+        self._write_pos += _FRAME.size + len(data)
+        self.spilled += 1
+
+    def _replay(self) -> None:
+        if not self.journal_bytes:
+            return
+        self._journal.flush()
+        while not self.full() and self._read_pos < self._write_pos:
+            self._journal.seek(self._read_pos)
+            header = self._journal.read(_FRAME.size)
+            size = _FRAME.unpack(header)[0] if len(header) == _FRAME.size else -1
+            data = self._journal.read(size) if size >= 0 else b''
+            if len(data) != size:
+                logging.error(f"Dropping the incomplete end of the journal {self.journal_path}")
+                self._journal.truncate(self._read_pos)
+                self._write_pos = self._read_pos
+                break
+            self._read_pos += _FRAME.size + len(data)
+            super().put_nowait(pickle.loads(data))
+            self.replayed += 1
+        if self._read_pos == self._write_pos:
+            # The journal is empty again
+            self._journal.truncate(0)
+            self._read_pos = self._write_pos = 0
+
+    async def put(self, item) -> None:
+        """Put a message, applying the policy if the queue is full."""
+        if self.policy == 'block':
+            await super().put(item)
+        else:
+            self.put_nowait(item)
+
+    def put_nowait(self, item) -> None:
+        if self.policy == 'block':
+            super().put_nowait(item)
+            self.received += 1
+            return
+        self.received += 1
+        if self.policy == 'spill' and self.journal_bytes:
+            # Keep the order: the journal is replayed first
+            self._spill(item)
+            return
+        if not self.full():
+            super().put_nowait(item)
+        elif self.policy == 'drop_oldest':
+            super().get_nowait()
+            self.task_done()
+            self.dropped += 1
+            super().put_nowait(item)
+        elif self.policy == 'drop_newest':
+            self.dropped += 1
+        else:
+            self._spill(item)
+
+    def get_nowait(self):
+        item = super().get_nowait()
+        if self._journal is not None:
+            self._replay()
+        return item
+
+    def close(self) -> None:
+        """Close the journal, keeping the messages not replayed for the next run."""
+        if self._journal is not None:
+            if self._read_pos:
+                # Drop the replayed messages from the journal
+                self._journal.seek(self._read_pos)
+                rest = self._journal.read(self.journal_bytes)
+                self._journal.truncate(0)
+                self._journal.write(rest)
+            self._journal.close()
+            self._journal = None
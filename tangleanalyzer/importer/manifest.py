@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import logging
+
+__all__ = [
+    'Manifest',
+    'file_digest',
+]
+
+
+def file_digest(filepath: str, block_size=1024 * 1024) -> str:
+    """Return the blake2b hex digest of the content of a file."""
+    digest = hashlib.blake2b()
+    with open(filepath, 'rb') as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest():
+    """
+    JSON manifest of the processed dmp files, for incremental runs.
+
+    Each dmp file is recorded with its size, mtime and content digest and the
+    fingerprint of the settings it is processed with, plus the checkpoints of
+    its finished chunks until the whole file is done. A file is unchanged if
+    its size and mtime match the record; if only the mtime differs, the content
+    digest is compared, so touching a file does not reprocess it.
+
+    Methods
+    -------
+    begin()
+        Start (or resume) processing a dmp file.
+    is_done()
+        Whether a dmp file is done with the current settings.
+    checkpoint()
+        Record a finished chunk of a dmp file.
+    checkpoints()
+        Return the finished chunks of a dmp file.
+    finish()
+        Record a dmp file as done.
+    save()
+        Write the manifest to disk.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Parameters
+        ----------
+        path : str
+            The path of the manifest file, which is created if it does not exist.
+        """
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.entries = json.load(f)['files']
+            except:
+                raise ValueError(f"Cannot read the manifest {path}!")
+
+    def _unchanged(self, entry: dict, filepath: str, fingerprint: str) -> bool:
+        if entry is None or entry['fingerprint'] != fingerprint:
+            return False
+        stat = os.stat(filepath)
+        if entry['size'] != stat.st_size:
+            return False
+        if entry['mtime'] != stat.st_mtime_ns:
+            if entry['digest'] != file_digest(filepath):
+                return False
+            entry['mtime'] = stat.st_mtime_ns
+        return True
+
+    def begin(self, filename: str, filepath: str, fingerprint: str) -> None:
+        """Start (or resume) processing a dmp file.
+
+        The record of the file, with its checkpoints, is kept if the file and
+        the fingerprint are unchanged, else it is replaced by a new record.
+
+        Parameters
+        ----------
+        filename : str
+            The dmp file name.
+
+        filepath : str
+            The path of the dmp file.
+
+        fingerprint : str
+            The fingerprint of the filter and output settings.
+        """
+        if self._unchanged(self.entries.get(filename), filepath, fingerprint):
+            return
+        logging.debug(f"{filename} is new or changed")
+        stat = os.stat(filepath)
+        self.entries[filename] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'digest': file_digest(filepath),
+            'fingerprint': fingerprint,
+            'done': False,
+            'chunks': {},
+        }
+
+    def is_done(self, filename: str) -> bool:
+        """Whether a dmp file, started by begin(), is done with the current settings."""
+        return self.entries[filename]['done']
+
+    def checkpoint(self, filename: str, start: int, end: int, result: str) -> None:
+        """Record a finished chunk of a dmp file.
+
+        Parameters
+        ----------
+        filename : str
+            The dmp file name.
+
+        start : int
+            The byte offset of the chunk.
+
+        end : int
+            The end of the chunk.
+
+        result : str
+            The part file written for the chunk.
+        """
+        self.entries[filename]['chunks'][f'{start}:{end}'] = result
+
+    def checkpoints(self, filename: str) -> dict:
+        """Return the finished chunks of a dmp file.
+
+        Returns
+        ----------
+        Maps the (start, end) of each finished chunk to its part file.
+
+        """
+        return {tuple(int(i) for i in k.split(':')): v
+                for k, v in self.entries[filename]['chunks'].items()}
+
+    def finish(self, filename: str) -> None:
+        """Record a dmp file as done and drop its checkpoints."""
+        self.entries[filename]['done'] = True
+        self.entries[filename]['chunks'] = {}
+
+    def save(self) -> None:
+        """Write the manifest to disk, atomically replacing the previous one."""
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'files': self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
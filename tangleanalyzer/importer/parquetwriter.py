@@ -0,0 +1,163 @@
+import os
+import numpy as np
+from ..common.const import TRANSACTION_LENGTH, TRANSACTION_HASH_LENGTH, TAG_B, TAG_E
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is an optional dependency
+    pa = None
+    pq = None
+
+__all__ = [
+    'ParquetDecodedWriter',
+    'merge_parquet',
+    'parquet_schema',
+]
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError(
+            "The parquet output format requires pyarrow (pip install pyarrow)!")
+
+
+def parquet_schema(include_tx=True):
+    """The schema of the decoded dmp parquet files.
+
+    The columns are those of the txt output: typed int64 columns for the
+    numbers, a date column for time, and fixed-width binary columns for
+    the trytes.
+
+    Parameters
+    ----------
+    include_tx : bool
+        Keep the column of the whole transaction trytes.
+
+    Returns
+    ----------
+    The pyarrow schema.
+
+    """
+    _require_pyarrow()
+    hash_type = pa.binary(TRANSACTION_HASH_LENGTH)
+    fields = [('time', pa.date32())]
+    if include_tx:
+        fields.append(('tx', pa.binary(TRANSACTION_LENGTH)))
+    fields += [
+        ('tx_hash_str', hash_type),
+        ('address', hash_type),
+        ('value', pa.int64()),
+        ('timestamp', pa.int64()),
+        ('current_index', pa.int64()),
+        ('last_index', pa.int64()),
+        ('bundle', hash_type),
+        ('trunk', hash_type),
+        ('branch', hash_type),
+        ('tag', pa.binary(TAG_E - TAG_B)),
+        ('attachtimestamp', pa.int64()),
+    ]
+    return pa.schema(fields)
+
+
+def _first_occurrences(hashes: np.ndarray) -> np.ndarray:
+    """Return the mask of the first occurrence of each hash of an "S" array."""
+    mask = np.zeros(len(hashes), dtype=bool)
+    mask[np.unique(hashes, return_index=True)[1]] = True
+    return mask
+
+
+def merge_parquet(paths: list, filepath: str, include_tx=True) -> None:
+    """Copy the row groups of parquet files into one file, then remove them.
+
+    Parameters
+    ----------
+    paths : list
+        The parquet files, e.g., the parts of the chunks of a dmp file.
+
+    filepath : str
+        The output file path.
+
+    include_tx : bool
+        The parts keep the tx column.
+    """
+    _require_pyarrow()
+    with pq.ParquetWriter(filepath, parquet_schema(include_tx), compression="zstd") as writer:
+        for path in paths:
+            part = pq.ParquetFile(path)
+            for i in range(part.num_row_groups):
+                writer.write_table(part.read_row_group(i))
+            part.close()
+    for path in paths:
+        os.remove(path)
+
+
+class ParquetDecodedWriter():
+    """
+    Writer of decoded transactions to a parquet file.
+
+    Each batch of decoded columns is written as its own row group(s) as
+    soon as it is decoded. A transaction repeated (by hash) within a batch
+    is written once; no state is kept across the batches, since a dmp file
+    lists a transaction once.
+
+    Methods
+    -------
+    write_columns()
+        Write a batch of decoded columns.
+    close()
+        Close the file.
+    """
+
+    def __init__(self, filepath: str, include_tx=True, row_group_size=65536) -> None:
+        """
+        Parameters
+        ----------
+        filepath : str
+            The output file path.
+
+        include_tx : bool
+            Keep the column of the whole transaction trytes.
+
+        row_group_size : int
+            The maximum number of rows in a row group.
+        """
+        _require_pyarrow()
+        self.filepath = filepath
+        self.include_tx = include_tx
+        self.row_group_size = row_group_size
+        self.schema = parquet_schema(include_tx)
+        self._writer = pq.ParquetWriter(filepath, self.schema, compression="zstd")
+
+    def __enter__(self) -> 'ParquetDecodedWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write_columns(self, columns: dict) -> None:
+        """Write a batch of decoded columns.
+
+        Parameters
+        ----------
+        columns : dict
+            Maps the column names of parquet_schema() to arrays, with the
+            timestamps in seconds as for the txt output.
+        """
+        if len(columns['timestamp']) == 0:
+            return
+        mask = _first_occurrences(np.asarray(columns['tx_hash_str']))
+        if not mask.all():
+            columns = {k: np.asarray(v)[mask] for k, v in columns.items()}
+        # Days since the epoch, as the UTC date in the time column of the txt output
+        columns['time'] = (np.asarray(
+            columns['timestamp'], dtype=np.int64) // 86400).astype(np.int32)
+        table = pa.table({f.name: pa.array(columns[f.name], type=f.type)
+                          for f in self.schema}, schema=self.schema)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+
+    def close(self) -> None:
+        """Close the file."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -0,0 +1,256 @@
+import calendar
+import datetime
+import glob
+import os
+from os.path import join
+from collections import OrderedDict
+import logging
+from ..common.const import MILESTONES_USING_TIMESTAMP_ONLY
+from .decodedwriter import DECODED_HEADER, format_decoded
+
+__all__ = [
+    'PartitionedWriter',
+    'PartitionReader',
+    'transaction_time',
+]
+
+_TIMESTAMP_COLUMN = 5
+_ATCH_TIMESTAMP_COLUMN = 12
+
+_PARTITIONS = {
+    'day': ("%Y%m%d", 86400),
+    'hour': ("%Y%m%d/%H", 3600),
+}
+
+
+def _check_partition(partition: str) -> None:
+    if partition not in _PARTITIONS:
+        raise ValueError(f"The partition {partition} is not supported, use day or hour!")
+
+
+def transaction_time(timestamp: int, attachtimestamp: int, milestone: str) -> int:
+    """The time (in seconds) of a decoded transaction, as identified by TimeFilter.
+
+    The timestamp is used for the milestones in MILESTONES_USING_TIMESTAMP_ONLY,
+    else the attachment timestamp if it is not zero.
+    """
+    if milestone in MILESTONES_USING_TIMESTAMP_ONLY or attachtimestamp == 0:
+        return timestamp
+    return attachtimestamp
+
+
+def _line_time(line: str, milestone: str) -> int:
+    columns = line.split("\t", _ATCH_TIMESTAMP_COLUMN + 1)
+    return transaction_time(int(columns[_TIMESTAMP_COLUMN]),
+                            int(columns[_ATCH_TIMESTAMP_COLUMN]), milestone)
+
+
+class PartitionedWriter():
+    """
+    Writer of decoded transactions into time partitions.
+
+    Each line goes to <folder>/<%Y%m%d>/<milestone>.txt (or
+    <folder>/<%Y%m%d>/<%H>/<milestone>.txt for hours) after the UTC day
+    (or hour) of its transaction time, the time TimeFilter uses. Every
+    partition file starts with the header line. At most max_open partition
+    files are kept open; the least recently used one is closed and reopened
+    for appending when needed.
+
+    Methods
+    -------
+    write()
+        Write a decoded transaction.
+    writelines()
+        Write output lines, e.g., merged by merge_decoded().
+    close()
+        Close the partition files.
+    """
+
+    def __init__(self, folder: str, milestone: str, partition="day", max_open=64) -> None:
+        """
+        Parameters
+        ----------
+        folder : str
+            The root folder of the partitions.
+
+        milestone : str
+            The milestone of the dmp file, which names the partition files.
+
+        partition : str
+            Set "day" or "hour" for the partition size.
+
+        max_open : int
+            The maximum number of open partition files.
+        """
+        _check_partition(partition)
+        self.folder = folder
+        self.milestone = milestone
+        self.partition = partition
+        self.max_open = max_open
+        self._files = OrderedDict()
+        self._created = set()
+        # Rows of a previous run of the milestone may be in other partitions
+        for path in glob.glob(join(folder, '*', f'{milestone}.txt')) + \
+                glob.glob(join(folder, '*', '*', f'{milestone}.txt')):
+            os.remove(path)
+
+    def __enter__(self) -> 'PartitionedWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _file(self, key: str):
+        f = self._files.get(key)
+        if f is not None:
+            self._files.move_to_end(key)
+            return f
+        if len(self._files) >= self.max_open:
+            _, oldest = self._files.popitem(last=False)
+            oldest.close()
+        path = join(self.folder, key, f'{self.milestone}.txt')
+        if key in self._created:
+            f = open(path, 'a', buffering=1024 * 1024)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = open(path, 'w', buffering=1024 * 1024)
+            f.write(DECODED_HEADER)
+            self._created.add(key)
+        self._files[key] = f
+        return f
+
+    def writelines(self, lines) -> None:
+        """Write output lines, as formatted by format_decoded()."""
+        fmt = _PARTITIONS[self.partition][0]
+        for line in lines:
+            key = datetime.datetime.fromtimestamp(
+                _line_time(line, self.milestone), tz=datetime.timezone.utc).strftime(fmt)
+            self._file(key).write(line)
+
+    def write(self, row: str, timestamp: int) -> None:
+        """Write a decoded transaction, see DecodedWriter.write()."""
+        self.writelines((format_decoded(row, timestamp),))
+
+    def close(self) -> None:
+        """Close the partition files."""
+        while self._files:
+            _, f = self._files.popitem()
+            f.close()
+
+
+class PartitionReader():
+    """
+    Reader of time-partitioned decoded transactions.
+
+    Only the partitions which overlap the bounds of a TimeFilter are opened.
+
+    Methods
+    -------
+    partitions()
+        Return the partition folders to read for a TimeFilter.
+    files()
+        Return the partition files to read for a TimeFilter.
+    rows()
+        Iterate the decoded transactions which pass a TimeFilter.
+    """
+
+    def __init__(self, folder: str, partition="day") -> None:
+        """
+        Parameters
+        ----------
+        folder : str
+            The root folder of the partitions.
+
+        partition : str
+            Set "day" or "hour" for the partition size used when writing.
+        """
+        _check_partition(partition)
+        self.folder = folder
+        self.partition = partition
+
+    def _bounds(self, time_filter, range_larger_smaller) -> tuple:
+        if time_filter is None:
+            return None, None
+        if range_larger_smaller not in ('R', 'm', 'M', 'E', 'RE', 'mE', 'ME'):
+            raise ValueError(f"{range_larger_smaller} is not supported!")
+        low = time_filter._min if range_larger_smaller in ('R', 'm', 'E', 'RE', 'mE') else None
+        high = time_filter._max if range_larger_smaller in ('R', 'M', 'RE', 'ME') else None
+        if range_larger_smaller == 'E':
+            high = time_filter._min
+        return low, high
+
+    def partitions(self, time_filter=None, range_larger_smaller='R') -> list:
+        """Return the partition folders to read for a TimeFilter.
+
+        Parameters
+        ----------
+        time_filter : TimeFilter
+            The time filter, None for all the partitions.
+
+        range_larger_smaller : str
+            The range setting of the time filter, see TimeFilter.make_filter().
+
+        Returns
+        ----------
+        The sorted partition folders which overlap the time filter.
+
+        """
+        fmt, size = _PARTITIONS[self.partition]
+        low, high = self._bounds(time_filter, range_larger_smaller)
+        pattern = join(self.folder, *(['*'] * fmt.count('/')), '*')
+        selected = []
+        for path in sorted(glob.glob(pattern)):
+            if not os.path.isdir(path):
+                continue
+            key = os.path.relpath(path, self.folder)
+            try:
+                start = calendar.timegm(datetime.datetime.strptime(key, fmt).timetuple())
+            except ValueError:
+                logging.debug(f"{path} is not a partition")
+                continue
+            if low is not None and start + size <= low:
+                continue
+            if high is not None and start > high:
+                continue
+            selected.append(path)
+        return selected
+
+    def files(self, time_filter=None, range_larger_smaller='R') -> list:
+        """Return the partition files to read for a TimeFilter, see partitions()."""
+        return [join(path, name) for path in self.partitions(time_filter, range_larger_smaller)
+                for name in sorted(os.listdir(path)) if name.endswith('.txt')]
+
+    def rows(self, time_filter=None, range_larger_smaller='R'):
+        """Iterate the decoded transactions which pass a TimeFilter.
+
+        Parameters
+        ----------
+        time_filter : TimeFilter
+            The time filter, None for all the transactions.
+
+        range_larger_smaller : str
+            The range setting of the time filter, see TimeFilter.make_filter().
+
+        Returns
+        ----------
+        An iterator of the decoded transactions as lists of columns,
+        in the order of the output header. The transaction times are
+        compared at second precision.
+
+        """
+        keep = None
+        if time_filter is not None:
+            keep = time_filter.make_filter(range_larger_smaller, 'dict')
+        for path in self.files(time_filter, range_larger_smaller):
+            milestone = os.path.basename(path)[:-len('.txt')]
+            with open(path) as f:
+                next(f, None)
+                for line in f:
+                    columns = line.rstrip("\n").split("\t")
+                    # The time of the row by the rule of its milestone, compared as a timestamp
+                    if keep is not None and not keep({
+                            'timestamp': transaction_time(int(columns[_TIMESTAMP_COLUMN]),
+                                                          int(columns[_ATCH_TIMESTAMP_COLUMN]), milestone),
+                            'attachment_timestamp': 0}):
+                        continue
+                    yield columns
@@ -0,0 +1,158 @@
+from .sink import TransactionSink
+
+try:
+    from kafka import KafkaProducer
+except ImportError:  # kafka-python is an optional dependency
+    KafkaProducer = None
+
+__all__ = [
+    'Publisher',
+    'KafkaPublisher',
+    'FilePublisher',
+    'MemoryPublisher',
+]
+
+
+class Publisher(TransactionSink):
+    """
+    Base class of the publishers of zmq messages.
+
+    publish() never blocks the caller: the messages are queued and sent in
+    batches of batch_size, or of what arrived within linger seconds, by the
+    writer thread of the TransactionSink. If the backend falls behind by
+    max_pending messages, the new messages are dropped and counted.
+
+
+    Attributes
+    ----------
+    dropped : int
+        The number of messages dropped because the queue was full.
+
+    Methods
+    -------
+    publish()
+        Queue a message to be published.
+    """
+
+    def __init__(self, batch_size=500, linger=0.1, max_pending=100000) -> None:
+        """
+        Parameters
+        ----------
+        batch_size : int
+            The maximum number of messages sent at once.
+
+        linger : float
+            The maximum time (in seconds) a message waits for its batch.
+
+        max_pending : int
+            The maximum number of queued messages.
+        """
+        super().__init__(batch_size=batch_size, flush_interval=linger, max_pending=max_pending)
+        self.dropped = 0
+
+    def publish(self, message: bytes) -> bool:
+        """Queue a message to be published.
+
+        Returns
+        ----------
+        False if the message is dropped, else True.
+
+        """
+        if self.write(message, block=False):
+            return True
+        self.dropped += 1
+        return False
+
+
+class KafkaPublisher(Publisher):
+    """
+    Kafka publisher of zmq messages.
+
+    The producer is created by the writer thread on the first message, so
+    a KafkaPublisher is constructed without connecting to the brokers.
+    """
+
+    def __init__(self, topic="test", bootstrap_servers='localhost:9092', **kwargs) -> None:
+        """
+        Parameters
+        ----------
+        topic : str
+            The topic to publish to.
+
+        bootstrap_servers : str
+            The Kafka brokers.
+
+        kwargs :
+            The batching settings, see Publisher.
+        """
+        if KafkaProducer is None:
+            raise ImportError(
+                "The kafka publisher requires kafka-python (pip install kafka-python)!")
+        super().__init__(**kwargs)
+        self.topic = topic
+        self.bootstrap_servers = bootstrap_servers
+        self._producer = None
+
+    def open(self) -> None:
+        self._producer = KafkaProducer(
+            bootstrap_servers=self.bootstrap_servers, api_version=(2, 5, 0))
+
+    def write_batch(self, messages: list) -> None:
+        for message in messages:
+            self._producer.send(self.topic, value=message)
+        self._producer.flush()
+
+    def release(self) -> None:
+        if self._producer is not None:
+            self._producer.close()
+            self._producer = None
+
+
+class FilePublisher(Publisher):
+    """
+    File publisher of zmq messages, one message per line.
+    """
+
+    def __init__(self, filepath="published.txt", **kwargs) -> None:
+        """
+        Parameters
+        ----------
+        filepath : str
+            The file to append the messages to.
+
+        kwargs :
+            The batching settings, see Publisher.
+        """
+        super().__init__(**kwargs)
+        self.filepath = filepath
+        self._file = None
+
+    def open(self) -> None:
+        self._file = open(self.filepath, 'ab')
+
+    def write_batch(self, messages: list) -> None:
+        self._file.write(b''.join(bytes(m) + b'\n' for m in messages))
+        self._file.flush()
+
+    def release(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class MemoryPublisher(Publisher):
+    """
+    In-process publisher of zmq messages, which keeps them in a list.
+
+    Attributes
+    ----------
+    messages : list
+        The published messages.
+    """
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.messages = []
+
+    def write_batch(self, messages: list) -> None:
+        self.messages.extend(messages)
@@ -0,0 +1,377 @@
+from multiprocessing import shared_memory
+import multiprocessing as mp
+import asyncio
+import os
+import struct
+import threading
+import zlib
+import logging
+import numpy as np
+from ..common.const import BUNDLE_HASH_B, BUNDLE_HASH_E, TRANSACTION_LENGTH, TRANSACTION_HASH_LENGTH
+
+__all__ = [
+    'SharedRing',
+    'ShardedFilter',
+]
+
+_HEADER_SIZE = 64
+_LENGTH = struct.Struct('<I')
+_SEQ = np.dtype('<i8')
+_MESSAGE_SIZE = TRANSACTION_LENGTH + 1 + TRANSACTION_HASH_LENGTH
+# The seconds close() waits for a worker to stop before terminating it
+_CLOSE_TIMEOUT = 5.0
+# The seconds between the checks for dead workers
+_POLL_INTERVAL = 1.0
+
+
+class SharedRing():
+    """
+    Single-producer single-consumer ring buffer of byte records in shared memory.
+
+    The records are copied into fixed-size slots of a SharedMemory block,
+    without pickling. Two semaphores count the free and the filled slots,
+    so put() and get() block without polling. A ring is passed to a
+    worker process at its creation and attached there by name.
+
+    The producer is one process, but put() holds a lock while it claims,
+    fills and counts a slot, so several threads of that process may put.
+
+    Methods
+    -------
+    put()
+        Copy a record into the ring.
+    get()
+        Copy the oldest record out of the ring.
+    close()
+        Detach from the shared memory, and free it in the creating process.
+    """
+
+    def __init__(self, slots=1024, slot_size=4096) -> None:
+        """
+        Parameters
+        ----------
+        slots : int
+            The number of records the ring holds.
+
+        slot_size : int
+            The maximum size of a record in bytes.
+        """
+        self.slots = slots
+        self.slot_size = slot_size
+        self._stride = _LENGTH.size + slot_size
+        self._shm = shared_memory.SharedMemory(create=True, size=_HEADER_SIZE + slots * self._stride)
+        # The creator owns and unlinks the block, also if its workers are forked
+        self._owner_pid = os.getpid()
+        self.free = mp.Semaphore(slots)
+        self.filled = mp.Semaphore(0)
+        self._put_lock = threading.Lock()
+        self._attach()
+        self._counters[:] = 0
+
+    def _attach(self) -> None:
+        # counters[0] is the number of records put, counters[1] of records got
+        self._counters = np.ndarray((2,), dtype=np.int64, buffer=self._shm.buf)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state['_shm'] = self._shm.name
+        del state['_counters']
+        del state['_put_lock']
+        return state
+
+    def __setstate__(self, state) -> None:
+        self.__dict__.update(state)
+        self._shm = shared_memory.SharedMemory(name=state['_shm'])
+        self._put_lock = threading.Lock()
+        self._attach()
+
+    def put(self, record, block=True, timeout=None) -> bool:
+        """Copy a record into the ring, waiting for a free slot if block.
+
+        Returns
+        ----------
+        False if the ring stays full, else True.
+
+        """
+        if len(record) > self.slot_size:
+            raise ValueError(f"The record of {len(record)} bytes exceeds the slot size {self.slot_size}!")
+        if not self.free.acquire(block, timeout):
+            return False
+        with self._put_lock:
+            offset = _HEADER_SIZE + (int(self._counters[0]) % self.slots) * self._stride
+            _LENGTH.pack_into(self._shm.buf, offset, len(record))
+            self._shm.buf[offset + _LENGTH.size:offset + _LENGTH.size + len(record)] = record
+            self._counters[0] += 1
+            self.filled.release()
+        return True
+
+    def get(self, block=True, timeout=None):
+        """Copy the oldest record out of the ring.
+
+        Returns
+        ----------
+        The record as bytes, or None if the ring stays empty.
+
+        """
+        if not self.filled.acquire(block, timeout):
+            return None
+        offset = _HEADER_SIZE + (int(self._counters[1]) % self.slots) * self._stride
+        length = _LENGTH.unpack_from(self._shm.buf, offset)[0]
+        record = bytes(self._shm.buf[offset + _LENGTH.size:offset + _LENGTH.size + length])
+        self._counters[1] += 1
+        self.free.release()
+        return record
+
+    def close(self) -> None:
+        """Detach from the shared memory, and free it in the creating process."""
+        if self._shm is None:
+            return
+        del self._counters
+        self._shm.close()
+        if self._owner_pid == os.getpid():
+            self._shm.unlink()
+        self._shm = None
+
+
+def _shard_worker(inbox, outbox, ready, filterlist, filter_plan, batch_size) -> None:
+    # The filters are shipped once, as arguments of the long-lived worker
+    from .zmqsub import filter_messages
+    batch_filter = None if filter_plan is None else filter_plan.make_batch_filter()
+    while True:
+        records = [inbox.get()]
+        while len(records) < batch_size and records[-1]:
+            record = inbox.get(block=False)
+            if record is None:
+                break
+            records.append(record)
+        stop = not records[-1]
+        if stop:
+            records.pop()
+        if records:
+            seqs = np.frombuffer(b''.join(r[:_SEQ.itemsize] for r in records), dtype=_SEQ)
+            try:
+                hits = filter_messages([r[_SEQ.itemsize:] for r in records], filterlist, batch_filter)
+            except Exception as e:
+                logging.error(f"Failed to filter {len(records)} messages: {e}")
+                hits = [False] * len(records)
+            outbox.put(seqs.tobytes() + np.asarray(hits, dtype=np.uint8).tobytes())
+            ready.release()
+        if stop:
+            break
+    inbox.close()
+    outbox.close()
+
+
+class _Batch():
+    __slots__ = ('remaining', 'hits', 'future', 'loop')
+
+    def __init__(self, size, future, loop) -> None:
+        self.remaining = size
+        self.hits = [False] * size
+        self.future = future
+        self.loop = loop
+
+
+class ShardedFilter():
+    """
+    Filtering of zmq messages sharded across long-lived worker processes.
+
+    The messages are spread over the workers by a hash of their bundle hash;
+    the workers keep no state across messages, so any stable spread would
+    do. Each worker gets the filters once, when it starts, reads the messages
+    from its input SharedRing and writes the results, a batch of (sequence
+    number, hit) at a time, to its output SharedRing. A collector thread of
+    the main process reads the results and resolves the batches awaited by
+    filter(). filter() may be awaited by several consumers at once: their
+    puts into an input ring, from the event loop or an executor thread, are
+    serialized by the ring.
+
+    Methods
+    -------
+    start()
+        Start the worker processes and the collector thread.
+    filter()
+        Filter a batch of messages, awaiting the results.
+    close()
+        Stop the workers and free the shared memory.
+    """
+
+    def __init__(self, shards=2, filterlist=[], filter_plan=None, slots=4096, batch_size=256) -> None:
+        """
+        Parameters
+        ----------
+        shards : int
+            The number of worker processes.
+
+        filterlist : list
+            The str filters, run if filter_plan is None. They must be picklable.
+
+        filter_plan : FilterPlan
+            If set, the messages are filtered with its batch filter.
+
+        slots : int
+            The number of messages each input ring holds.
+
+        batch_size : int
+            The maximum number of messages a worker filters at once.
+        """
+        if shards <= 0:
+            raise ValueError(f"The number of shards {shards} must be positive!")
+        self.shards = shards
+        self.filterlist = filterlist
+        self.filter_plan = filter_plan
+        self.slots = slots
+        self.batch_size = batch_size
+        self._inboxes = []
+        self._outboxes = []
+        self._workers = []
+        self._ready = None
+        self._collector = None
+        self._pending = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'ShardedFilter':
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def start(self) -> None:
+        """Start the worker processes and the collector thread."""
+        self._ready = mp.Semaphore(0)
+        for _ in range(self.shards):
+            inbox = SharedRing(self.slots, _SEQ.itemsize + _MESSAGE_SIZE)
+            outbox = SharedRing(max(16, self.slots // self.batch_size), self.batch_size * (_SEQ.itemsize + 1))
+            worker = mp.Process(target=_shard_worker, daemon=True,
+                                args=(inbox, outbox, self._ready, self.filterlist,
+                                      self.filter_plan, self.batch_size))
+            worker.start()
+            self._inboxes.append(inbox)
+            self._outboxes.append(outbox)
+            self._workers.append(worker)
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def _fail_dead_shards(self) -> None:
+        # The messages sent to a dead worker do not pass, so that filter() returns
+        dead = {s for s, w in enumerate(self._workers) if not w.is_alive()}
+        if not dead:
+            return
+        with self._lock:
+            failed = [seq for seq, (_, _, s) in self._pending.items() if s in dead]
+            entries = [self._pending.pop(seq) for seq in failed]
+        if entries:
+            logging.error(f"{len(entries)} messages were not filtered by the dead shards {sorted(dead)}")
+        for batch, _, _ in entries:
+            batch.remaining -= 1
+            if batch.remaining == 0:
+                batch.loop.call_soon_threadsafe(_resolve, batch)
+
+    def _collect(self) -> None:
+        while True:
+            if not self._ready.acquire(timeout=_POLL_INTERVAL):
+                self._fail_dead_shards()
+                continue
+            records = [r for r in (outbox.get(block=False) for outbox in self._outboxes) if r is not None]
+            if not records:
+                # Woken up by close()
+                if not any(w.is_alive() for w in self._workers):
+                    self._fail_dead_shards()
+                    break
+                continue
+            # A token is released per record; the extra records found consume theirs
+            for _ in range(len(records) - 1):
+                self._ready.acquire()
+            for record in records:
+                n = len(record) // (_SEQ.itemsize + 1)
+                seqs = np.frombuffer(record[:n * _SEQ.itemsize], dtype=_SEQ)
+                hits = record[n * _SEQ.itemsize:]
+                for seq, hit in zip(seqs.tolist(), hits):
+                    with self._lock:
+                        batch, i, _ = self._pending.pop(seq)
+                    batch.hits[i] = bool(hit)
+                    batch.remaining -= 1
+                    if batch.remaining == 0:
+                        batch.loop.call_soon_threadsafe(_resolve, batch)
+
+    def shard(self, content) -> int:
+        """Return the shard of a message content, by a hash of its bundle hash."""
+        return zlib.crc32(bytes(content[BUNDLE_HASH_B:BUNDLE_HASH_E])) % self.shards
+
+    async def filter(self, contents) -> list:
+        """Filter a batch of messages, awaiting the results.
+
+        Parameters
+        ----------
+        contents : list
+            The "trytes hash" contents of the messages, without the topic.
+
+        Returns
+        ----------
+        Whether each message passed the filters. Messages which are not
+        transactions, fail the filters or reach a dead worker do not pass.
+
+        """
+        loop = asyncio.get_running_loop()
+        batch = _Batch(len(contents), loop.create_future(), loop)
+        # The messages of a dead worker do not pass, without being sent
+        shards = [(i, self.shard(c)) for i, c in enumerate(contents) if len(c) == _MESSAGE_SIZE]
+        shards = [(i, s) for i, s in shards if self._workers[s].is_alive()]
+        batch.remaining = len(shards)
+        if not shards:
+            return batch.hits
+        for i, s in shards:
+            with self._lock:
+                seq = self._seq
+                self._seq += 1
+                self._pending[seq] = (batch, i, s)
+            record = np.array(seq, dtype=_SEQ).tobytes() + bytes(contents[i])
+            if not self._inboxes[s].put(record, block=False):
+                # The worker falls behind, wait for a slot off the event loop
+                await loop.run_in_executor(None, self._put, s, record)
+        return await batch.future
+
+    def _put(self, shard, record) -> None:
+        # Wait for a slot only while the worker is alive; else the collector
+        # fails the message
+        while self._workers[shard].is_alive():
+            if self._inboxes[shard].put(record, timeout=_POLL_INTERVAL):
+                return
+
+    def close(self, timeout=_CLOSE_TIMEOUT) -> None:
+        """Stop the workers and free the shared memory.
+
+        Parameters
+        ----------
+        timeout : float
+            The seconds to wait for a worker to stop, after which it is terminated.
+        """
+        for inbox, worker in zip(self._inboxes, self._workers):
+            if worker.is_alive() and not inbox.put(b'', timeout=timeout):
+                logging.error(f"The shard worker {worker.pid} does not read its messages")
+                worker.terminate()
+        for worker in self._workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                logging.error(f"The shard worker {worker.pid} did not stop, terminating it")
+                worker.terminate()
+                worker.join(timeout)
+        if self._collector is not None:
+            self._ready.release()
+            self._collector.join(timeout)
+            if self._collector.is_alive():
+                logging.error("The shard collector did not stop")
+            self._collector = None
+        for ring in self._inboxes + self._outboxes:
+            ring.close()
+        self._inboxes, self._outboxes, self._workers = [], [], []
+        if self._pending:
+            logging.error(f"{len(self._pending)} messages were not filtered by the shards")
+            self._pending.clear()
+
+
+def _resolve(batch) -> None:
+    if not batch.future.done():
+        batch.future.set_result(batch.hits)
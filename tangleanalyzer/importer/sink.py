@@ -0,0 +1,277 @@
+from abc import ABC, abstractmethod
+import queue
+import sqlite3
+import threading
+import time
+import logging
+
+__all__ = [
+    'TransactionSink',
+    'SqliteSink',
+]
+
+_STOP = object()
+
+
+class TransactionSink(ABC):
+    """
+    Base class of the storage sinks of transactions.
+
+    write() only puts a transaction into a bounded queue. A writer thread
+    takes them out in batches of batch_size, or of what arrived within
+    flush_interval seconds, and stores each batch at once with write_batch(),
+    which the subclasses implement. When the writer falls behind by
+    max_pending transactions, full() is true and write() blocks, which
+    applies backpressure to the producer. If the writer fails, e.g., open()
+    raises, the error is kept and write(), full() and flush() raise it.
+
+
+    Attributes
+    ----------
+    written : int
+        The number of transactions stored.
+    failed : int
+        The number of transactions in batches which could not be stored.
+    error : Exception
+        The error which stopped the writer, None while it runs.
+
+    Methods
+    -------
+    write()
+        Queue a transaction to be stored.
+    full()
+        Return True if the writer falls behind by max_pending transactions.
+    flush()
+        Wait until the queued transactions are stored.
+    close()
+        Store the queued transactions and stop the writer.
+    """
+
+    def __init__(self, batch_size=1000, flush_interval=1.0, max_pending=100000) -> None:
+        """
+        Parameters
+        ----------
+        batch_size : int
+            The maximum number of transactions stored at once.
+
+        flush_interval : float
+            The maximum time (in seconds) a transaction waits for its batch.
+
+        max_pending : int
+            The maximum number of queued transactions.
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self.written = 0
+        self.failed = 0
+        self.error = None
+        self._thread = None
+
+    def __enter__(self) -> 'TransactionSink':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def open(self) -> None:
+        """Prepare the storage, called in the writer thread."""
+
+    @abstractmethod
+    def write_batch(self, transactions: list) -> None:
+        """Store a batch of transactions, called in the writer thread."""
+
+    def release(self) -> None:
+        """Release the storage, called in the writer thread."""
+
+    def _run(self) -> None:
+        try:
+            self.open()
+            self._write_batches()
+        except Exception as e:
+            self.error = e
+            logging.error(f"The sink writer failed: {e}")
+            self._drain()
+        finally:
+            self.release()
+
+    def _drain(self) -> None:
+        # Fail the queued transactions, so that flush() does not wait for them
+        while True:
+            try:
+                transaction = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if transaction is not _STOP:
+                self.failed += 1
+            self._queue.task_done()
+
+    def _write_batches(self) -> None:
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if batch[-1] is _STOP:
+                stop = True
+                batch.pop()
+            if batch:
+                try:
+                    self.write_batch(batch)
+                    self.written += len(batch)
+                except Exception as e:
+                    self.failed += len(batch)
+                    logging.error(f"Failed to store {len(batch)} transactions: {e}")
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+
+    def _start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _check(self) -> None:
+        if self.error is not None:
+            raise RuntimeError(f"The sink writer failed: {self.error}!") from self.error
+
+    def _put(self, item, block: bool) -> bool:
+        # Wait for room in the queue only while the writer is alive
+        while self._thread.is_alive():
+            try:
+                self._queue.put(item, block=block, timeout=self.flush_interval if block else None)
+                return True
+            except queue.Full:
+                if not block:
+                    return False
+        return False
+
+    def full(self) -> bool:
+        """Return True if the writer falls behind by max_pending transactions.
+
+        Raises RuntimeError if the writer failed.
+        """
+        self._check()
+        return self._queue.full()
+
+    def write(self, transaction, block=True) -> bool:
+        """Queue a transaction to be stored.
+
+        Parameters
+        ----------
+        transaction : dict
+            The transaction, e.g., a LazyTransaction with its hash.
+
+        block : bool
+            Wait while the queue is full, else drop the transaction.
+
+        Returns
+        ----------
+        False if the transaction is dropped, else True.
+
+        Raises RuntimeError if the writer failed.
+
+        """
+        self._start()
+        self._check()
+        if self._put(transaction, block):
+            return True
+        self._check()
+        return False
+
+    def flush(self) -> None:
+        """Wait until the queued transactions are stored.
+
+        Raises RuntimeError if the writer failed.
+        """
+        if self._thread is not None:
+            done = self._queue.all_tasks_done
+            with done:
+                while self._queue.unfinished_tasks and self._thread.is_alive():
+                    done.wait(self.flush_interval)
+        self._check()
+
+    def close(self) -> None:
+        """Store the queued transactions and stop the writer."""
+        if self._thread is not None:
+            if self._thread.is_alive():
+                self._put(_STOP, block=True)
+            self._thread.join()
+            self._thread = None
+
+
+class SqliteSink(TransactionSink):
+    """
+    SQLite storage sink of transactions.
+
+    Each batch is inserted with one executemany() in one database
+    transaction. A transaction already stored (by hash) is ignored.
+    """
+
+    COLUMNS = ('hash', 'address', 'value', 'timestamp', 'current_index', 'last_index',
+               'bundle_hash', 'trunk_transaction_hash', 'branch_transaction_hash', 'tag',
+               'attachment_timestamp')
+
+    def __init__(self, database="zmq.db", table="transactions", store_trytes=True, **kwargs) -> None:
+        """
+        Parameters
+        ----------
+        database : str
+            The path of the SQLite database.
+
+        table : str
+            The table of the transactions.
+
+        store_trytes : bool
+            Store the transaction trytes as well.
+
+        kwargs :
+            The batching settings, see TransactionSink.
+        """
+        super().__init__(**kwargs)
+        if not table.isidentifier():
+            raise ValueError(f"The table name {table} is not valid!")
+        self.database = database
+        self.table = table
+        self.store_trytes = store_trytes
+        self._conn = None
+        columns = self.COLUMNS + (('trytes',) if store_trytes else ())
+        self._insert = (f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) "
+                        f"VALUES ({', '.join('?' * len(columns))})")
+
+    def open(self) -> None:
+        self._conn = sqlite3.connect(self.database)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        types = {'value': 'INTEGER', 'timestamp': 'INTEGER', 'current_index': 'INTEGER',
+                 'last_index': 'INTEGER', 'attachment_timestamp': 'INTEGER'}
+        columns = [f"{c} {types.get(c, 'TEXT')}" for c in self.COLUMNS[1:]]
+        if self.store_trytes:
+            columns.append("trytes TEXT")
+        with self._conn:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} "
+                               f"(hash TEXT PRIMARY KEY, {', '.join(columns)})")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_address ON {self.table} (address)")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_bundle ON {self.table} (bundle_hash)")
+
+    def write_batch(self, transactions: list) -> None:
+        rows = []
+        for t in transactions:
+            row = [t[c] for c in self.COLUMNS]
+            if self.store_trytes:
+                row.append(t.trytes if hasattr(t, 'trytes') else t.get('trytes'))
+            rows.append(tuple(str(v, 'ascii') if isinstance(v, (bytes, memoryview)) else v
+                              for v in row))
+        with self._conn:
+            self._conn.executemany(self._insert, rows)
+
+    def release(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -4,19 +4,17 @@ import asyncio
 import concurrent.futures
 import functools
 import logging
-import queue
 import random
 import signal
 import string
-import sys
-import threading
-import time
 import uuid
 import attr
-import iota
-from kafka import KafkaProducer
-import os
-from ..common.const import ZMQ_TRYTES_TOPIC_OFFSET
+import numpy as np
+from ..common.const import ZMQ_TRYTES_TOPIC_OFFSET, TRANSACTION_LENGTH, TRANSACTION_HASH_LENGTH, LIVE_MILESTONE
+from ..common.trytes import BatchColumns, LazyTransaction
+from .ingest_buffer import IngestBuffer
+from .dedup import DedupCache
+from .sharded_filter import ShardedFilter
 
 __all__ = [
     'zmq_init',
@@ -42,6 +40,61 @@ class RestartFailed(Exception):
     pass
 
 
+_worker_filters = ([], None)
+# The hit bits of a bundle assembler shared with an AddressMonitor
+_FILTER_HIT = 1
+_MONITOR_HIT = 2
+
+
+def _init_filter_worker(filterlist, filter_plan=None) -> None:
+    # The filters are shipped once to each worker of the filter process pool
+    global _worker_filters
+    _worker_filters = (filterlist, None if filter_plan is None else filter_plan.make_batch_filter())
+
+
+def _passes(filterlist, trytes) -> bool:
+    return all(f(trytes) for f in filterlist)
+
+
+def filter_messages(contents, filterlist, batch_filter=None) -> list:
+    """Run the filters over a batch of zmq message contents.
+
+    Parameters
+    ----------
+    contents : list
+        The "trytes hash" contents of the messages, without the topic.
+
+    filterlist : list
+        The str filters, run on each message if batch_filter is None.
+
+    batch_filter : Callable
+        The batch filter, e.g., built by FilterPlan.make_batch_filter(),
+        run once on the columns of the whole batch. The batch gets the
+        LIVE_MILESTONE, so the time filters compare the timestamp only.
+
+    Returns
+    ----------
+    Whether each message passed the filters.
+
+    """
+    if batch_filter is None:
+        return [_passes(filterlist, c) for c in contents]
+    length = TRANSACTION_LENGTH + 1 + TRANSACTION_HASH_LENGTH
+    valid = [i for i, c in enumerate(contents) if len(c) == length]
+    hits = [False] * len(contents)
+    if valid:
+        rows = np.frombuffer(b''.join(bytes(contents[i][:TRANSACTION_LENGTH]) for i in valid),
+                             dtype=np.uint8).reshape(len(valid), TRANSACTION_LENGTH)
+        hashes = np.array([bytes(contents[i][-TRANSACTION_HASH_LENGTH:]) for i in valid], dtype='S81')
+        for i, hit in zip(valid, np.asarray(batch_filter(BatchColumns(rows, hash=hashes, milestone=LIVE_MILESTONE)))):
+            hits[i] = bool(hit)
+    return hits
+
+
+def _filter_batch(contents) -> list:
+    return filter_messages(contents, *_worker_filters)
+
+
 class ZmqSub():
     """
     Zmq Subscriber for transactions.
@@ -49,78 +102,190 @@ class ZmqSub():
 
     Attributes
     ----------
-    url : str
-        The url to subscribe.
+    url : str or list
+        The url (or the list of urls of several nodes) to subscribe.
     topic : str
         The topic to subscribe.
 
     filterlist : list
         The filter list for new coming transactions.
 
+    filter_plan : FilterPlan
+        If set, the messages are filtered with its batch filter, once per
+        batch, instead of with the filter list.
+
+    bundle_assembler : BundleAssembler
+        If set, every transaction is assembled into its bundle, and the
+        complete bundles with a transaction passing the filters are saved.
+
+    monitor : AddressMonitor
+        If set, every transaction is passed to the address monitor, which
+        alerts on the spends of its watched addresses. If it shares the
+        bundle_assembler, each transaction is assembled once for both.
+
+    sink : TransactionSink
+        If set, the transactions passing the filters (or their whole bundles
+        with a bundle_assembler) are stored into it, e.g., a SqliteSink.
+
+    publisher : Publisher
+        If set, the messages of the transactions passing the filters are
+        published with it, e.g., a KafkaPublisher.
+
+    dedup_ttl : float
+        The messages of a transaction hash received within dedup_ttl
+        seconds, e.g., from several nodes, are dropped before filtering.
+        Set None to keep the duplicates.
+
+    queue_size : int
+        The maximum number of received messages waiting for a consumer.
+
+    queue_policy : str
+        What to do when the queue is full, see IngestBuffer: "block" the
+        receiving, "drop_oldest" or "drop_newest" message, or "spill" to
+        the journal file journal_path and replay it.
+
+    consumers : int
+        The number of consumer tasks.
+
+    batch_size : int
+        The maximum number of messages handled at once by a consumer.
+
+    batch_linger : float
+        The maximum time (in seconds) a consumer waits to fill a batch.
+
+    filter_processes : int
+        If set, the filters of the batches run in a pool of this number of
+        processes. The filters must be picklable.
+
+    filter_shards : int
+        If set, the messages are filtered by this number of long-lived
+        worker processes, sharded by bundle hash, see ShardedFilter.
+        It excludes filter_processes.
+
     Methods
     -------
     run()
         Start to run the zmq subscriber and receive new coming transactions.
     """
 
-    def __init__(self, url='tcp://zmq.iota.org:5556', topic='trytes', filterlist=[]) -> None:
-        self.threads = set()
+    def __init__(self, url='tcp://zmq.iota.org:5556', topic='trytes', filterlist=[], bundle_assembler=None,
+                 monitor=None, sink=None, publisher=None, queue_size=10000, consumers=4,
+                 filter_processes=0, batch_size=256, batch_linger=0.005, filter_plan=None,
+                 queue_policy='block', journal_path='zmq_journal.bin', dedup_ttl=60.0,
+                 filter_shards=0) -> None:
+        if filter_processes and filter_shards:
+            raise ValueError("Set either filter_processes or filter_shards!")
         self.url = url
+        self.urls = [url] if isinstance(url, str) else list(url)
+        self.dedup = None if not dedup_ttl else DedupCache(dedup_ttl)
         self.topic = topic
         self.filterlist = filterlist
-        self.producer = KafkaProducer(
-            bootstrap_servers='localhost:9092', api_version=(2, 5, 0))
+        self.bundle_assembler = bundle_assembler
+        self.monitor = monitor
+        self.sink = sink
+        self.publisher = publisher
+        self.queue_size = queue_size
+        self.queue_policy = queue_policy
+        self.journal_path = journal_path
+        self.buffer = None
+        self.consumers = consumers
+        self.filter_processes = filter_processes
+        self.filter_shards = filter_shards
+        self.sharded = None
+        self.batch_size = batch_size
+        self.batch_linger = batch_linger
+        self.filter_plan = filter_plan
+        self._batch_filter = None if filter_plan is None else filter_plan.make_batch_filter()
+
+    async def push_zmq_msg(self, queue, url=None) -> None:
+        """Receive the messages of a node into the queue.
 
-    async def push_zmq_msg(self, queue) -> None:
+        Parameters
+        ----------
+        queue : IngestBuffer
+            The queue of the received messages.
+
+        url : str
+            The url to subscribe, by default the first one.
+        """
         choices = string.ascii_lowercase + string.digits
-        curr_thread = threading.current_thread()
-        self.threads.add(curr_thread.ident)
-        logging.debug("Starting push_zmq_msg")
+        url = self.urls[0] if url is None else url
+        logging.debug(f"Starting push_zmq_msg for {url}")
         ctx = Context.instance()
         s = ctx.socket(zmq.SUB)
-        s.connect(self.url)
+        s.connect(url)
         s.subscribe(self.topic)
         while True:
             content = await s.recv_multipart()
+            # The last 81 trytes are the transaction hash
+            if self.dedup is not None and self.dedup.seen(content[0][-TRANSACTION_HASH_LENGTH:]):
+                continue
             msg_id = str(uuid.uuid4())
             host_id = "".join(random.choices(choices, k=4))
             instance_name = f"ta-{host_id}"
             msg = PubSubMessage(message_id=msg_id,
                                 instance_name=instance_name, content=content)
-            # publish an item
-            queue.put(msg)
-            self.producer.send("test", value=content[0])
+            # publish an item, applying the queue policy if the consumers fall behind
+            await queue.put(msg)
             logging.info(f"Received {content[0][:20]}...")
         s.close()
 
-    async def save(self, msg) -> None:
+    async def save(self, msg, hit=None) -> None:
         """Save message to a database.
 
         Parameters
         ----------
         msg : PubSubMessage
             Consumed event message to be saved.
+
+        hit : bool
+            The message passed the filters, None to run the filters.
         """
-        trytes_hash = (msg.content[0][ZMQ_TRYTES_TOPIC_OFFSET:],)
-        logging.info(f"Start filtering...")
-        for f in self.filterlist:
-            trytes_hash = tuple(filter(f, trytes_hash))
-        if trytes_hash:
-            logging.info(f"Saved {trytes_hash[0][:20]}... into database")
-        # TODO: save the filtered trytes to database
-        msg.save = True
-
-    async def cleanup(self, msg, event) -> None:
-        """Cleanup tasks related to completing work on a message.
+        content = msg.content[0][ZMQ_TRYTES_TOPIC_OFFSET:]
+        if hit is None:
+            logging.info(f"Start filtering...")
+            hit = filter_messages([content], self.filterlist, self._batch_filter)[0]
+        if hit and self.publisher is not None:
+            self.publisher.publish(msg.content[0])
+        transaction = LazyTransaction(
+            content[:TRANSACTION_LENGTH], hash=content[-TRANSACTION_HASH_LENGTH:])
+        shared = self.monitor is not None and self.monitor.assembler is self.bundle_assembler
+        if self.monitor is not None:
+            self.monitor.add(transaction, assemble=not shared)
+        saved = []
+        if self.bundle_assembler is not None:
+            hits = _FILTER_HIT if hit else 0
+            if shared and transaction['address'] in self.monitor:
+                hits |= _MONITOR_HIT
+            bundle, hits = self.bundle_assembler.assemble(transaction, hits)
+            if bundle is not None and hits & _MONITOR_HIT:
+                self.monitor.add_bundle(bundle)
+            if bundle is not None and hits & _FILTER_HIT:
+                saved = bundle
+                logging.info(
+                    f"Saved bundle {bundle[0]['bundle_hash'][:20]}... of {len(bundle)} transactions into database")
+        elif hit:
+            saved = [transaction]
+            logging.info(f"Saved {content[:20]}... into database")
+        if self.sink is not None and saved:
+            # Backpressure: wait for the sink instead of blocking the event loop,
+            # write() raises if its writer failed and will never catch up
+            for t in saved:
+                while not self.sink.write(t, block=False):
+                    await asyncio.sleep(self.sink.flush_interval / 10)
+        msg.saved = True
+
+    def cleanup(self, msgs) -> None:
+        """Cleanup tasks related to completing work on a batch of messages.
 
         Parameters
         ----------
-        msg : PubSubMessage
-            Consumed event message that is done being processed.
+        msgs : list
+            Consumed event messages that are done being processed.
         """
-        await event.wait()
-        msg.acked = True
-        logging.debug(f"Done. Acked {msg}")
+        for msg in msgs:
+            msg.acked = True
+        logging.debug(f"Done. Acked {len(msgs)} messages")
 
     def handle_results(self, results, msg) -> None:
         """Handle exception results for a given message.
@@ -140,59 +305,84 @@ class ZmqSub():
             elif isinstance(result, Exception):
                 logging.error(f"Handling general error: {result}")
 
-    async def extend(self, msg, event):
-        while not event.is_set():
-
-            msg.extended_cnt += 1
-            logging.debug(f"Extended deadline by 3 seconds for {msg}")
-
-            # want to sleep for less than the deadline amount
-            await asyncio.sleep(2)
-
-    async def handle_message(self, msg) -> None:
-        """Kick off tasks for a given message.
+    async def handle_batch(self, msgs, hits) -> None:
+        """Save a batch of messages, then ack them at once.
 
         Parameters
         ----------
-        msg : PubSubMessage
-            consumed message to process.
+        msgs : list
+            consumed messages to process.
+
+        hits : list
+            Whether each message passed the filters.
         """
-        event = asyncio.Event()
-        asyncio.create_task(self.extend(msg, event))
-        asyncio.create_task(self.cleanup(msg, event))
+        for msg, hit in zip(msgs, hits):
+            try:
+                await self.save(msg, hit)
+            except Exception as e:
+                self.handle_results([e], msg)
+        self.cleanup(msgs)
 
-        results = await asyncio.gather(
-            self.save(msg), return_exceptions=True
-        )
+    async def next_batch(self, queue) -> list:
+        """Wait for up to batch_size messages, or what arrives within batch_linger."""
+        loop = asyncio.get_running_loop()
+        msgs = [await queue.get()]
+        deadline = loop.time() + self.batch_linger
+        while len(msgs) < self.batch_size:
+            if not queue.empty():
+                msgs.append(queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                msgs.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return msgs
 
-        self.handle_results(results, msg)
-        event.set()
+    async def consume(self, queue, pool=None) -> None:
+        """Consume the received messages.
 
-    def consume_sync(self, queue, loop) -> None:
-        while True:
-            msg = queue.get()
-            logging.debug(f"Consumed {msg}")
-            asyncio.run_coroutine_threadsafe(self.handle_message(msg), loop)
+        Parameters
+        ----------
+        queue : asyncio.Queue
+            The queue of the received messages.
 
-    async def consume(self, executor, queue) -> None:
+        pool : concurrent.futures.ProcessPoolExecutor
+            If set, the pool to run the filters on batches of queued messages.
+        """
         logging.debug("Starting consumer")
         loop = asyncio.get_running_loop()
-        asyncio.ensure_future(
-            loop.run_in_executor(executor, self.consume_sync, queue, loop), loop=loop
-        )
-
-    def handle_exception(self, executor, loop, context) -> None:
+        while True:
+            msgs = await self.next_batch(queue)
+            contents = [m.content[0][ZMQ_TRYTES_TOPIC_OFFSET:] for m in msgs]
+            logging.debug(f"Filtering {len(msgs)} messages")
+            try:
+                if self.sharded is not None:
+                    hits = await self.sharded.filter(contents)
+                elif pool is None:
+                    hits = filter_messages(contents, self.filterlist, self._batch_filter)
+                else:
+                    hits = await loop.run_in_executor(pool, _filter_batch, contents)
+            except Exception as e:
+                logging.error(f"Filtering {len(msgs)} messages failed: {e}")
+                hits = [False] * len(msgs)
+            await self.handle_batch(msgs, hits)
+            for _ in msgs:
+                queue.task_done()
+
+    def handle_exception(self, pool, loop, context) -> None:
         # context["message"] will always be there; but context["exception"] may not
         msg = context.get("exception", context["message"])
         logging.error(f"Caught exception: {msg}")
         logging.debug("Shutting down...")
-        asyncio.create_task(self.shutdown(loop, executor))
+        asyncio.create_task(self.shutdown(loop, pool))
 
-    async def shutdown(self, loop, executor, signal=None) -> None:
+    async def shutdown(self, loop, pool, signal=None) -> None:
         """Cleanup tasks tied to the service's shutdown."""
         if signal:
             logging.info(f"Received exit signal {signal.name}...")
-        logging.info("Closing database connections")
         tasks = [t for t in asyncio.all_tasks() if t is not
                  asyncio.current_task()]
 
@@ -201,37 +391,57 @@ class ZmqSub():
         logging.info(f"Cancelling {len(tasks)} tasks")
         await asyncio.gather(*tasks, return_exceptions=True)
 
-        logging.info("Shutting down ThreadPoolExecutor")
-        executor.shutdown(wait=False)
-
-        logging.info(
-            f"Releasing {len(executor._threads)} threads from executor")
-        for thread in executor._threads:
-            try:
-                thread._tstate_lock.release()
-            except Exception:
-                pass
+        # The consumers are stopped, so nothing writes to the sinks any more
+        logging.info("Closing database connections")
+        if self.sink is not None:
+            await loop.run_in_executor(None, self.sink.close)
+        if self.publisher is not None:
+            await loop.run_in_executor(None, self.publisher.close)
+
+        if pool is not None:
+            logging.info("Shutting down the filter process pool")
+            pool.shutdown(wait=False)
+        if self.sharded is not None:
+            logging.info("Stopping the filter shards")
+            await loop.run_in_executor(None, self.sharded.close)
+            self.sharded = None
 
         logging.info(f"Flushing metrics")
+        if self.buffer is not None:
+            logging.info(f"Ingestion buffer: {self.buffer.stats()}")
+            self.buffer.close()
+        if self.dedup is not None:
+            logging.info(f"Dropped {self.dedup.duplicates} duplicate messages")
         loop.stop()
 
     def run(self) -> None:
         """Start to run the zmq subscriber and receive new coming transactions."""
-        executor = concurrent.futures.ThreadPoolExecutor()
-        loop = asyncio.get_event_loop()
+        pool = None
+        if self.filter_processes:
+            pool = concurrent.futures.ProcessPoolExecutor(
+                self.filter_processes, initializer=_init_filter_worker,
+                initargs=(self.filterlist, self.filter_plan))
+        if self.filter_shards:
+            self.sharded = ShardedFilter(self.filter_shards, self.filterlist, self.filter_plan,
+                                         batch_size=self.batch_size)
+            self.sharded.start()
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
         loop.slow_callback_duration = 2.5  # in seconds
         signals = (signal.SIGHUP, signal.SIGTERM,
                    signal.SIGINT, signal.SIGQUIT)
         for s in signals:
             loop.add_signal_handler(
-                s, lambda s=s: asyncio.create_task(self.shutdown(loop, executor, signal=s)))
-        handle_exc_func = functools.partial(self.handle_exception, executor)
+                s, lambda s=s: asyncio.create_task(self.shutdown(loop, pool, signal=s)))
+        handle_exc_func = functools.partial(self.handle_exception, pool)
         loop.set_exception_handler(handle_exc_func)
-        q = queue.Queue()
+        q = self.buffer = IngestBuffer(self.queue_size, self.queue_policy, self.journal_path)
 
         try:
-            loop.create_task(self.consume(executor, q))
-            loop.create_task(self.push_zmq_msg(q))
+            for _ in range(self.consumers):
+                loop.create_task(self.consume(q, pool))
+            for url in self.urls:
+                loop.create_task(self.push_zmq_msg(q, url))
             loop.run_forever()
         finally:
             loop.close()
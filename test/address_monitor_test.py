@@ -0,0 +1,52 @@
+# address_monitor_test.py
+from unittest import TestCase, main
+from tangleanalyzer import AddressMonitor
+
+from tangleanalyzer.common.const import *
+
+
+def tx(bundle, current, last, address, value):
+    return {'bundle_hash': bundle, 'current_index': current, 'last_index': last,
+            'address': address, 'value': value}
+
+
+class AddressMonitorTestCase(TestCase):
+
+    def test_spend_and_outputs(self):
+        alerts = []
+        monitor = AddressMonitor({'A'}, on_alert=alerts.append)
+        self.assertEqual([], monitor.add(tx('X', 0, 2, 'B', 7)))
+        spend = monitor.add(tx('X', 1, 2, 'A', -10))
+        self.assertEqual(['spend'], [a.kind for a in spend])
+        outputs = monitor.add(tx('X', 2, 2, 'A', 3))
+        self.assertEqual(1, len(outputs))
+        self.assertEqual(('A', 7, 0, (('B', 7),)),
+                         (outputs[0].address, outputs[0].value, outputs[0].hop, outputs[0].outputs))
+        self.assertEqual(spend + outputs, alerts)
+        # Without hops, the outputs are not watched
+        self.assertNotIn('B', monitor)
+
+    def test_hops(self):
+        monitor = AddressMonitor({'A'}, max_hops=1, on_alert=None)
+        monitor.add(tx('X', 0, 1, 'A', -5))
+        monitor.add(tx('X', 1, 1, 'B', 5))
+        self.assertEqual(1, monitor.watchlist['B'])
+        monitor.add(tx('Y', 0, 1, 'B', -5))
+        alerts = monitor.add(tx('Y', 1, 1, 'C', 5))
+        self.assertEqual([('B', 1)], [(a.address, a.hop) for a in alerts])
+        # B is at the last hop, so C is not watched
+        self.assertNotIn('C', monitor)
+
+    def test_filter_follows_watchlist(self):
+        monitor = AddressMonitor()
+        keep = monitor.make_filter()
+        transaction = '9' * ADDRESS_B + 'D' * 81
+        self.assertFalse(keep(transaction))
+        monitor.watch('D' * 81)
+        self.assertTrue(keep(transaction))
+        monitor.unwatch('D' * 81)
+        self.assertFalse(keep(transaction))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# bloom_test.py
+import multiprocessing as mp
+import pickle
+from unittest import TestCase, main
+from tangleanalyzer import AddressFilter
+from tangleanalyzer.common.bloom import BloomFilter, BloomSet
+from . import (
+    transaction_and_hash,
+    address_correct,
+    address_wrong
+)
+
+KEYS = [f'{i:081d}'.translate(str.maketrans('0123456789', '9ABCDEFGHI'))
+        for i in range(1000)]
+
+
+class BloomTestCase(TestCase):
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(len(KEYS), 0.01, shared=False)
+        for k in KEYS:
+            bloom.add(k)
+        self.assertTrue(all(k in bloom for k in KEYS))
+        self.assertTrue(bloom.contains_batch(KEYS).all())
+
+    def test_bloom_filter_batch_matches_keys(self):
+        # Keys of several lengths hash the same alone and in a padded column
+        keys = KEYS[:50] + [k[:n] for k, n in zip(KEYS[50:], range(1, 90))]
+        bloom = BloomFilter(len(keys), 0.01, shared=False)
+        bloom.add_batch(keys)
+        self.assertTrue(all(k in bloom for k in keys))
+        bloom = BloomFilter(len(keys), 0.01, shared=False)
+        for k in keys:
+            bloom.add(k)
+        self.assertTrue(bloom.contains_batch(keys).all())
+        self.assertEqual(0, len(bloom.contains_batch([])))
+
+    def test_bloom_set_is_exact(self):
+        s = BloomSet(KEYS, 0.1)
+        others = ['Z' + k[1:] for k in KEYS]
+        self.assertEqual(len(KEYS), len(s))
+        self.assertTrue(all(k in s for k in KEYS))
+        self.assertFalse(any(k in s for k in others))
+        self.assertEqual([True] * 3 + [False] * 3,
+                         s.contains_batch(KEYS[:3] + others[:3]).tolist())
+        s.release()
+
+    def test_bloom_set_pickles_by_name(self):
+        s = BloomSet(KEYS, 0.01)
+        data = pickle.dumps(s)
+        self.assertLess(len(data), 1000)
+        attached = pickle.loads(data)
+        self.assertTrue(all(k in attached for k in KEYS[::50]))
+        self.assertEqual(sorted(KEYS), list(attached))
+        s.release()
+
+    def test_bloom_set_is_freed_by_its_creator_only(self):
+        s = BloomSet(KEYS, 0.01)
+        child = mp.get_context('fork').Process(target=s.release)
+        child.start()
+        child.join()
+        self.assertTrue(all(k in s for k in KEYS[::50]))
+        self.assertTrue(KEYS[0] in pickle.loads(pickle.dumps(s)))
+        s.release()
+
+    def test_address_filter_with_bloom(self):
+        f = AddressFilter(set(address_correct + KEYS), bloom_fp_rate=0.01)
+        self.assertEqual(True, f.make_filter()(transaction_and_hash))
+        f = AddressFilter(set(address_wrong + KEYS), bloom_fp_rate=0.01)
+        self.assertEqual(False, f.make_filter()(transaction_and_hash))
+        self.assertEqual([True, False], f.make_batch_filter()(
+            {'address': [address_wrong[0], address_correct[0]]}).tolist())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+# bundle_assembler_test.py
+import os
+import tempfile
+from unittest import TestCase, main
+from tangleanalyzer import (AddressFilter, BundleAssembler, DmpDecode, DmpIndex,
+                            FilterPlan, expand_bundles)
+from . import transaction_and_hash
+
+from tangleanalyzer.common.const import *
+
+TX = transaction_and_hash[:TRANSACTION_LENGTH]
+ALPHABET = '9ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def trytes(i, length):
+    """Encode a small non-negative integer, e.g., an index, in balanced trytes."""
+    digits = ''
+    while i:
+        i, r = divmod(i, 27)
+        if r > 13:
+            r -= 27
+            i += 1
+        digits += ALPHABET[r]
+    return (digits + '9' * length)[:length]
+
+
+def transaction(bundle, current, last, address='9' * 81):
+    tx = (TX[:ADDRESS_B] + address + TX[ADDRESS_E:CURRENT_IDX_B] +
+          trytes(current, CURRENT_IDX_E - CURRENT_IDX_B) +
+          trytes(last, LAST_IDX_E - LAST_IDX_B) + bundle + TX[BUNDLE_HASH_E:])
+    return tx, (bundle[:40] + trytes(current, 41))
+
+
+def as_dict(bundle, current, last):
+    return {'bundle_hash': bundle, 'current_index': current, 'last_index': last}
+
+
+class BundleAssemblerTestCase(TestCase):
+
+    def test_complete_bundle_in_index_order(self):
+        assembler = BundleAssembler()
+        self.assertIsNone(assembler.add(as_dict('A', 2, 2), hit=False))
+        self.assertIsNone(assembler.add(as_dict('A', 0, 2), hit=True))
+        self.assertIsNone(assembler.add(as_dict('A', 0, 2), hit=False))
+        bundle = assembler.add(as_dict('A', 1, 2), hit=False)
+        self.assertEqual([0, 1, 2], [t['current_index'] for t in bundle])
+        # Reattachments of a complete bundle are ignored
+        self.assertIsNone(assembler.add(as_dict('A', 0, 2)))
+        self.assertEqual(0, len(assembler))
+
+    def test_bundles_without_hit_are_dropped(self):
+        assembler = BundleAssembler()
+        self.assertIsNone(assembler.add(as_dict('B', 0, 0), hit=False))
+        self.assertEqual(0, assembler.completed)
+
+    def test_inconsistent_indexes(self):
+        assembler = BundleAssembler(max_bundle_size=10)
+        self.assertIsNone(assembler.add(as_dict('D', 3, 2)))
+        self.assertIsNone(assembler.add(as_dict('D', 0, 10)))
+        self.assertEqual(2, assembler.rejected)
+
+    def test_conflicting_last_index(self):
+        assembler = BundleAssembler()
+        # A forged transaction arrives first with another last_index
+        self.assertIsNone(assembler.add(as_dict('C', 0, 5)))
+        self.assertIsNone(assembler.add(as_dict('C', 1, 1)))
+        bundle = assembler.add(as_dict('C', 0, 1))
+        self.assertEqual([(0, 1), (1, 1)], [(t['current_index'], t['last_index']) for t in bundle])
+        self.assertEqual(1, assembler.conflicts)
+        self.assertEqual(0, len(assembler))
+
+    def test_assemble_hits(self):
+        assembler = BundleAssembler()
+        self.assertEqual((None, 0), assembler.assemble(as_dict('E', 0, 1), 2))
+        bundle, hits = assembler.assemble(as_dict('E', 1, 1), 1)
+        self.assertEqual(3, hits)
+        self.assertEqual(2, len(bundle))
+        bundle, hits = assembler.assemble(as_dict('F', 0, 0), 0)
+        self.assertEqual((1, 0), (len(bundle), hits))
+        self.assertEqual(1, assembler.completed)
+
+    def test_eviction(self):
+        now = [0]
+        assembler = BundleAssembler(max_pending=2, max_age=10, clock=lambda: now[0])
+        assembler.add(as_dict('A', 0, 1))
+        now[0] = 5
+        assembler.add(as_dict('B', 0, 1))
+        now[0] = 7
+        assembler.add(as_dict('C', 0, 1))
+        self.assertNotIn('A', assembler)
+        now[0] = 15
+        self.assertEqual(1, assembler.evict())
+        self.assertEqual(['C'], list(assembler.flush()))
+        self.assertEqual(2, assembler.evicted)
+
+
+class BundleExpansionTestCase(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.dmp_folder = os.path.join(self.folder.name, 'dmp')
+        os.makedirs(self.dmp_folder)
+        hit, other = 'A' * 81, 'B' * 81
+        self.address = 'C' * 81
+        # The bundle of the hit spans two dmp files
+        files = {'100.dmp': [transaction(hit, 0, 2, self.address), transaction(other, 0, 1),
+                             transaction(hit, 2, 2)],
+                 '101.dmp': [transaction(other, 1, 1), transaction(hit, 1, 2)]}
+        for filename, lines in files.items():
+            with open(os.path.join(self.dmp_folder, filename), 'w') as f:
+                f.writelines(f"{h},{tx}\n" for tx, h in lines)
+        self.hit = hit
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_expand_bundles(self):
+        index = DmpIndex(os.path.join(self.folder.name, 'index'))
+        index.build(self.dmp_folder, processes=1)
+        for i in (None, index):
+            bundles = list(expand_bundles(self.dmp_folder, {self.hit}, index=i))
+            self.assertEqual(1, len(bundles))
+            self.assertEqual([0, 1, 2], [t['current_index'] for t in bundles[0]])
+            self.assertEqual(['100', '101', '100'], [t['milestone'] for t in bundles[0]])
+
+    def test_dmp_decode_expand_bundles(self):
+        out = os.path.join(self.folder.name, 'out')
+        plan = FilterPlan().add(AddressFilter({self.address}))
+        DmpDecode(self.dmp_folder, out, filter_plan=plan, expand_bundles=True).run()
+        rows = {}
+        for name in ('100', '101'):
+            with open(os.path.join(out, f'{name}.txt')) as f:
+                rows[name] = [l.split("\t") for l in list(f)[1:]]
+        self.assertEqual([2, 1], [len(rows['100']), len(rows['101'])])
+        self.assertEqual({self.hit}, {r[8] for rs in rows.values() for r in rs})
+
+
+if __name__ == '__main__':
+    main()
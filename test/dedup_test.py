@@ -0,0 +1,32 @@
+# dedup_test.py
+from unittest import TestCase, main
+from tangleanalyzer import DedupCache, ZmqSub
+
+
+class DedupCacheTestCase(TestCase):
+
+    def test_ttl(self):
+        cache = DedupCache(ttl=10)
+        self.assertFalse(cache.seen(b'A', now=0))
+        self.assertTrue(cache.seen(b'A', now=5))
+        self.assertFalse(cache.seen(b'B', now=6))
+        # A expired, B did not
+        self.assertFalse(cache.seen(b'A', now=10))
+        self.assertTrue(cache.seen(b'B', now=15))
+        self.assertEqual(2, cache.duplicates)
+
+    def test_max_size(self):
+        cache = DedupCache(ttl=10, max_size=2)
+        for key in (b'A', b'B', b'C'):
+            cache.seen(key, now=0)
+        self.assertEqual(2, len(cache))
+        self.assertFalse(cache.seen(b'A', now=0))
+
+    def test_urls(self):
+        sub = ZmqSub(url=['tcp://a:5556', 'tcp://b:5556'])
+        self.assertEqual(['tcp://a:5556', 'tcp://b:5556'], sub.urls)
+        self.assertIsNone(ZmqSub(dedup_ttl=0).dedup)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+# dmpdecode_test.py
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main, skipUnless
+from tangleanalyzer import DmpDecode, FilterPlan, ValueFilter
+from tangleanalyzer.importer.dmpdecode import pack_decoded, unpack_decoded
+from tangleanalyzer.importer.manifest import Manifest
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+DMP_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'dmp')
+
+
+class DmpDecodeTestCase(TestCase):
+
+    def test_chunked_run_matches_serial(self):
+        with tempfile.TemporaryDirectory() as folder:
+            serial = DmpDecode(DMP_FOLDER, os.path.join(folder, 'serial'))
+            os.makedirs(serial.decoded_dmp_folder)
+            chunked = DmpDecode(DMP_FOLDER, os.path.join(folder, 'chunked'),
+                                chunk_size=4096)
+            chunked.run()
+            for filename in os.listdir(DMP_FOLDER):
+                self.assertEqual(filename, serial.output_decoded_results(filename))
+                name = filename.split(".")[0] + ".txt"
+                with open(os.path.join(serial.decoded_dmp_folder, name)) as f:
+                    expected = f.read()
+                with open(os.path.join(chunked.decoded_dmp_folder, name)) as f:
+                    self.assertEqual(expected, f.read())
+
+    def _read(self, folder, filename):
+        with open(os.path.join(folder, filename.split(".")[0] + ".txt")) as f:
+            return f.read()
+
+    def test_stream_matches_serial(self):
+        with tempfile.TemporaryDirectory() as folder:
+            serial = DmpDecode(DMP_FOLDER, folder)
+            stream = DmpDecode(DMP_FOLDER, os.path.join(folder, 'stream'),
+                               chunk_size=4096, stream=True)
+            stream.run()
+            for filename in os.listdir(DMP_FOLDER):
+                serial.output_decoded_results(filename)
+                self.assertEqual(self._read(folder, filename),
+                                 self._read(stream.decoded_dmp_folder, filename))
+            self.assertEqual(len(os.listdir(DMP_FOLDER)),
+                             len(os.listdir(stream.decoded_dmp_folder)))
+
+    def test_sort_by_time(self):
+        with tempfile.TemporaryDirectory() as folder:
+            serial = DmpDecode(DMP_FOLDER, folder)
+            stream = DmpDecode(DMP_FOLDER, os.path.join(folder, 'sorted'),
+                               chunk_size=4096, stream=True, sort_by_time=True, run_size=2)
+            stream.run()
+            for filename in os.listdir(DMP_FOLDER):
+                serial.output_decoded_results(filename)
+                header, *rows = self._read(folder, filename).splitlines(True)
+                rows.sort(key=lambda row: int(row.split("\t")[5]))
+                self.assertEqual(header + "".join(rows),
+                                 self._read(stream.decoded_dmp_folder, filename))
+
+    @skipUnless(pq, "pyarrow is not installed")
+    def test_parquet_matches_txt(self):
+        with tempfile.TemporaryDirectory() as folder:
+            stream = DmpDecode(DMP_FOLDER, folder, stream=True)
+            parquet = DmpDecode(DMP_FOLDER, os.path.join(folder, 'parquet'),
+                                chunk_size=4096, output_format="parquet")
+            parquet.run()
+            for filename in os.listdir(DMP_FOLDER):
+                stream.output_decoded_results(filename)
+                header, *rows = self._read(folder, filename).splitlines()
+                table = pq.read_table(os.path.join(
+                    parquet.decoded_dmp_folder, filename.split(".")[0] + ".parquet"))
+                self.assertEqual(header.split("\t"), table.column_names)
+                self.assertEqual(len(rows), table.num_rows)
+                for row, record in zip(rows, table.to_pylist()):
+                    record['time'] = record['time'].strftime("%Y%m%d")
+                    self.assertEqual(row.split("\t"), [
+                        v.decode("ascii") if isinstance(v, bytes) else str(v)
+                        for v in record.values()])
+
+    @skipUnless(pq, "pyarrow is not installed")
+    def test_parquet_keeps_duplicates_once(self):
+        with tempfile.TemporaryDirectory() as folder:
+            dmp_folder = os.path.join(folder, 'dmp')
+            os.makedirs(dmp_folder)
+            with open(os.path.join(DMP_FOLDER, '18675.test.dmp')) as f:
+                lines = f.readlines()
+            # Duplicates within a decoded batch
+            with open(os.path.join(dmp_folder, '18675.test.dmp'), 'w') as f:
+                f.writelines(lines[:3] + lines[:1] + lines[3:] + lines[2:5])
+            txt = DmpDecode(dmp_folder, os.path.join(folder, 'txt'))
+            txt.run()
+            parquet = DmpDecode(dmp_folder, os.path.join(folder, 'parquet'), output_format="parquet")
+            parquet.run()
+            _, *rows = self._read(txt.decoded_dmp_folder, '18675.test.dmp').splitlines()
+            table = pq.read_table(os.path.join(parquet.decoded_dmp_folder, '18675.parquet'))
+            self.assertEqual(len(lines), len(rows))
+            self.assertEqual([row.split("\t")[2] for row in rows],
+                             [h.decode("ascii") for h in table.column('tx_hash_str').to_pylist()])
+
+    def test_pack_decoded(self):
+        tx_time_dict = {'a\tb': 1, 'c\td': 2}
+        self.assertEqual(list(tx_time_dict.items()), list(unpack_decoded(pack_decoded(tx_time_dict))))
+        self.assertEqual([], list(unpack_decoded(pack_decoded({}))))
+
+    def test_unknown_output_format(self):
+        with self.assertRaises(ValueError):
+            DmpDecode(DMP_FOLDER, output_format="csv")
+
+    def test_incremental_skips_unchanged_files(self):
+        with tempfile.TemporaryDirectory() as folder:
+            dmp_folder = os.path.join(folder, 'dmp')
+            shutil.copytree(DMP_FOLDER, dmp_folder)
+            out = os.path.join(folder, 'out')
+            DmpDecode(dmp_folder, out, stream=True, incremental=True).run()
+            output = os.path.join(out, '18675.txt')
+            with open(output, 'w') as f:
+                f.write('stale')
+
+            # Touching a file does not reprocess it
+            os.utime(os.path.join(dmp_folder, '18675.test.dmp'), (0, 0))
+            DmpDecode(dmp_folder, out, stream=True, incremental=True).run()
+            with open(output) as f:
+                self.assertEqual('stale', f.read())
+
+            # Changing the filters does
+            plan = FilterPlan().add(ValueFilter(-1, 1), 'R')
+            DmpDecode(dmp_folder, out, stream=True, incremental=True, filter_plan=plan).run()
+            with open(output) as f:
+                self.assertNotEqual('stale', f.read())
+
+    def test_incremental_resumes_from_checkpoints(self):
+        with tempfile.TemporaryDirectory() as folder:
+            decode = DmpDecode(DMP_FOLDER, folder, chunk_size=4096,
+                               stream=True, incremental=True)
+            filename = '18675.test.dmp'
+            _, start, end = decode.make_tasks([filename])[0]
+            part = os.path.join(folder, 'first.part')
+            with open(part, 'w') as f:
+                f.write('checkpoint\n')
+            manifest = Manifest(os.path.join(folder, 'manifest.json'))
+            manifest.begin(filename, os.path.join(DMP_FOLDER, filename), decode.fingerprint())
+            manifest.checkpoint(filename, start, end, part)
+            manifest.save()
+
+            decode.run()
+            with open(os.path.join(folder, '18675.txt')) as f:
+                self.assertEqual('checkpoint', f.read().splitlines()[1])
+            self.assertTrue(Manifest(manifest.path).is_done(filename))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# dmpindex_test.py
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+from tangleanalyzer import DmpDecode, DmpIndex, DmpReader, FilterPlan
+from tangleanalyzer import AddressFilter, AddressPrefixFilter, TransactionHashFilter, ValueFilter
+
+from tangleanalyzer.common.const import *
+
+DMP_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'dmp')
+
+
+class DmpIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.dmp_folder = os.path.join(self.folder, 'dmp')
+        shutil.copytree(DMP_FOLDER, self.dmp_folder)
+        self.index = DmpIndex(os.path.join(self.folder, 'index'))
+        self.filepath = os.path.join(self.dmp_folder, '18675.test.dmp')
+        with DmpReader(self.filepath) as reader:
+            self.records = [(offset, str(h, "ascii"), str(t, "ascii")) for offset, h, t in reader]
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_lookup(self):
+        self.assertEqual(2, len(self.index.build(self.dmp_folder, processes=1)))
+        self.assertEqual([], self.index.build(self.dmp_folder, processes=1))
+        offset, tx_hash, tx = self.records[3]
+        address = tx[ADDRESS_B:ADDRESS_E]
+        expected = [o for o, _, t in self.records if t[ADDRESS_B:ADDRESS_E] == address]
+        self.assertEqual(expected, self.index.lookup(self.filepath, 'address', {address}).tolist())
+        self.assertEqual([offset], self.index.lookup(self.filepath, 'hash', [tx_hash]).tolist())
+        self.assertEqual([], self.index.lookup(self.filepath, 'hash', ['9' * 81]).tolist())
+
+        prefix = address[:3]
+        expected = [o for o, _, t in self.records if t[ADDRESS_B:ADDRESS_E].startswith(prefix)]
+        self.assertEqual(expected, self.index.lookup(
+            self.filepath, 'address', [prefix], prefix=True).tolist())
+        self.assertIsNone(self.index.lookup(self.filepath, 'value', ['A']))
+
+        query = DmpIndex.make_query([prefix, prefix + 'A'], prefix=True)
+        self.assertEqual(expected, self.index.lookup(self.filepath, 'address', query).tolist())
+        self.assertEqual([o for o, _, _ in self.records], self.index.lookup(
+            self.filepath, 'address', DmpIndex.make_query([''], prefix=True)).tolist())
+
+    def test_stale_segment(self):
+        self.index.build(self.dmp_folder, processes=1)
+        os.utime(self.filepath, (0, 0))
+        self.assertIsNone(DmpIndex(self.index.index_folder).lookup(
+            self.filepath, 'hash', [self.records[0][1]]))
+
+    def test_indexed_decode_matches_scan(self):
+        self.index.build(self.dmp_folder, processes=1)
+        tx = self.records[3][2]
+        plan = (FilterPlan()
+                .add(AddressPrefixFilter({tx[ADDRESS_B:ADDRESS_B + 2]}))
+                .add(TransactionHashFilter({h for _, h, _ in self.records[:6]}))
+                .add(ValueFilter(-10 ** 20, 10 ** 20), 'R'))
+        queries = plan.index_queries(self.index)
+        self.assertEqual(['AddressPrefixFilter', 'TransactionHashFilter'],
+                         [f.__class__.__name__ for f, _ in queries])
+        self.assertIs(queries, plan.index_queries(self.index))
+        for index, name in ((None, 'scan'), (self.index, 'indexed')):
+            decode = DmpDecode(self.dmp_folder, os.path.join(self.folder, name),
+                               filter_plan=plan, index=index)
+            os.makedirs(decode.decoded_dmp_folder)
+            self.assertEqual('18675.test.dmp', decode.output_decoded_results('18675.test.dmp'))
+        with open(os.path.join(self.folder, 'scan', '18675.txt')) as f:
+            expected = f.read()
+        with open(os.path.join(self.folder, 'indexed', '18675.txt')) as f:
+            self.assertEqual(expected, f.read())
+        self.assertGreater(len(expected.splitlines()), 1)
+
+
+if __name__ == '__main__':
+    main()
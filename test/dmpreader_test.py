@@ -0,0 +1,62 @@
+# dmpreader_test.py
+import os
+import tempfile
+from unittest import TestCase, main
+from tangleanalyzer import DmpReader
+from . import transaction_and_hash
+
+from tangleanalyzer.common.const import *
+
+DMP_FILE = os.path.join(os.path.dirname(__file__), '..', 'dmp', '18675.test.dmp')
+
+
+class DmpReaderTestCase(TestCase):
+
+    def test_records_match_text_lines(self):
+        with open(DMP_FILE) as f:
+            lines = [l.strip().split(",") for l in f]
+        with DmpReader(DMP_FILE) as reader:
+            records = [(str(h, "ascii"), str(t, "ascii")) for _, h, t in reader]
+        self.assertEqual([tuple(l) for l in lines], records)
+
+    def test_blocks_are_zero_copy(self):
+        with DmpReader(DMP_FILE) as reader:
+            blocks = list(reader.blocks(size=4))
+            records = list(reader.records())
+            self.assertEqual([4, 4, 2], [len(b) for b in blocks])
+            self.assertFalse(blocks[0].rows.flags.owndata)
+            self.assertEqual(bytes(records[5][2]), blocks[1].rows[1].tobytes())
+            self.assertEqual(bytes(records[5][1]), blocks[1].hashes[1])
+            self.assertEqual(records[5][0], blocks[1].offsets[1])
+            del blocks, records
+
+    def test_irregular_lines(self):
+        tx = transaction_and_hash[:TRANSACTION_LENGTH]
+        hash_ = transaction_and_hash[-TRANSACTION_HASH_LENGTH:]
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, '1.dmp')
+            with open(path, 'wb') as f:
+                f.write(f"{hash_},{tx}\r\n\n{hash_},{tx}\n{hash_},{tx}".encode("ascii"))
+            with DmpReader(path) as reader:
+                self.assertEqual([tx] * 3, [str(t, "ascii") for _, _, t in reader])
+                blocks = list(reader.blocks())
+                self.assertEqual(3, len(blocks[0]))
+                self.assertEqual([tx.encode("ascii")] * 3,
+                                 [r.tobytes() for r in blocks[0].rows])
+                del blocks
+
+    def test_chunks_align_to_lines(self):
+        with DmpReader(DMP_FILE) as reader:
+            chunks = reader.chunks(3 * 2756)
+            records = [bytes(t) for _, _, t in reader]
+        self.assertEqual(0, chunks[0][0])
+        self.assertEqual(os.path.getsize(DMP_FILE), chunks[-1][1])
+        chunked = []
+        for start, end in chunks:
+            with DmpReader(DMP_FILE, start, end) as reader:
+                chunked.extend(bytes(t) for _, _, t in reader)
+        self.assertEqual(records, chunked)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,17 +2,21 @@
 from unittest import TestCase, main
 from tangleanalyzer import (
     AddressFilter,
+    AddressPrefixFilter,
     BranchTransactionHashFilter,
     BundleFilter,
     NonceFilter,
     ObsoleteTagFilter,
     SignatureMessageFragmentFilter,
     TagFilter,
+    TagPrefixFilter,
     TimeFilter,
     TransactionHashFilter,
     TrunkTransactionHashFilter,
-    ValueFilter
+    ValueFilter,
+    combine_batch_filters
 )
+from tangleanalyzer.common.trytes import BatchColumns
 from . import (
     transaction_and_hash,
     address_correct,
@@ -101,6 +105,88 @@ class FilterTestCase(TestCase):
         filter_to_test = ValueFilter(min, max).make_filter('ME')
         self.assertEqual(False, filter_to_test(transaction_and_hash))
 
+    def _batch(self):
+        tx = transaction_and_hash[:TRANSACTION_LENGTH]
+        hash_ = transaction_and_hash[-TRANSACTION_HASH_LENGTH:]
+        return BatchColumns((tx * 2).encode("ascii"),
+                            hash=[hash_, transaction_hash_wrong[0]])
+
+    def test_set_batch_filter(self):
+        set_tuple = (address_correct, branch_correct, bundle_correct,
+                     nonce_correct, obsolete_tag_correct, signature_correct,
+                     tag_correct, trunk_correct)
+
+        filter_tuple = (AddressFilter, BranchTransactionHashFilter, BundleFilter,
+                        NonceFilter, ObsoleteTagFilter, SignatureMessageFragmentFilter,
+                        TagFilter, TrunkTransactionHashFilter)
+
+        for s, f in zip(set_tuple, filter_tuple):
+            filter_to_test = f(set(s)).make_batch_filter()
+            self.assertEqual([True, True], filter_to_test(self._batch()).tolist())
+
+        filter_to_test = TransactionHashFilter(
+            set(transaction_hash_correct)).make_batch_filter()
+        self.assertEqual([True, False], filter_to_test(self._batch()).tolist())
+
+    def test_set_filters_agree_after_mutation(self):
+        addresses = set(address_correct)
+        f = AddressFilter(addresses)
+        batch_filter = f.make_batch_filter()
+        batch_filter(self._batch())
+        addresses.clear()
+        self.assertEqual(True, f.make_filter()(transaction_and_hash))
+        self.assertEqual([True, True], batch_filter(self._batch()).tolist())
+
+    def test_value_batch_filter(self):
+        filter_to_test = ValueFilter(-3, 3).make_batch_filter('R')
+        self.assertEqual([True, True], filter_to_test(self._batch()).tolist())
+        filter_to_test = ValueFilter(-3, -1).make_batch_filter('ME')
+        self.assertEqual([False, False], filter_to_test(self._batch()).tolist())
+
+    def test_combine_batch_filters(self):
+        filter_list = [ValueFilter(-3, -1).make_batch_filter('ME'),
+                       TransactionHashFilter(set(transaction_hash_correct)).make_batch_filter()]
+        self.assertEqual([False, False], combine_batch_filters(
+            filter_list, 'and')(self._batch()).tolist())
+        self.assertEqual([True, False], combine_batch_filters(
+            filter_list, 'or')(self._batch()).tolist())
+        self.assertEqual([True, True], combine_batch_filters([])(
+            self._batch()).tolist())
+
+    def test_time_batch_filter(self):
+        tx = transaction_and_hash[:TRANSACTION_LENGTH]
+        for start, end in (('20090101', '20200706'), ('20200101', '20200706')):
+            filter_to_test = TimeFilter(start, end).make_batch_filter('RE')
+            row_filter = TimeFilter(start, end).make_dmp_filter('RE')
+            for milestone in ('18675', '1000000'):
+                batch = self._batch()
+                batch['milestone'] = milestone
+                self.assertEqual([row_filter((tx, milestone))] * 2,
+                                 filter_to_test(batch).tolist())
+
+    def test_prefix_filter(self):
+        address = address_correct[0]
+        prefix_sets = ({address[:5]},
+                       {address[:10], address_wrong[0][:3], 'ZZZ'},
+                       {address[:1], address[:30]},
+                       {address})
+        for s in prefix_sets:
+            f = AddressPrefixFilter(s)
+            self.assertEqual(True, f.make_filter()(transaction_and_hash))
+            self.assertEqual(True, f.make_filter('dict')({'address': address}))
+            self.assertEqual([True, True], f.make_batch_filter()(self._batch()).tolist())
+
+        f = AddressPrefixFilter({address_wrong[0][:3], address[:4] + 'Z', 'A'})
+        self.assertEqual(False, f.make_filter()(transaction_and_hash))
+        self.assertEqual([False, False], f.make_batch_filter()(self._batch()).tolist())
+        self.assertEqual([True, False], f.make_batch_filter()(
+            {'address': ['ABC', 'B']}).tolist())
+
+        f = TagPrefixFilter({tag_correct[0][:3]})
+        self.assertEqual(True, f.make_filter()(transaction_and_hash))
+        self.assertEqual(False, TagPrefixFilter({tag_wrong[0][:3]}).make_filter()(
+            transaction_and_hash))
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,81 @@
+# flow_graph_test.py
+import os
+import tempfile
+import numpy as np
+from unittest import TestCase, main
+from tangleanalyzer import FlowGraph, FlowGraphBuilder
+
+from tangleanalyzer.common.const import *
+
+
+def tx(address, value):
+    return {'address': address, 'value': value}
+
+
+class FlowGraphTestCase(TestCase):
+
+    def build(self, compact_size=10000000):
+        builder = FlowGraphBuilder(compact_size=compact_size)
+        # A spends 10 (signed over two transactions) to B and gets 4 back
+        builder.add_bundle([tx('B', 6), tx('A', -10), tx('A', 0), tx('A', 4)])
+        builder.add_bundle([tx('A', -3), tx('B', 3)])
+        # Two inputs split the output by their values
+        builder.add_bundle([tx('B', -3), tx('C', -1), tx('D', 4)])
+        # Zero-value bundles have no transfers
+        builder.add_bundle([tx('E', 0)])
+        return builder.build()
+
+    def test_edges(self):
+        graph = self.build()
+        self.assertEqual(4, graph.num_nodes)
+        self.assertEqual(3, graph.num_edges)
+        self.assertEqual([('B', 9, 2)], graph.out_edges('A'))
+        self.assertEqual([('D', 3, 1)], graph.out_edges('B'))
+        self.assertEqual([('B', 3, 1), ('C', 1, 1)], sorted(graph.in_edges('D')))
+        self.assertEqual([('A', 9, 2)], graph.in_edges('B'))
+        self.assertEqual([], graph.out_edges('Z'))
+
+    def test_shares_sum_to_outputs(self):
+        builder = FlowGraphBuilder()
+        # Three equal inputs split an output of 2: the floors are all 0
+        builder.add_bundle([tx('A', -1), tx('B', -1), tx('C', -1), tx('D', 2), tx('E', 1)])
+        graph = builder.build()
+        self.assertEqual(2, sum(v for _, v, _ in graph.in_edges('D')))
+        self.assertEqual(1, sum(v for _, v, _ in graph.in_edges('E')))
+        self.assertTrue((graph.value_sum > 0).all())
+
+    def test_compaction_keeps_sums(self):
+        graph = self.build(compact_size=1)
+        self.assertEqual([('B', 9, 2)], graph.out_edges('A'))
+        self.assertEqual(3, graph.num_edges)
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as folder:
+            self.build().save(os.path.join(folder, 'graph'))
+            graph = FlowGraph.load(os.path.join(folder, 'graph'))
+            self.assertIsInstance(graph.addresses, np.memmap)
+            self.assertEqual([('D', 3, 1)], graph.out_edges('B'))
+            self.assertEqual([('A', 9, 2)], graph.in_edges('B'))
+            self.assertIsNone(graph.node_id('AB'))
+
+    def test_add_decoded(self):
+        header = 'time\ttx\ttx_hash_str\taddress\tvalue\ttimestamp\tcurrent_index\tlast_index\tbundle\n'
+        with tempfile.TemporaryDirectory() as folder:
+            paths = []
+            # The bundle X is split between two files, Y is complete in the first
+            for name, rows in (('1.txt', [('A', -5, 'X', 0), ('C', -2, 'Y', 0), ('A', 2, 'Y', 1)]),
+                               ('2.txt', [('B', 5, 'X', 1)])):
+                paths.append(os.path.join(folder, name))
+                with open(paths[-1], 'w') as f:
+                    f.write(header)
+                    for address, value, bundle, index in rows:
+                        f.write(f'20170101\t\t\t{address}\t{value}\t0\t{index}\t1\t{bundle}\t\t\t\t0\n')
+            builder = FlowGraphBuilder()
+            builder.add_decoded(paths)
+            graph = builder.build()
+            self.assertEqual([('B', 5, 1)], graph.out_edges('A'))
+            self.assertEqual([('A', 2, 1)], graph.out_edges('C'))
+
+
+if __name__ == '__main__':
+    main()
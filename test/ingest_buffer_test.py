@@ -0,0 +1,75 @@
+# ingest_buffer_test.py
+import asyncio
+import os
+import tempfile
+from unittest import TestCase, main
+from tangleanalyzer import IngestBuffer
+
+
+def drain(buffer):
+    items = []
+    while not buffer.empty():
+        items.append(buffer.get_nowait())
+        buffer.task_done()
+    return items
+
+
+class IngestBufferTestCase(TestCase):
+
+    def test_drop_policies(self):
+        async def run(policy):
+            buffer = IngestBuffer(2, policy)
+            for i in range(4):
+                await buffer.put(i)
+            return drain(buffer), buffer.stats()
+        items, stats = asyncio.run(run('drop_oldest'))
+        self.assertEqual([2, 3], items)
+        self.assertEqual((4, 2), (stats['received'], stats['dropped']))
+        items, stats = asyncio.run(run('drop_newest'))
+        self.assertEqual([0, 1], items)
+        self.assertEqual(2, stats['dropped'])
+
+    def test_block(self):
+        async def run():
+            buffer = IngestBuffer(1)
+            await buffer.put(0)
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(buffer.put(1), 0.01)
+            return drain(buffer)
+        self.assertEqual([0], asyncio.run(run()))
+
+    def test_spill_and_replay(self):
+        with tempfile.TemporaryDirectory() as folder:
+            journal = os.path.join(folder, 'journal.bin')
+
+            async def run():
+                buffer = IngestBuffer(2, 'spill', journal)
+                for i in range(5):
+                    await buffer.put(i)
+                self.assertEqual(3, buffer.spilled)
+                first = buffer.get_nowait()
+                # A new message goes after the spilled ones
+                await buffer.put(5)
+                buffer.close()
+                return first, buffer
+
+            first, buffer = asyncio.run(run())
+            self.assertEqual(0, first)
+            self.assertEqual(1, buffer.replayed)
+
+            async def resume():
+                # The messages left in the journal are replayed by the next run
+                buffer = IngestBuffer(10, 'spill', journal)
+                items = drain(buffer)
+                buffer.close()
+                return items
+            self.assertEqual([3, 4, 5], asyncio.run(resume()))
+            self.assertEqual(0, os.path.getsize(journal))
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            IngestBuffer(1, 'drop_all')
+
+
+if __name__ == '__main__':
+    main()
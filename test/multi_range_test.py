@@ -0,0 +1,70 @@
+# multi_range_test.py
+import random
+from unittest import TestCase, main
+import numpy as np
+from tangleanalyzer import (
+    MultiTimeFilter,
+    MultiValueFilter,
+    TimeFilter,
+    ValueFilter
+)
+from tangleanalyzer.common.trytes import BatchColumns
+from . import transaction_and_hash
+
+from tangleanalyzer.common.const import *
+
+RLSE = ('R', 'm', 'M', 'E', 'RE', 'mE', 'ME')
+
+
+class MultiRangeFilterTestCase(TestCase):
+
+    def test_union_merges_intervals(self):
+        f = MultiValueFilter([(0, 5, 'RE'), (5, 10, 'R'), (20, 30, 'R'), (12, 12, 'E')])
+        self.assertEqual([(0, True, 10, False), (12, True, 12, True), (20, False, 30, False)],
+                         f.intervals)
+
+    def test_intersection(self):
+        f = MultiValueFilter([(0, 10, 'RE'), (5, None, 'm'), (None, 10, 'M')], logic='and')
+        self.assertEqual([(5, False, 10, False)], f.intervals)
+        f = MultiValueFilter([(0, 1, 'RE'), (5, 6, 'RE')], logic='and')
+        self.assertEqual([], f.intervals)
+
+    def test_matches_range_filters(self):
+        rng = random.Random(0)
+        for logic in ('or', 'and'):
+            for _ in range(50):
+                ranges = []
+                for _ in range(rng.randint(1, 6)):
+                    lo = rng.randint(-10, 10)
+                    ranges.append((lo, lo + rng.randint(0, 6), rng.choice(RLSE)))
+                multi = MultiValueFilter(ranges, logic)
+                single = [ValueFilter(lo, hi).make_filter(rlse, 'dict')
+                          for lo, hi, rlse in ranges]
+                combine = any if logic == 'or' else all
+                values = list(range(-12, 20))
+                expected = [combine(f({'value': v}) for f in single) for v in values]
+                self.assertEqual(expected, [multi.make_filter('dict')({'value': v})
+                                            for v in values])
+                self.assertEqual(expected, multi.make_batch_filter()(
+                    {'value': np.array(values)}).tolist())
+
+    def test_value_str_filter(self):
+        self.assertEqual(True, MultiValueFilter(
+            [(-5, -1, 'RE'), (0, 0, 'E')]).make_filter()(transaction_and_hash))
+        self.assertEqual(False, MultiValueFilter(
+            [(-5, -1, 'RE'), (1, 3, 'RE')]).make_filter()(transaction_and_hash))
+
+    def test_time_filter(self):
+        tx = transaction_and_hash[:TRANSACTION_LENGTH]
+        windows = [('20090101', '20100101', 'RE'), ('20160101', '20200706', 'RE')]
+        multi = MultiTimeFilter(windows)
+        single = [TimeFilter(s, e).make_dmp_filter(rlse) for s, e, rlse in windows]
+        for milestone in ('18675', '1000000'):
+            expected = any(f((tx, milestone)) for f in single)
+            self.assertEqual(expected, multi.make_dmp_filter()((tx, milestone)))
+            batch = BatchColumns(tx.encode("ascii"), milestone=milestone)
+            self.assertEqual([expected], multi.make_batch_filter()(batch).tolist())
+
+
+if __name__ == '__main__':
+    main()
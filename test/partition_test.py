@@ -0,0 +1,62 @@
+# partition_test.py
+import os
+import tempfile
+from unittest import TestCase, main
+from tangleanalyzer import DmpDecode, PartitionReader, TimeFilter
+from tangleanalyzer.importer.partition import transaction_time
+
+DMP_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'dmp')
+
+
+class PartitionTestCase(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        decode = DmpDecode(DMP_FOLDER, os.path.join(self.folder.name, 'flat'))
+        os.makedirs(decode.decoded_dmp_folder)
+        self.rows = []
+        for filename in sorted(os.listdir(DMP_FOLDER)):
+            decode.output_decoded_results(filename)
+            with open(decode._output_path(filename)) as f:
+                self.rows += [l.rstrip("\n").split("\t") for l in list(f)[1:]]
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def _decode(self, name, **kwargs):
+        decode = DmpDecode(DMP_FOLDER, os.path.join(self.folder.name, name),
+                           chunk_size=4096, **kwargs)
+        decode.run()
+        return decode.decoded_dmp_folder
+
+    def test_partitions_hold_all_rows(self):
+        for partition in ('day', 'hour'):
+            for stream in (False, True):
+                reader = PartitionReader(self._decode(
+                    f'{partition}{stream}', partition=partition, stream=stream), partition)
+                self.assertEqual(sorted(self.rows), sorted(reader.rows()))
+                for path in reader.files():
+                    with open(path) as f:
+                        dates = {l.split("\t")[0] for l in list(f)[1:]}
+                    self.assertEqual({os.path.relpath(path, reader.folder)[:8]}, dates)
+        self.assertEqual(2, len(PartitionReader(os.path.join(self.folder.name, 'dayFalse')).partitions()))
+
+    def test_pruning(self):
+        reader = PartitionReader(self._decode('day', partition='day', sort_by_time=True))
+        for start, end, rlse in (('20170204', '20170205', 'RE'), ('20170101', '20170102', 'R'),
+                                 ('20170204', '20170204', 'm'), ('20170204', '20170204', 'M')):
+            time_filter = TimeFilter(start, end)
+            keep = time_filter.make_filter(rlse, 'dict')
+            expected = [r for r in self.rows if keep({
+                'timestamp': transaction_time(int(r[5]), int(r[12]), '18675'),
+                'attachment_timestamp': 0})]
+            self.assertEqual(sorted(expected), sorted(reader.rows(time_filter, rlse)))
+        self.assertEqual([], reader.partitions(TimeFilter('20170101', '20170102')))
+
+    def test_unknown_partition(self):
+        with self.assertRaises(ValueError):
+            DmpDecode(DMP_FOLDER, partition='week')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# plan_test.py
+from unittest import TestCase, main
+from tangleanalyzer import (
+    AddressFilter,
+    FilterPlan,
+    TagFilter,
+    TimeFilter,
+    TransactionHashFilter,
+    ValueFilter
+)
+from tangleanalyzer.common.trytes import BatchColumns
+from . import (
+    transaction_and_hash,
+    address_correct,
+    address_wrong,
+    tag_correct,
+    transaction_hash_correct
+)
+
+from tangleanalyzer.common.const import *
+
+
+class FilterPlanTestCase(TestCase):
+
+    def setUp(self):
+        self.tx = transaction_and_hash[:TRANSACTION_LENGTH]
+        self.hash = transaction_and_hash[-TRANSACTION_HASH_LENGTH:]
+
+    def test_plan_passes(self):
+        plan = (FilterPlan()
+                .add(TimeFilter('20090101', '20300101'), 'RE')
+                .add(ValueFilter(0, 3), 'RE')
+                .add(AddressFilter(set(address_correct)))
+                .add(TransactionHashFilter(set(transaction_hash_correct))))
+        decoded = plan.evaluate(self.tx, self.hash, '18675')
+        self.assertIsNotNone(decoded)
+        self.assertEqual(0, decoded['value'])
+        self.assertEqual(True, plan.make_filter()(transaction_and_hash))
+        self.assertEqual({'address', 'hash', 'value', 'timestamp', 'attachment_timestamp'},
+                         plan.fields)
+
+    def test_plan_short_circuits(self):
+        plan = (FilterPlan()
+                .add(ValueFilter(0, 3), 'RE')
+                .add(AddressFilter(set(address_wrong))))
+        self.assertIsNone(plan.evaluate(self.tx, self.hash))
+        self.assertEqual(False, plan.make_filter()(transaction_and_hash))
+
+    def test_plan_orders_cheapest_first(self):
+        plan = (FilterPlan()
+                .add(TimeFilter('20090101', '20300101'), 'RE')
+                .add(ValueFilter(0, 3), 'RE')
+                .add(AddressFilter(set(address_correct + address_wrong)))
+                .add(TagFilter(set(tag_correct))))
+        self.assertEqual(['TagFilter', 'AddressFilter', 'ValueFilter', 'TimeFilter'],
+                         [l.split(' ')[0] for l in str(plan).split('\n')])
+
+    def test_plan_matches_batch_filter(self):
+        plan = (FilterPlan()
+                .add(ValueFilter(-3, 3), 'R')
+                .add(TransactionHashFilter(set(transaction_hash_correct))))
+        batch = BatchColumns((self.tx * 2).encode("ascii"),
+                             hash=[self.hash, address_wrong[0]])
+        self.assertEqual([True, False], plan.make_batch_filter()(batch).tolist())
+
+    def test_live_time_uses_timestamp(self):
+        # The timestamp is in 2016 and the attachment timestamp in 2025
+        plan = FilterPlan().add(TimeFilter('20160101', '20170101'), 'R')
+        self.assertEqual(True, plan.make_filter()(transaction_and_hash))
+        self.assertIsNone(plan.evaluate(self.tx, self.hash))
+        self.assertIsNotNone(plan.evaluate(self.tx, self.hash, '18675'))
+        live = BatchColumns(self.tx.encode("ascii"), milestone=LIVE_MILESTONE)
+        self.assertEqual([True], plan.make_batch_filter()(live).tolist())
+        self.assertEqual([False], plan.make_batch_filter()(
+            BatchColumns(self.tx.encode("ascii"))).tolist())
+
+    def test_empty_plan(self):
+        self.assertIsNotNone(FilterPlan().evaluate(self.tx, self.hash))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# publisher_test.py
+import asyncio
+import os
+import tempfile
+import threading
+from unittest import TestCase, main
+from tangleanalyzer import FilePublisher, MemoryPublisher, ZmqSub
+from tangleanalyzer.importer.zmqsub import PubSubMessage
+from . import transaction_and_hash
+
+
+def message(content):
+    return PubSubMessage(instance_name='ta-test', message_id='0', content=[content])
+
+
+class PublisherTestCase(TestCase):
+
+    def test_only_filtered_messages_are_published(self):
+        publisher = MemoryPublisher(linger=0.01)
+        # Constructed without a broker
+        sub = ZmqSub(filterlist=[lambda t: t.startswith(b'IHW')], publisher=publisher)
+        hit = b'trytes ' + transaction_and_hash.encode('ascii')
+        miss = b'trytes ' + b'9' * len(transaction_and_hash)
+        for content in (hit, miss, hit):
+            asyncio.run(sub.save(message(content)))
+        publisher.close()
+        self.assertEqual([hit, hit], publisher.messages)
+
+    def test_file_publisher(self):
+        with tempfile.TemporaryDirectory() as folder:
+            filepath = os.path.join(folder, 'published.txt')
+            with FilePublisher(filepath, batch_size=2) as publisher:
+                for i in range(3):
+                    self.assertTrue(publisher.publish(b'%d' % i))
+            with open(filepath, 'rb') as f:
+                self.assertEqual(b'0\n1\n2\n', f.read())
+
+    def test_full_queue_drops(self):
+        release = threading.Event()
+
+        class BlockedPublisher(MemoryPublisher):
+            def write_batch(self, messages):
+                release.wait()
+                super().write_batch(messages)
+
+        publisher = BlockedPublisher(batch_size=1, max_pending=1)
+        self.assertTrue(publisher.publish(b'0'))
+        while not publisher._queue.empty():
+            pass
+        self.assertTrue(publisher.publish(b'1'))
+        self.assertFalse(publisher.publish(b'2'))
+        self.assertEqual(1, publisher.dropped)
+        release.set()
+        publisher.close()
+        self.assertEqual([b'0', b'1'], publisher.messages)
+
+
+if __name__ == '__main__':
+    main()
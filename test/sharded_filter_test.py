@@ -0,0 +1,91 @@
+# sharded_filter_test.py
+import asyncio
+import os
+import threading
+import time
+from unittest import TestCase, main
+from tangleanalyzer import AddressFilter, FilterPlan, ShardedFilter, SharedRing
+from . import address_correct, transaction_and_hash
+
+HIT = transaction_and_hash.encode('ascii')
+MISS = b'9' * len(transaction_and_hash)
+
+
+def starts_with_ihw(trytes):
+    return trytes.startswith(b'IHW')
+
+
+def broken(trytes):
+    raise ValueError("broken filter")
+
+
+def crash(trytes):
+    os._exit(1)
+
+
+class ShardedFilterTestCase(TestCase):
+
+    def test_ring(self):
+        ring = SharedRing(slots=2, slot_size=4)
+        self.assertTrue(ring.put(b'ab'))
+        self.assertTrue(ring.put(b''))
+        self.assertFalse(ring.put(b'c', block=False))
+        with self.assertRaises(ValueError):
+            ring.put(b'abcde')
+        self.assertEqual(b'ab', ring.get())
+        self.assertTrue(ring.put(b'abcd'))
+        self.assertEqual(b'', ring.get())
+        self.assertEqual(b'abcd', ring.get())
+        self.assertIsNone(ring.get(block=False))
+        ring.close()
+
+    def test_ring_threads(self):
+        ring = SharedRing(slots=4, slot_size=8)
+        threads = [threading.Thread(target=lambda t=t: [ring.put(b'%d-%d' % (t, i)) for i in range(200)])
+                   for t in range(4)]
+        for thread in threads:
+            thread.start()
+        records = [ring.get() for _ in range(800)]
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(b'%d-%d' % (t, i) for t in range(4) for i in range(200)), sorted(records))
+        ring.close()
+
+    def test_close_with_dead_worker(self):
+        sharded = ShardedFilter(2, filterlist=[starts_with_ihw], slots=1)
+        sharded.start()
+        sharded._workers[0].terminate()
+        sharded._workers[0].join()
+        # The dead worker leaves its message in the full ring
+        sharded._inboxes[0].put(b'')
+        start = time.monotonic()
+        sharded.close(timeout=0.5)
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_filter(self):
+        contents = [HIT, MISS, b'short', HIT, MISS]
+        with ShardedFilter(2, filterlist=[starts_with_ihw], batch_size=2) as sharded:
+            hits = asyncio.run(sharded.filter(contents))
+        self.assertEqual([True, False, False, True, False], hits)
+
+    def test_failures_do_not_pass(self):
+        with ShardedFilter(1, filterlist=[broken]) as sharded:
+            self.assertEqual([False, False], asyncio.run(sharded.filter([HIT, MISS])))
+        with ShardedFilter(1, filterlist=[starts_with_ihw]) as sharded:
+            sharded._workers[0].terminate()
+            sharded._workers[0].join()
+            self.assertEqual([False], asyncio.run(sharded.filter([HIT])))
+        # The worker dies with the messages it was sent
+        with ShardedFilter(1, filterlist=[crash]) as sharded:
+            self.assertEqual([False, False], asyncio.run(sharded.filter([HIT, MISS])))
+
+    def test_filter_plan(self):
+        plan = FilterPlan().add(AddressFilter(set(address_correct)))
+        with ShardedFilter(1, filter_plan=plan) as sharded:
+            async def run():
+                return await asyncio.gather(sharded.filter([HIT, MISS]), sharded.filter([MISS]))
+            self.assertEqual([[True, False], [False]], asyncio.run(run()))
+
+
+if __name__ == '__main__':
+    main()
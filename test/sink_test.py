@@ -0,0 +1,85 @@
+# sink_test.py
+import os
+import sqlite3
+import tempfile
+import threading
+from unittest import TestCase, main
+from tangleanalyzer import SqliteSink, TransactionSink
+from tangleanalyzer.common.trytes import LazyTransaction
+from . import transaction_and_hash
+
+from tangleanalyzer.common.const import *
+
+TX = transaction_and_hash[:TRANSACTION_LENGTH]
+TX_HASH = transaction_and_hash[-TRANSACTION_HASH_LENGTH:]
+
+
+class BlockedSink(TransactionSink):
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.release_event = threading.Event()
+        self.batches = []
+
+    def write_batch(self, transactions):
+        self.release_event.wait()
+        self.batches.append(transactions)
+
+
+class BrokenSink(TransactionSink):
+
+    def open(self):
+        raise OSError("disk full")
+
+    def write_batch(self, transactions):
+        pass
+
+
+class SinkTestCase(TestCase):
+
+    def test_sqlite_batches(self):
+        with tempfile.TemporaryDirectory() as folder:
+            database = os.path.join(folder, 'zmq.db')
+            with SqliteSink(database, batch_size=2, flush_interval=0.05) as sink:
+                for _ in range(3):
+                    # The same transaction is stored once
+                    sink.write(LazyTransaction(TX.encode('ascii'), hash=TX_HASH.encode('ascii')))
+                sink.flush()
+                self.assertEqual(3, sink.written)
+            conn = sqlite3.connect(database)
+            rows = conn.execute("SELECT hash, address, value, trytes FROM transactions").fetchall()
+            conn.close()
+            self.assertEqual([(TX_HASH, TX[ADDRESS_B:ADDRESS_E], 0, TX)], rows)
+
+    def test_backpressure(self):
+        sink = BlockedSink(batch_size=1, max_pending=2)
+        self.assertTrue(sink.write(1))
+        # The writer holds one transaction, the queue holds two
+        while sink._queue.qsize():
+            pass
+        self.assertTrue(sink.write(2))
+        self.assertTrue(sink.write(3))
+        self.assertTrue(sink.full())
+        self.assertFalse(sink.write(4, block=False))
+        sink.release_event.set()
+        sink.close()
+        self.assertEqual([[1], [2], [3]], sink.batches)
+
+    def test_open_failure(self):
+        sink = BrokenSink(batch_size=1, flush_interval=0.01, max_pending=1)
+        with self.assertRaises(RuntimeError):
+            for i in range(3):
+                sink.write(i)
+        self.assertIsInstance(sink.error, OSError)
+        self.assertRaises(RuntimeError, sink.full)
+        self.assertRaises(RuntimeError, sink.flush)
+        sink.close()
+        self.assertEqual(0, sink.written)
+
+    def test_write_batch_is_abstract(self):
+        with self.assertRaises(TypeError):
+            TransactionSink()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# tangle_dag_test.py
+import os
+import tempfile
+from unittest import TestCase, main
+from tangleanalyzer import DmpReader, TangleDag
+
+from tangleanalyzer.common.const import *
+
+DMP_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'dmp')
+
+
+def h(name):
+    return name * 81
+
+
+class TangleDagTestCase(TestCase):
+
+    def setUp(self):
+        # G <- A <- B <- D, A <- C <- D, C <- E (trunk, branch)
+        edges = {'A': ('G', 'G'), 'B': ('A', 'A'), 'C': ('A', 'G'),
+                 'D': ('B', 'C'), 'E': ('C', 'C')}
+        self.dag = TangleDag.from_arrays([h(t) for t in edges],
+                                         [h(e[0]) for e in edges.values()],
+                                         [h(e[1]) for e in edges.values()])
+
+    def test_approvers(self):
+        self.assertEqual([h('B'), h('C')], self.dag.approvers(h('A')))
+        self.assertEqual([h('B'), h('C'), h('D'), h('E')], self.dag.approvers(h('A'), depth=2))
+        self.assertEqual(5, self.dag.future_cone_size(h('G')))
+        self.assertEqual([], self.dag.approvers(h('Z')))
+
+    def test_approvees(self):
+        self.assertEqual([h('B'), h('C')], self.dag.approvees(h('D')))
+        # G is only referenced, but it is in the past cone
+        self.assertEqual(4, self.dag.past_cone_size(h('D')))
+        self.assertEqual(0, self.dag.past_cone_size(h('G')))
+
+    def test_tips(self):
+        self.assertEqual([h('D'), h('E')], self.dag.tips())
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as folder:
+            self.dag.save(folder)
+            dag = TangleDag.load(folder)
+            self.assertEqual(self.dag.approvers(h('A'), depth=None),
+                             dag.approvers(h('A'), depth=None))
+
+    def test_from_dmp(self):
+        dag = TangleDag.from_dmp(DMP_FOLDER)
+        with DmpReader(os.path.join(DMP_FOLDER, '18675.test.dmp')) as reader:
+            _, tx_hash, tx = next(iter(reader))
+        tx_hash, tx = str(tx_hash, "ascii"), str(tx, "ascii")
+        self.assertEqual(sorted({tx[TRUNK_B:TRUNK_E], tx[BRANCH_B:BRANCH_E]}),
+                         dag.approvees(tx_hash))
+        self.assertIn(tx_hash, dag.approvers(tx[TRUNK_B:TRUNK_E]))
+
+
+if __name__ == '__main__':
+    main()
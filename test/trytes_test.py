@@ -0,0 +1,44 @@
+# trytes_test.py
+from unittest import TestCase, main
+from tangleanalyzer.common import tryte_to_int
+from tangleanalyzer.common.trytes import INT_FIELDS, decode_batch, rows_view
+from . import transaction_and_hash
+
+from tangleanalyzer.common.const import *
+
+
+class TrytesTestCase(TestCase):
+
+    def setUp(self):
+        self.tx = transaction_and_hash[:TRANSACTION_LENGTH]
+
+    def test_decode_batch_matches_tryte_to_int(self):
+        columns = decode_batch((self.tx * 3).encode("ascii"))
+        for name, (begin, end) in INT_FIELDS.items():
+            self.assertEqual([tryte_to_int(self.tx, begin, end)] * 3,
+                             columns[name].tolist())
+
+    def test_decode_batch_with_stride(self):
+        hash_ = transaction_and_hash[-TRANSACTION_HASH_LENGTH:]
+        line = f"{hash_},{self.tx}\n"
+        columns = decode_batch((line * 2).encode("ascii"),
+                               stride=len(line), offset=len(hash_) + 1)
+        self.assertEqual([tryte_to_int(self.tx, TIMESTAMP_B, TIMESTAMP_E)] * 2,
+                         columns['timestamp'].tolist())
+
+    def test_decode_batch_negative_value(self):
+        tx = self.tx[:VALUE_B] + "Z" + self.tx[VALUE_B + 1:]
+        self.assertEqual([-1], decode_batch(tx.encode("ascii"))['value'].tolist())
+
+    def test_decode_batch_empty(self):
+        self.assertEqual(0, len(decode_batch(b"")['value']))
+        self.assertEqual((0, TRANSACTION_LENGTH), rows_view(b"").shape)
+
+    def test_decode_batch_invalid_trytes(self):
+        tx = self.tx[:VALUE_B] + "a" + self.tx[VALUE_B + 1:]
+        with self.assertRaises(ValueError):
+            decode_batch(tx.encode("ascii"))
+
+
+if __name__ == '__main__':
+    main()
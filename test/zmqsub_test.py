@@ -0,0 +1,134 @@
+# zmqsub_test.py
+import asyncio
+import concurrent.futures
+import threading
+from unittest import TestCase, main
+from tangleanalyzer import (AddressFilter, AddressMonitor, BundleAssembler, FilterPlan,
+                            MemoryPublisher, ShardedFilter, TransactionSink, ZmqSub)
+from tangleanalyzer.common.const import CURRENT_IDX_B
+from tangleanalyzer.importer.zmqsub import PubSubMessage, _init_filter_worker
+from . import address_correct, transaction_and_hash
+
+HIT = b'trytes ' + transaction_and_hash.encode('ascii')
+MISS = b'trytes ' + b'9' * len(transaction_and_hash)
+
+
+def starts_with_ihw(trytes):
+    return trytes.startswith(b'IHW')
+
+
+class BlockedSink(TransactionSink):
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.release_event = threading.Event()
+        self.batches = []
+
+    def write_batch(self, transactions):
+        self.release_event.wait()
+        self.batches.append(transactions)
+
+
+class ZmqSubTestCase(TestCase):
+
+    def consume(self, sub, contents, pool=None):
+        async def run():
+            queue = asyncio.Queue(maxsize=2)
+            consumers = [asyncio.create_task(sub.consume(queue, pool)) for _ in range(2)]
+            for content in contents:
+                await queue.put(PubSubMessage(instance_name='ta-test', message_id='0',
+                                              content=[content]))
+            await queue.join()
+            for consumer in consumers:
+                consumer.cancel()
+            await asyncio.gather(*consumers, return_exceptions=True)
+        asyncio.run(run())
+
+    def test_consumers(self):
+        publisher = MemoryPublisher(linger=0.01)
+        sub = ZmqSub(filterlist=[starts_with_ihw], publisher=publisher)
+        self.consume(sub, [HIT, MISS, HIT, MISS, HIT])
+        publisher.close()
+        self.assertEqual([HIT] * 3, publisher.messages)
+
+    def test_batches(self):
+        sub = ZmqSub(batch_size=3, batch_linger=0.01)
+
+        async def run():
+            queue = asyncio.Queue()
+            for i in range(4):
+                queue.put_nowait(i)
+            return await sub.next_batch(queue), await sub.next_batch(queue)
+        self.assertEqual(([0, 1, 2], [3]), asyncio.run(run()))
+
+    def test_filter_plan(self):
+        publisher = MemoryPublisher(linger=0.01)
+        plan = FilterPlan().add(AddressFilter(set(address_correct)))
+        sub = ZmqSub(filter_plan=plan, publisher=publisher)
+        self.consume(sub, [HIT, MISS, b'trytes short', HIT])
+        publisher.close()
+        self.assertEqual([HIT] * 2, publisher.messages)
+        msg = PubSubMessage(instance_name='ta-test', message_id='0', content=[HIT])
+        asyncio.run(sub.handle_batch([msg], [True]))
+        self.assertTrue(msg.saved and msg.acked)
+
+    def test_shared_assembler(self):
+        assembler = BundleAssembler()
+        monitor = AddressMonitor(set(address_correct), assembler=assembler, on_alert=None)
+        bundles = []
+        monitor.add_bundle = bundles.append
+        sub = ZmqSub(bundle_assembler=assembler, monitor=monitor)
+        # The second transaction of the bundle of HIT, with another hash
+        second = (HIT[:7 + CURRENT_IDX_B] + b'A' + HIT[8 + CURRENT_IDX_B:-1] + b'Z')
+        for content in (HIT, second):
+            msg = PubSubMessage(instance_name='ta-test', message_id='0', content=[content])
+            asyncio.run(sub.save(msg, hit=False))
+        self.assertEqual([[0, 1]], [[t['current_index'] for t in b] for b in bundles])
+        self.assertEqual((1, 0), (assembler.completed, len(assembler)))
+
+    def test_full_sink_does_not_block_the_loop(self):
+        sink = BlockedSink(batch_size=1, flush_interval=0.1, max_pending=1)
+        sink.write(0)
+        while sink._queue.qsize():
+            pass
+        sink.write(1)
+        sub = ZmqSub(sink=sink)
+        ticks = []
+
+        async def run():
+            msg = PubSubMessage(instance_name='ta-test', message_id='0', content=[HIT])
+            save = asyncio.create_task(sub.save(msg, hit=True))
+            for _ in range(5):
+                await asyncio.sleep(0.01)
+                ticks.append(save.done())
+            sink.release_event.set()
+            await save
+            return msg.saved
+        self.assertTrue(asyncio.run(run()))
+        sink.close()
+        self.assertEqual([False] * 5, ticks)
+        self.assertEqual(3, len(sink.batches))
+
+    def test_sharded_filtering(self):
+        publisher = MemoryPublisher(linger=0.01)
+        sub = ZmqSub(filterlist=[starts_with_ihw], publisher=publisher)
+        sub.sharded = ShardedFilter(2, sub.filterlist)
+        with sub.sharded:
+            self.consume(sub, [HIT, MISS, HIT, MISS, HIT])
+        publisher.close()
+        self.assertEqual([HIT] * 3, publisher.messages)
+        with self.assertRaises(ValueError):
+            ZmqSub(filter_processes=2, filter_shards=2)
+
+    def test_process_pool_filtering(self):
+        publisher = MemoryPublisher(linger=0.01)
+        sub = ZmqSub(filterlist=[starts_with_ihw], publisher=publisher, batch_size=4)
+        with concurrent.futures.ProcessPoolExecutor(
+                1, initializer=_init_filter_worker, initargs=(sub.filterlist,)) as pool:
+            self.consume(sub, [HIT, MISS, HIT, MISS, HIT], pool)
+        publisher.close()
+        self.assertEqual([HIT] * 3, publisher.messages)
+
+
+if __name__ == '__main__':
+    main()